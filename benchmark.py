@@ -0,0 +1,693 @@
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import platform
+import argparse
+import subprocess
+import configparser
+from datetime import datetime, timezone
+
+import psutil
+from rdflib import Graph
+
+from const import *
+from ntriples_loader import EncodedTriples, load_ntriples
+from input_sources import (resolve_graph_files, parse_graph, check_parser_backend, get_graph_file_format,
+                           get_oxigraph_format, can_split)
+from synthetic_dataset import (generate_synthetic_dataset, get_synthetic_dataset_name, parse_scale,
+                               parse_violation_rates, add_generation_arguments)
+
+logging.basicConfig(level=logging.INFO)
+
+
+def get_host_info():
+    """
+    Description of the machine the benchmark runs on, so results of different hosts aren't compared blindly
+    """
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "python_version": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "total_memory": psutil.virtual_memory().total
+    }
+
+def get_git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def get_peak_rss(run_profile):
+    """
+    Peak RSS of the run: the highest peak recorded in the phases of the profile
+    """
+    return max((info["peak_rss"] for stage in run_profile.get("phases", {}).values() for info in stage.values()), default=None)
+
+
+def run_assessment(dataset_name, assessment_flag="-ra"):
+    """
+    Runs main.py with --profile in a subprocess, so the peak memory of each run is independent
+    from the previous ones. Returns the wall time of the subprocess.
+    """
+    command = [sys.executable, "main.py", "-d", dataset_name, assessment_flag, "--profile"]
+    logging.info(f"Running {' '.join(command)}")
+    start_time = time.perf_counter()
+    subprocess.run(command, check=True)
+    return time.perf_counter() - start_time
+
+
+def benchmark_dataset(dataset_name, generation_stats=None, generation_time=None, assessment_flag="-ra", scale=None):
+    """
+    Assesses a dataset and collects the throughput, memory and per-phase times of the run
+    """
+    wall_time = run_assessment(dataset_name, assessment_flag)
+    result = collect_run_results(dataset_name, wall_time)
+    result.update({
+        "assessment": assessment_flag,
+        "scale": scale,
+        "generation_time": generation_time,
+        "generation": generation_stats
+    })
+    return result
+
+
+def collect_run_results(dataset_name, wall_time=None):
+    """
+    Throughput, memory and per-phase times of the last run of a dataset, read from
+    run_info.json and run_profile.json (the run should be made with main.py --profile)
+    """
+    run_info = load_json("run_info.json").get(dataset_name, {})
+    run_profile = load_json(RUN_PROFILE_FILE_PATH).get(dataset_name, {})
+
+    num_triples = run_info.get("graph_profile", {}).get("num_triples", 0)
+    num_shapes = run_info.get("num_inst_shapes", 0)
+    total_elapsed_time = run_info.get("total_elapsed_time", wall_time)
+    validation_elapsed_time = (run_info.get("data_shapes_elapsed_time", 0) +
+                               run_info.get("metadata_shapes_elapsed_time", 0) +
+                               run_info.get("vocab_shapes_elapsed_time", 0))
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": get_git_commit(),
+        "host": get_host_info(),
+        "dataset_name": dataset_name,
+        "num_triples": num_triples,
+        "num_shapes": num_shapes,
+        "wall_time": wall_time,
+        "total_elapsed_time": total_elapsed_time,
+        "triples_per_second": num_triples / total_elapsed_time if total_elapsed_time else None,
+        "shapes_per_second": num_shapes / validation_elapsed_time if validation_elapsed_time else None,
+        "peak_rss": get_peak_rss(run_profile),
+        # stage -> phase -> elapsed time & peak memory
+        "phases": {
+            stage: {
+                phase: {"elapsed_time": info["elapsed_time"], "peak_rss": info["peak_rss"]}
+                for phase, info in phases.items()
+            }
+            for stage, phases in run_profile.get("phases", {}).items()
+        },
+        "metrics": {
+            stage: {metric: info["elapsed_time"] for metric, info in metrics.items()}
+            for stage, metrics in run_profile.get("metrics", {}).items()
+        }
+    }
+
+
+def save_benchmark_results(results, output_path=BENCHMARK_RESULTS_FILE_PATH):
+    """
+    Appends the results to the benchmark results file (a JSON list, oldest first)
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    all_results = load_json(output_path) or []
+    all_results.extend(results)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(all_results, f, indent=4)
+    logging.info(f"Benchmark results saved in {output_path}")
+
+
+def log_benchmark_summary(results):
+    logging.info(f"{'dataset':<24}{'triples':>12}{'shapes':>8}{'time (s)':>12}{'triples/s':>12}{'shapes/s':>10}{'peak RSS (MB)':>15}")
+    for result in results:
+        peak_rss = f"{result['peak_rss'] / 2**20:.1f}" if result["peak_rss"] else "-"
+        triples_per_second = f"{result['triples_per_second']:.1f}" if result["triples_per_second"] else "-"
+        shapes_per_second = f"{result['shapes_per_second']:.2f}" if result["shapes_per_second"] else "-"
+        logging.info(f"{result['dataset_name']:<24}{result['num_triples']:>12}{result['num_shapes']:>8}"
+                     f"{result['total_elapsed_time']:>12.2f}{triples_per_second:>12}{shapes_per_second:>10}{peak_rss:>15}")
+
+
+def run_benchmark(args):
+    violation_rates = parse_violation_rates(args.violation_rate, args.rate)
+    assessment_flag = f"-{args.assessment}"
+    results = []
+
+    for scale in sorted(args.scales, key=parse_scale):
+        generation_stats = None
+        generation_time = None
+        dataset_name = get_synthetic_dataset_name(scale)
+        if args.skip_generation and os.path.exists(f'config/{dataset_name}.ini'):
+            logging.info(f"Reusing the synthetic dataset {dataset_name}")
+        else:
+            start_time = time.perf_counter()
+            dataset_name, generation_stats = generate_synthetic_dataset(scale, args.vocabularies, violation_rates,
+                                                                        args.seed, args.uris_max_length)
+            generation_time = time.perf_counter() - start_time
+
+        results.append(benchmark_dataset(dataset_name, generation_stats, generation_time, assessment_flag, scale))
+
+    for dataset_name in args.datasets or []:
+        results.append(benchmark_dataset(dataset_name, assessment_flag=assessment_flag))
+
+    log_benchmark_summary(results)
+    save_benchmark_results(results, args.output)
+
+
+# ------------------------------------------------------------------------------------------------------------------- #
+#                                       Parse throughput
+# ------------------------------------------------------------------------------------------------------------------- #
+
+# Loaders of an N-Triples file: rdflib's parser (single core), the chunked loader (term IDs) and the
+# chunked loader followed by the creation of the rdflib graph the assessment validates
+PARSE_LOADERS = {
+    "rdflib": lambda file_path, workers: Graph().parse(file_path, format="nt"),
+    "encoded": lambda file_path, workers: load_ntriples(file_path, workers),
+    "graph": lambda file_path, workers: load_ntriples(file_path, workers, EncodedTriples(dedup=False)).to_graph()
+}
+
+def benchmark_parse(file_path, workers_counts, repeat=1):
+    """
+    Triples per second of each loader of an N-Triples file, the best of repeat runs.
+    rdflib's parser is only measured once, it doesn't use the workers.
+    """
+    file_size = os.path.getsize(file_path)
+    results = []
+    for loader, workers in [("rdflib", 1)] + [(loader, workers) for workers in workers_counts for loader in ("encoded", "graph")]:
+        elapsed_times = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            num_triples = len(PARSE_LOADERS[loader](file_path, workers))
+            elapsed_times.append(time.perf_counter() - start_time)
+        elapsed_time = min(elapsed_times)
+        results.append({
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": get_git_commit(),
+            "host": get_host_info(),
+            "file_path": file_path,
+            "file_size": file_size,
+            "loader": loader,
+            "workers": workers,
+            "num_triples": num_triples,
+            "elapsed_time": elapsed_time,
+            "triples_per_second": num_triples / elapsed_time if elapsed_time else None,
+            "megabytes_per_second": file_size / 2**20 / elapsed_time if elapsed_time else None
+        })
+    return results
+
+def log_parse_summary(results):
+    rdflib_time = next((result["elapsed_time"] for result in results if result["loader"] == "rdflib"), None)
+    logging.info(f"{'loader':<10}{'workers':>8}{'triples':>12}{'time (s)':>10}{'triples/s':>12}{'MB/s':>8}{'speedup':>9}")
+    for result in results:
+        speedup = f"{rdflib_time / result['elapsed_time']:.2f}" if rdflib_time and result["elapsed_time"] else "-"
+        logging.info(f"{result['loader']:<10}{result['workers']:>8}{result['num_triples']:>12}{result['elapsed_time']:>10.2f}"
+                     f"{result['triples_per_second']:>12.1f}{result['megabytes_per_second']:>8.2f}{speedup:>9}")
+
+def run_parse_benchmark(args):
+    file_path = args.file
+    if file_path is None:
+        dataset_name = get_synthetic_dataset_name(args.scale)
+        file_path = f'{DATASETS_FOLDER_PATH}/{dataset_name}/data.nt'
+        if os.path.exists(file_path):
+            logging.info(f"Reusing the synthetic dataset {dataset_name}")
+        else:
+            generate_synthetic_dataset(args.scale, args.vocabularies, parse_violation_rates(args.violation_rate, args.rate),
+                                       args.seed, args.uris_max_length)
+
+    results = benchmark_parse(file_path, sorted(set(args.workers)), args.repeat)
+    log_parse_summary(results)
+    save_benchmark_results(results, args.output)
+
+
+# ------------------------------------------------------------------------------------------------------------------- #
+#                                       Parser backends
+# ------------------------------------------------------------------------------------------------------------------- #
+
+def get_dataset_files(dataset_name):
+    """
+    RDF files of a dataset (data graph, metadata & vocabularies of config/<dataset_name>.ini) as (kind, path, format)
+    """
+    config_path = f'config/{dataset_name}.ini'
+    config = configparser.ConfigParser()
+    if not config.read(config_path):
+        raise FileNotFoundError(f"Config file not found at path: {config_path}")
+    settings = config['settings']
+
+    graph_file_format = settings.get('graph_file_format', fallback='').strip() or None
+    files = [("data", path, get_graph_file_format(path, graph_file_format)) for path in resolve_graph_files(settings['graph_file'])]
+    if settings.get('metadata_file'):
+        files.append(("metadata", settings['metadata_file'], settings['metadata_file_format']))
+    for vocab in settings['vocabularies'].split(','):
+        files.append(("vocabulary", config[vocab.strip()]['file_path'], config[vocab.strip()]['file_format']))
+
+    for _, path, _ in files:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File '{path}' of {dataset_name} not found")
+    return files
+
+def get_available_datasets():
+    """
+    Datasets of the configs whose files are all on disk
+    """
+    dataset_names = []
+    for config_path in sorted(glob.glob('config/*.ini')):
+        dataset_name = os.path.splitext(os.path.basename(config_path))[0]
+        if dataset_name == 'config_template':
+            continue
+        try:
+            get_dataset_files(dataset_name)
+            dataset_names.append(dataset_name)
+        except (FileNotFoundError, KeyError, ValueError) as e:
+            logging.info(f"Skipping {dataset_name}: {e}")
+    return dataset_names
+
+def get_parsed_by(parser_backend, path, file_format):
+    """
+    Parser that actually parses a file with a backend: the formats a backend doesn't support are parsed by rdflib
+    """
+    if parser_backend == 'oxigraph' and get_oxigraph_format(file_format) is None:
+        return 'rdflib'
+    if parser_backend == 'ntriples' and not can_split(path, file_format):
+        return 'rdflib'
+    return parser_backend
+
+def benchmark_parsers(dataset_names, parser_backends, workers=1, repeat=1):
+    """
+    Parse time of each file of the datasets with each parser backend, the best of repeat runs
+    """
+    results = []
+    for dataset_name in dataset_names:
+        for kind, path, file_format in get_dataset_files(dataset_name):
+            for parser_backend in parser_backends:
+                elapsed_times = []
+                for _ in range(repeat):
+                    start_time = time.perf_counter()
+                    num_triples = len(parse_graph(path, file_format, parser_backend=parser_backend, workers=workers))
+                    elapsed_times.append(time.perf_counter() - start_time)
+                elapsed_time = min(elapsed_times)
+                results.append({
+                    "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "git_commit": get_git_commit(),
+                    "host": get_host_info(),
+                    "dataset_name": dataset_name,
+                    "file_kind": kind,
+                    "file_path": path,
+                    "file_format": file_format,
+                    "file_size": os.path.getsize(path),
+                    "parser_backend": parser_backend,
+                    "parsed_by": get_parsed_by(parser_backend, path, file_format),
+                    "workers": workers,
+                    "num_triples": num_triples,
+                    "elapsed_time": elapsed_time,
+                    "triples_per_second": num_triples / elapsed_time if elapsed_time else None
+                })
+    return results
+
+def log_parsers_summary(results):
+    rdflib_times = {(result["dataset_name"], result["file_path"]): result["elapsed_time"] for result in results if result["parser_backend"] == "rdflib"}
+    logging.info(f"{'dataset':<16}{'file':<36}{'backend':<10}{'triples':>10}{'time (s)':>10}{'triples/s':>12}{'speedup':>9}")
+    for result in results:
+        rdflib_time = rdflib_times.get((result["dataset_name"], result["file_path"]))
+        speedup = f"{rdflib_time / result['elapsed_time']:.2f}" if rdflib_time and result["elapsed_time"] else "-"
+        # * the backend doesn't support the format, the file was parsed by rdflib
+        backend = result["parser_backend"] + ("*" if result["parsed_by"] != result["parser_backend"] else "")
+        logging.info(f"{result['dataset_name']:<16}{os.path.basename(result['file_path']):<36}{backend:<10}{result['num_triples']:>10}"
+                     f"{result['elapsed_time']:>10.3f}{result['triples_per_second'] or 0:>12.1f}{speedup:>9}")
+
+def run_parsers_benchmark(args):
+    parser_backends = []
+    for parser_backend in args.backends:
+        try:
+            parser_backends.append(check_parser_backend(parser_backend))
+        except ImportError as e:
+            logging.warning(f"Skipping the {parser_backend} backend: {e}")
+
+    dataset_names = args.datasets or get_available_datasets()
+    results = benchmark_parsers(dataset_names, parser_backends, args.workers, args.repeat)
+    log_parsers_summary(results)
+    save_benchmark_results(results, args.output)
+
+
+# ------------------------------------------------------------------------------------------------------------------- #
+#                                       Start-up time
+# ------------------------------------------------------------------------------------------------------------------- #
+
+def get_startup_commands(dataset_name):
+    """
+    Commands whose start-up is measured: the help of the CLI, a metadata-only assessment, the modules of the dashboard
+    and a complete assessment (stored in the results store), so the imports moved out of the start-up are exercised
+    """
+    return {
+        "help": ["main.py", "--help"],
+        "metadata": ["main.py", "-d", dataset_name, "-rm", "--no-store"],
+        "dashboard": ["-c", "import dashboard_data"],
+        "assessment": ["main.py", "-d", dataset_name, "-ra"]
+    }
+
+def parse_importtime(output):
+    """
+    Modules of the -X importtime output of a command: [(module, depth, self time, cumulative time)], times in seconds
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative_time, name = line.removeprefix("import time:").split("|", 2)
+        # Nested imports are indented two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), depth, int(self_time) / 1e6, int(cumulative_time) / 1e6))
+    return modules
+
+def benchmark_startup(commands, repeat=5, top=10):
+    """
+    Wall time of each command (the fastest of repeat runs) and the import time of its modules (one more run with -X importtime).
+    The complete assessment runs once, with -X importtime. Returns the results and the commands that failed.
+    """
+    results, failed = [], []
+    for name, command in commands.items():
+        wall_times = []
+        for _ in range(repeat if name not in BENCHMARK_STARTUP_SINGLE_RUN_COMMANDS else 0):
+            start_time = time.perf_counter()
+            process = subprocess.run([sys.executable, *command], capture_output=True, text=True)
+            wall_times.append(time.perf_counter() - start_time)
+            if process.returncode != 0:
+                break
+        else:
+            start_time = time.perf_counter()
+            process = subprocess.run([sys.executable, "-X", "importtime", *command], capture_output=True, text=True)
+            if not wall_times:
+                wall_times.append(time.perf_counter() - start_time)
+
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"exit status {process.returncode}"
+            if error.startswith("ModuleNotFoundError"):
+                # e.g. the dashboard without streamlit/pandas installed
+                logging.warning(f"Skipping '{name}': {error}")
+            else:
+                logging.error(f"'{name}' failed: {' '.join(command)} ({error})")
+                failed.append(name)
+            continue
+
+        modules = parse_importtime(process.stderr)
+        top_level = sorted((module for module in modules if module[1] == 0), key=lambda module: -module[3])
+        imported = {module[0].split(".")[0] for module in modules}
+        results.append({
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": get_git_commit(),
+            "host": get_host_info(),
+            "command": name,
+            "argv": command,
+            "wall_time": min(wall_times),
+            "import_time": sum(module[3] for module in top_level),
+            "num_modules": len(modules),
+            "heavy_modules": [module for module in HEAVY_MODULES if module in imported],
+            "top_modules": {module: cumulative_time for module, _, _, cumulative_time in top_level[:top]}
+        })
+    return results, failed
+
+def log_startup_summary(results, previous_results):
+    # Last recorded result of each command, to see the change
+    previous = {result["command"]: result for result in previous_results}
+    logging.info(f"{'command':<12}{'wall (s)':>10}{'previous':>10}{'imports (s)':>13}{'modules':>9}  heavy modules")
+    for result in results:
+        previous_time = previous.get(result["command"], {}).get("wall_time")
+        previous_time = f"{previous_time:.3f}" if previous_time is not None else "-"
+        logging.info(f"{result['command']:<12}{result['wall_time']:>10.3f}{previous_time:>10}"
+                     f"{result['import_time']:>13.3f}{result['num_modules']:>9}  {', '.join(result['heavy_modules']) or '-'}")
+        for module, cumulative_time in result["top_modules"].items():
+            logging.info(f"{'':<12}{module:<32}{cumulative_time:>10.3f}")
+
+def run_startup_benchmark(args):
+    commands = get_startup_commands(args.dataset)
+    if args.commands:
+        commands = {name: command for name, command in commands.items() if name in args.commands}
+    previous_results = load_json(args.output) or []
+    results, failed = benchmark_startup(commands, args.repeat, args.top)
+    log_startup_summary(results, previous_results)
+    save_benchmark_results(results, args.output)
+    if failed:
+        sys.exit(1)
+
+
+# ------------------------------------------------------------------------------------------------------------------- #
+#                                       Regression gate
+# ------------------------------------------------------------------------------------------------------------------- #
+
+def get_baseline_path(baseline_name):
+    return f'{BENCHMARK_BASELINES_FOLDER_PATH}/{baseline_name}.json'
+
+def get_latest_results(results_path, dataset_names=None):
+    """
+    Latest benchmark result of each dataset in the results file
+    """
+    latest_results = {}
+    for result in load_json(results_path) or []:
+        if not dataset_names or result["dataset_name"] in dataset_names:
+            latest_results[result["dataset_name"]] = result
+    return latest_results
+
+def get_run_info_results(dataset_names):
+    """
+    Results of the last main.py --profile run of each dataset
+    """
+    run_info = load_json("run_info.json")
+    run_profile = load_json(RUN_PROFILE_FILE_PATH)
+    results = {}
+    for dataset_name in dataset_names:
+        if dataset_name not in run_info or dataset_name not in run_profile:
+            logging.warning(f"No profiled run of {dataset_name} in run_info.json/{RUN_PROFILE_FILE_PATH} (run main.py with --profile)")
+            continue
+        results[dataset_name] = collect_run_results(dataset_name)
+    return results
+
+def replay_benchmark(baseline, skip_generation=False):
+    """
+    Runs again the benchmark of each dataset of the baseline. Synthetic datasets are regenerated
+    with the same parameters (the generation is deterministic for a given seed).
+    """
+    results = {}
+    for dataset_name, baseline_result in baseline["datasets"].items():
+        generation = baseline_result.get("generation")
+        scale = baseline_result.get("scale")
+        generation_stats = None
+        generation_time = None
+        if scale and generation and not (skip_generation and os.path.exists(f'config/{dataset_name}.ini')):
+            start_time = time.perf_counter()
+            _, generation_stats = generate_synthetic_dataset(scale, generation["vocabularies"], generation["violation_rates"],
+                                                             generation["seed"], generation.get("uris_max_length", 80))
+            generation_time = time.perf_counter() - start_time
+        results[dataset_name] = benchmark_dataset(dataset_name, generation_stats, generation_time,
+                                                  baseline_result.get("assessment", "-ra"), scale)
+    return results
+
+
+def flatten_phases(result):
+    """
+    stage.phase -> elapsed time & peak memory, plus the whole run as 'run.total'
+    """
+    phases = {"run.total": {"elapsed_time": result["total_elapsed_time"], "peak_rss": result["peak_rss"]}}
+    for stage, stage_phases in result.get("phases", {}).items():
+        for phase, info in stage_phases.items():
+            phases[f"{stage}.{phase}"] = info
+    return phases
+
+def compare_value(baseline_value, current_value, tolerance, min_diff):
+    if baseline_value is None or current_value is None:
+        return "-"
+    diff = current_value - baseline_value
+    if diff > baseline_value * tolerance and diff > min_diff:
+        return "REGRESSION"
+    if -diff > baseline_value * tolerance and -diff > min_diff:
+        return "improved"
+    return "ok"
+
+def compare_results(baseline_results, current_results, time_tolerance=BENCHMARK_TIME_TOLERANCE,
+                    memory_tolerance=BENCHMARK_MEMORY_TOLERANCE, min_time_diff=BENCHMARK_MIN_TIME_DIFF,
+                    min_memory_diff=BENCHMARK_MIN_MEMORY_DIFF):
+    """
+    Compares the time & peak memory of each phase of each dataset against the baseline.
+    Returns the rows of the diff table and whether any phase regressed.
+    """
+    rows = []
+    for dataset_name, baseline_result in baseline_results.items():
+        if dataset_name not in current_results:
+            rows.append({"dataset": dataset_name, "phase": "-", "measure": "-", "baseline": None, "current": None, "status": "missing"})
+            continue
+        current_result = current_results[dataset_name]
+        if baseline_result.get("num_triples") != current_result.get("num_triples"):
+            logging.warning(f"{dataset_name}: the baseline has {baseline_result.get('num_triples')} triples and the current run {current_result.get('num_triples')}")
+
+        baseline_phases = flatten_phases(baseline_result)
+        current_phases = flatten_phases(current_result)
+        for phase in list(baseline_phases) + [phase for phase in current_phases if phase not in baseline_phases]:
+            if phase not in current_phases or phase not in baseline_phases:
+                rows.append({"dataset": dataset_name, "phase": phase, "measure": "-", "baseline": None, "current": None,
+                             "status": "missing" if phase not in current_phases else "new"})
+                continue
+            for measure, tolerance, min_diff in (("elapsed_time", time_tolerance, min_time_diff),
+                                                 ("peak_rss", memory_tolerance, min_memory_diff)):
+                baseline_value = baseline_phases[phase].get(measure)
+                current_value = current_phases[phase].get(measure)
+                rows.append({
+                    "dataset": dataset_name,
+                    "phase": phase,
+                    "measure": measure,
+                    "baseline": baseline_value,
+                    "current": current_value,
+                    "status": compare_value(baseline_value, current_value, tolerance, min_diff)
+                })
+
+    regression = any(row["status"] == "REGRESSION" for row in rows)
+    return rows, regression
+
+def format_value(measure, value):
+    if value is None:
+        return "-"
+    if measure == "peak_rss":
+        return f"{value / 2**20:.1f} MB"
+    return f"{value:.3f} s"
+
+def log_comparison(rows, show_all=False):
+    logging.info(f"{'dataset':<24}{'phase':<34}{'measure':<14}{'baseline':>14}{'current':>14}{'change':>10}  status")
+    for row in rows:
+        if not show_all and row["status"] in ("ok", "-"):
+            continue
+        if row["baseline"] and row["current"] is not None:
+            change = f"{(row['current'] - row['baseline']) / row['baseline']:+.1%}"
+        else:
+            change = "-"
+        logging.info(f"{row['dataset']:<24}{row['phase']:<34}{row['measure']:<14}"
+                     f"{format_value(row['measure'], row['baseline']):>14}{format_value(row['measure'], row['current']):>14}"
+                     f"{change:>10}  {row['status']}")
+
+
+def save_baseline(args):
+    if args.run_info:
+        results = get_run_info_results(args.datasets or [])
+    else:
+        results = get_latest_results(args.results, args.datasets)
+    if not results:
+        raise Exception("No benchmark results to store as baseline, run benchmark.py run first")
+
+    baseline_path = get_baseline_path(args.name)
+    os.makedirs(BENCHMARK_BASELINES_FOLDER_PATH, exist_ok=True)
+    baseline = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": get_git_commit(),
+        "host": get_host_info(),
+        "datasets": results
+    }
+    with open(baseline_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=4)
+    logging.info(f"Baseline of {', '.join(results)} saved in {baseline_path}")
+
+def compare_benchmark(args):
+    baseline_path = get_baseline_path(args.baseline)
+    if not os.path.exists(baseline_path):
+        raise FileNotFoundError(f"Baseline not found at path: {baseline_path} (create it with benchmark.py baseline)")
+    baseline = load_json(baseline_path)
+    dataset_names = args.datasets or list(baseline["datasets"])
+    baseline["datasets"] = {name: result for name, result in baseline["datasets"].items() if name in dataset_names}
+
+    host = get_host_info()
+    if (baseline["host"]["platform"], baseline["host"]["cpu_count"]) != (host["platform"], host["cpu_count"]):
+        logging.warning(f"The baseline was recorded on another host ({baseline['host']['platform']}, {baseline['host']['cpu_count']} CPUs)")
+
+    if args.run:
+        current_results = replay_benchmark(baseline, args.skip_generation)
+        save_benchmark_results(list(current_results.values()), args.results)
+    elif args.run_info:
+        current_results = get_run_info_results(dataset_names)
+    else:
+        current_results = get_latest_results(args.results, dataset_names)
+
+    rows, regression = compare_results(baseline["datasets"], current_results,
+                                       args.time_tolerance, args.memory_tolerance,
+                                       args.min_time_diff, args.min_memory_diff * 2**20)
+    log_comparison(rows, args.show_all)
+
+    if regression:
+        logging.error(f"Performance regression against the baseline {args.baseline} (commit {baseline.get('git_commit')})")
+        sys.exit(1)
+    logging.info(f"No performance regressions against the baseline {args.baseline}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the DQA on synthetic datasets of increasing scale")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Generate synthetic datasets, assess them and record throughput & memory")
+    run_parser.add_argument("--scales", nargs="*", default=["10K"], help="Number of triples of each synthetic dataset, e.g. 10K 100K 1M 100M")
+    run_parser.add_argument("--datasets", nargs="*", help="Existing datasets (config names) to benchmark as well, e.g. pizza")
+    run_parser.add_argument("--assessment", choices=["ra", "rd", "rm", "rv"], default="ra", help="Assessment to run (see main.py)")
+    run_parser.add_argument("--skip-generation", action="store_true", help="Reuse synthetic datasets that were already generated")
+    run_parser.add_argument("--output", default=BENCHMARK_RESULTS_FILE_PATH, help="File where the results are appended")
+    add_generation_arguments(run_parser)
+    run_parser.set_defaults(func=run_benchmark)
+
+    baseline_parser = subparsers.add_parser("baseline", help="Store the latest benchmark results as a baseline")
+    baseline_parser.add_argument("--name", default="default", help=f"Name of the baseline (stored in {BENCHMARK_BASELINES_FOLDER_PATH}/<name>.json)")
+    baseline_parser.add_argument("--datasets", nargs="*", help="Datasets to include (default: all the benchmarked datasets)")
+    baseline_parser.add_argument("--run-info", action="store_true", help=f"Take the results from run_info.json & {RUN_PROFILE_FILE_PATH} (main.py --profile) instead of the benchmark results")
+    baseline_parser.add_argument("--results", default=BENCHMARK_RESULTS_FILE_PATH, help="Benchmark results file")
+    baseline_parser.set_defaults(func=save_baseline)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare the time & memory of each phase against a baseline, exits with 1 on regressions")
+    compare_parser.add_argument("--baseline", default="default", help="Name of the baseline")
+    compare_parser.add_argument("--datasets", nargs="*", help="Datasets to compare (default: all the datasets of the baseline)")
+    source_group = compare_parser.add_mutually_exclusive_group()
+    source_group.add_argument("--run", action="store_true", help="Replay the benchmark of the baseline datasets before comparing")
+    source_group.add_argument("--run-info", action="store_true", help=f"Compare the runs in run_info.json & {RUN_PROFILE_FILE_PATH} (main.py --profile)")
+    compare_parser.add_argument("--skip-generation", action="store_true", help="Reuse the synthetic datasets when replaying the benchmark")
+    compare_parser.add_argument("--results", default=BENCHMARK_RESULTS_FILE_PATH, help="Benchmark results file")
+    compare_parser.add_argument("--time-tolerance", type=float, default=BENCHMARK_TIME_TOLERANCE, help="Allowed relative increase of the time of a phase")
+    compare_parser.add_argument("--memory-tolerance", type=float, default=BENCHMARK_MEMORY_TOLERANCE, help="Allowed relative increase of the peak memory of a phase")
+    compare_parser.add_argument("--min-time-diff", type=float, default=BENCHMARK_MIN_TIME_DIFF, help="Time differences (s) below this are never regressions")
+    compare_parser.add_argument("--min-memory-diff", type=float, default=BENCHMARK_MIN_MEMORY_DIFF / 2**20, help="Memory differences (MB) below this are never regressions")
+    compare_parser.add_argument("--show-all", action="store_true", help="Show every phase in the diff table, not only the changed ones")
+    compare_parser.set_defaults(func=compare_benchmark)
+
+    parse_parser = subparsers.add_parser("parse", help="Parse throughput (triples/s) of an N-Triples file versus the number of workers")
+    parse_parser.add_argument("--file", help="N-Triples file, e.g. datasets/drugbank/drugbank_data.nt (default: a synthetic dataset of --scale triples)")
+    parse_parser.add_argument("--scale", default="100K", help="Number of triples of the synthetic dataset when no file is given")
+    parse_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()], help="Numbers of worker processes to measure")
+    parse_parser.add_argument("--repeat", type=int, default=1, help="Runs of each measure, the fastest one is kept")
+    parse_parser.add_argument("--output", default=BENCHMARK_PARSE_RESULTS_FILE_PATH, help="File where the results are appended")
+    add_generation_arguments(parse_parser)
+    parse_parser.set_defaults(func=run_parse_benchmark)
+
+    parsers_parser = subparsers.add_parser("parsers", help="Parse time of each parser backend on the files (data, metadata & vocabularies) of the datasets")
+    parsers_parser.add_argument("--datasets", nargs="*", help="Datasets (config names) whose files are parsed (default: every config whose files are on disk)")
+    parsers_parser.add_argument("--backends", nargs="+", choices=PARSER_BACKENDS, default=list(PARSER_BACKENDS), help="Parser backends to measure")
+    parsers_parser.add_argument("--workers", type=int, default=1, help="Worker processes of the ntriples backend")
+    parsers_parser.add_argument("--repeat", type=int, default=3, help="Runs of each measure, the fastest one is kept")
+    parsers_parser.add_argument("--output", default=BENCHMARK_PARSERS_RESULTS_FILE_PATH, help="File where the results are appended")
+    parsers_parser.set_defaults(func=run_parsers_benchmark)
+
+    startup_parser = subparsers.add_parser("startup", help="Start-up time of the CLI & dashboard and the import time of their modules (-X importtime)")
+    startup_parser.add_argument("--dataset", default="pizza", help="Dataset (config name) of the metadata-only assessment")
+    startup_parser.add_argument("--commands", nargs="*", choices=["help", "metadata", "dashboard", "assessment"], help="Commands to measure (default: all)")
+    startup_parser.add_argument("--repeat", type=int, default=5, help="Runs of each command, the fastest one is kept")
+    startup_parser.add_argument("--top", type=int, default=10, help="Modules with the highest import time listed per command")
+    startup_parser.add_argument("--output", default=BENCHMARK_STARTUP_RESULTS_FILE_PATH, help="File where the results are appended")
+    startup_parser.set_defaults(func=run_startup_benchmark)
+
+    args = parser.parse_args()
+    args.func(args)
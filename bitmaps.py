@@ -0,0 +1,162 @@
+from array import array
+from bisect import bisect_left
+
+try:
+    from pyroaring import BitMap
+except ImportError: # optional, the pure python bitmap is used instead
+    BitMap = None
+
+# Containers with more values than this are stored as bitmaps instead of sorted arrays
+ARRAY_CONTAINER_MAX_SIZE = 4096
+BITMAP_CONTAINER_BYTES = 8192 # 2^16 bits
+
+
+def _array_to_bitmap(values):
+    bitmap = bytearray(BITMAP_CONTAINER_BYTES)
+    for value in values:
+        bitmap[value >> 3] |= 1 << (value & 7)
+    return bitmap
+
+def _bitmap_to_int(bitmap):
+    return int.from_bytes(bitmap, 'little')
+
+def _int_to_container(bits):
+    """
+    Container (sorted array or bitmap) of the bits set in an integer
+    """
+    if bits.bit_count() > ARRAY_CONTAINER_MAX_SIZE:
+        return bytearray(bits.to_bytes(BITMAP_CONTAINER_BYTES, 'little'))
+    values = array('H')
+    while bits:
+        lowest = bits & -bits
+        values.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return values
+
+def _container_to_int(container):
+    if isinstance(container, bytearray):
+        return _bitmap_to_int(container)
+    bits = 0
+    for value in container:
+        bits |= 1 << value
+    return bits
+
+
+class RoaringBitmap:
+    """
+        Compressed set of 32-bit integers (pure python version of a roaring bitmap).
+        Integers are split by their 16 high bits in containers that are sorted arrays of the
+        16 low bits while small, and 8 KB bitmaps when they have more than 4096 values.
+        Implements the subset of pyroaring's BitMap used to store violations.
+    """
+    def __init__(self, values=()):
+        # high 16 bits -> container
+        self.containers = {}
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        high, low = value >> 16, value & 0xFFFF
+        container = self.containers.get(high)
+        if container is None:
+            self.containers[high] = array('H', [low])
+        elif isinstance(container, bytearray):
+            container[low >> 3] |= 1 << (low & 7)
+        else:
+            position = bisect_left(container, low)
+            if position < len(container) and container[position] == low:
+                return
+            container.insert(position, low)
+            if len(container) > ARRAY_CONTAINER_MAX_SIZE:
+                self.containers[high] = _array_to_bitmap(container)
+
+    def __contains__(self, value):
+        container = self.containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, bytearray):
+            return bool(container[low >> 3] & (1 << (low & 7)))
+        position = bisect_left(container, low)
+        return position < len(container) and container[position] == low
+
+    def __len__(self):
+        return sum(_bitmap_to_int(container).bit_count() if isinstance(container, bytearray) else len(container)
+                   for container in self.containers.values())
+
+    def __iter__(self):
+        for high in sorted(self.containers):
+            container = self.containers[high]
+            if isinstance(container, bytearray):
+                bits = _bitmap_to_int(container)
+                while bits:
+                    lowest = bits & -bits
+                    yield (high << 16) | (lowest.bit_length() - 1)
+                    bits ^= lowest
+            else:
+                for low in container:
+                    yield (high << 16) | low
+
+    def _combine(self, other, operation, keep_missing):
+        result = RoaringBitmap()
+        highs = set(self.containers) | set(other.containers) if keep_missing else set(self.containers)
+        for high in highs:
+            bits = operation(_container_to_int(self.containers.get(high, ())),
+                             _container_to_int(other.containers.get(high, ())))
+            if bits:
+                result.containers[high] = _int_to_container(bits)
+        return result
+
+    def __or__(self, other):
+        return self._combine(other, lambda a, b: a | b, keep_missing=True)
+
+    def __and__(self, other):
+        return self._combine(other, lambda a, b: a & b, keep_missing=False)
+
+    def __sub__(self, other):
+        return self._combine(other, lambda a, b: a & ~b, keep_missing=False)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f'RoaringBitmap({list(self)})'
+
+
+def new_bitmap(values=()):
+    """
+    Bitmap of integers: pyroaring's BitMap when it's installed, RoaringBitmap otherwise
+    """
+    if BitMap is not None:
+        return BitMap(values)
+    return RoaringBitmap(values)
+
+
+class EntityDictionary:
+    """
+        Dictionary encoding of the entities (rdflib terms) to consecutive integer IDs,
+        so that sets of entities can be stored as bitmaps
+    """
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+
+    def encode(self, term):
+        entity_id = self.ids.get(term)
+        if entity_id is None:
+            entity_id = len(self.terms)
+            self.ids[term] = entity_id
+            self.terms.append(term)
+        return entity_id
+
+    def decode(self, entity_id):
+        return self.terms[entity_id]
+
+    def decode_all(self, bitmap):
+        """
+        Terms of the IDs of a bitmap (only needed when the violations are exported)
+        """
+        return [self.terms[entity_id] for entity_id in bitmap]
+
+    def __len__(self):
+        return len(self.terms)
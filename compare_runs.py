@@ -0,0 +1,113 @@
+import sys
+import json
+import logging
+import argparse
+from itertools import islice
+
+from const import RESULTS_STORE_FILE_PATH
+from bitmaps import new_bitmap
+from results_store import ResultsStore
+
+logging.basicConfig(level=logging.INFO)
+
+
+def get_compared_runs(store, dataset, run_a=None, run_b=None):
+    """
+    Runs to compare, by default the last run of the dataset (b) and the one before (a)
+    """
+    if run_b is None:
+        run_b = store.get_previous_run_id(dataset)
+    if run_a is None and run_b is not None:
+        run_a = store.get_previous_run_id(dataset, run_b)
+    if run_a is None or run_b is None:
+        raise ValueError(f"The results store needs two runs of {dataset} to compare them")
+    return run_a, run_b
+
+def compare_runs(store, run_a, run_b):
+    """
+    Per metric (shape & vocab) score delta and violating entities added/removed from run a to run b.
+    The entity IDs of the store are the same in every run, so the violations are diffed as bitmaps of IDs.
+    """
+    results_a, results_b = store.get_metric_results(run_a), store.get_metric_results(run_b)
+    violations_a, violations_b = store.get_violation_ids(run_a), store.get_violation_ids(run_b)
+
+    comparison = []
+    for key in sorted(set(results_a) | set(results_b)):
+        result_a, result_b = results_a.get(key, {}), results_b.get(key, {})
+        bitmap_a, bitmap_b = new_bitmap(violations_a.get(key, ())), new_bitmap(violations_b.get(key, ()))
+        added, removed = bitmap_b - bitmap_a, bitmap_a - bitmap_b
+
+        score_a, score_b = result_a.get('score'), result_b.get('score')
+        comparison.append({
+            "dimension": result_b.get('dimension', result_a.get('dimension')),
+            "metric_id": result_b.get('metric_id', result_a.get('metric_id')),
+            "shape_name": key[0],
+            "vocab": key[1],
+            "score_a": score_a,
+            "score_b": score_b,
+            "score_delta": None if score_a is None or score_b is None else score_b - score_a,
+            "num_violations_a": result_a.get('num_violations'),
+            "num_violations_b": result_b.get('num_violations'),
+            "num_added": len(added),
+            "num_removed": len(removed),
+            "added": added,
+            "removed": removed
+        })
+    return comparison
+
+def get_changes(comparison):
+    """
+    Metrics whose score or violating entities changed
+    """
+    return [row for row in comparison if row['num_added'] or row['num_removed'] or row['score_delta']]
+
+def to_dict(store, comparison, max_entities=None):
+    """
+    Comparison with the IRIs of the added/removed entities (the first max_entities of each)
+    """
+    rows = []
+    for row in comparison:
+        row = dict(row)
+        for field in ('added', 'removed'):
+            entity_ids = list(islice(row[field], max_entities))
+            row[field] = store.get_iris(entity_ids)
+        rows.append(row)
+    return rows
+
+
+def log_comparison(dataset, run_a, run_b, rows, num_metrics, max_entities):
+    changes = get_changes(rows)
+    logging.info(f"{dataset}: {len(changes)} of {num_metrics} metrics changed from run {run_a} to run {run_b}")
+    for row in changes:
+        delta = '' if not row['score_delta'] else f"score {row['score_a']} -> {row['score_b']} ({row['score_delta']:+.4f}), "
+        vocab = f" [{row['vocab']}]" if row['vocab'] else ''
+        logging.info(f"  {row['shape_name']}{vocab}: {delta}+{row['num_added']} / -{row['num_removed']} violating entities")
+        for field in ('added', 'removed'):
+            for iri in row[field][:max_entities]:
+                logging.info(f"    {'+' if field == 'added' else '-'} {iri}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares two runs of a dataset stored in the results store")
+    parser.add_argument("-d", required=True, help="Dataset name")
+    parser.add_argument("--run-a", type=int, help="Run ID of the older run (default: the run before run b)")
+    parser.add_argument("--run-b", type=int, help="Run ID of the newer run (default: the last run)")
+    parser.add_argument("--store", default=RESULTS_STORE_FILE_PATH, help="SQLite file of the results store")
+    parser.add_argument("--max-entities", type=int, default=10, help="Added/removed entities shown (and stored in --output) per metric")
+    parser.add_argument("--all", action="store_true", help="Include the metrics that didn't change in --output")
+    parser.add_argument("--output", help="JSON file where the comparison is stored")
+    args = parser.parse_args()
+
+    with ResultsStore(args.store) as store:
+        try:
+            run_a, run_b = get_compared_runs(store, args.d, args.run_a, args.run_b)
+        except ValueError as e:
+            logging.error(e)
+            sys.exit(1)
+        comparison = compare_runs(store, run_a, run_b)
+        rows = to_dict(store, comparison if args.all else get_changes(comparison), args.max_entities)
+
+    log_comparison(args.d, run_a, run_b, rows, len(comparison), args.max_entities)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"dataset": args.d, "run_a": run_a, "run_b": run_b, "metrics": rows}, f, indent=4)
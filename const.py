@@ -13,6 +13,87 @@ PROFILE_VOCABULARIES_FOLDER_PATH = 'profile/vocabularies'
 PROFILE_DATASETS_FOLDER_PATH = 'profile/datasets'
 # Stores shapes
 SHAPES_FOLDER_PATH = 'shapes'
+# Stores the per-phase and per-shape profile of the runs (main.py --profile)
+RUN_PROFILE_FILE_PATH = 'run_profile.json'
+# History of the runs: scores, timings and violating entities (results_store.py)
+RESULTS_STORE_FILE_PATH = 'results_store.sqlite'
+
+# Settings of a dataset config ([settings] & each vocabulary section), checked by main.py before the assessment starts
+CONFIG_REQUIRED_SETTINGS = ('dataset_name', 'graph_file', 'metadata_file', 'metadata_file_format', 'metadata_class',
+                            'type_property', 'labeling_property', 'description_property', 'interlinking_property',
+                            'base_namespace', 'uris_max_length', 'vocabularies')
+CONFIG_REQUIRED_VOCABULARY_SETTINGS = ('vocab_name', 'file_path', 'file_format')
+# Assessment daemon (daemon.py): local address of the API, jobs run at the same time and parsed graphs kept in memory
+DAEMON_HOST = '127.0.0.1'
+DAEMON_PORT = 8765
+DAEMON_CONCURRENCY = 1
+DAEMON_CACHE_SIZE = 16
+# Finished jobs kept in the job list of the API
+DAEMON_MAX_FINISHED_JOBS = 100
+
+# Watch mode (main.py --watch): seconds between the checks of the input files, seconds without changes before
+# re-assessing (files written in several steps) and parsed graphs kept in memory between the runs
+WATCH_INTERVAL = 1.0
+WATCH_DEBOUNCE = 0.5
+WATCH_CACHE_SIZE = 16
+# Stores the results of the benchmarks (benchmark.py)
+BENCHMARKS_FOLDER_PATH = 'benchmarks'
+BENCHMARK_RESULTS_FILE_PATH = f'{BENCHMARKS_FOLDER_PATH}/benchmark_results.json'
+# Parse throughput of the N-Triples loader per number of workers (benchmark.py parse)
+BENCHMARK_PARSE_RESULTS_FILE_PATH = f'{BENCHMARKS_FOLDER_PATH}/parse_results.json'
+# Parse speed of each parser backend on the files of the datasets (benchmark.py parsers)
+BENCHMARK_PARSERS_RESULTS_FILE_PATH = f'{BENCHMARKS_FOLDER_PATH}/parsers_results.json'
+# Start-up time & import time of the commands (benchmark.py startup), and the heavy packages each one imports
+BENCHMARK_STARTUP_RESULTS_FILE_PATH = f'{BENCHMARKS_FOLDER_PATH}/startup_results.json'
+HEAVY_MODULES = ('rdflib', 'pyshacl', 'jinja2', 'pyarrow', 'psutil', 'pandas', 'plotly', 'streamlit')
+# Commands of the start-up benchmark that run once (a complete assessment, it checks that the lazy imports still work)
+BENCHMARK_STARTUP_SINGLE_RUN_COMMANDS = ('assessment',)
+# Stores the baselines the benchmark results are compared against (benchmark.py compare)
+BENCHMARK_BASELINES_FOLDER_PATH = f'{BENCHMARKS_FOLDER_PATH}/baselines'
+# A phase regresses when it's slower/bigger than the baseline by more than the tolerance (relative)
+# and by more than the min. difference (absolute), so that phases of a few ms don't fail because of noise
+BENCHMARK_TIME_TOLERANCE = 0.2
+BENCHMARK_MEMORY_TOLERANCE = 0.1
+BENCHMARK_MIN_TIME_DIFF = 0.5 # seconds
+BENCHMARK_MIN_MEMORY_DIFF = 16 * 2**20 # bytes
+
+# Approximate assessment (main.py --approximate): the sample size is chosen so that the
+# entity ratios are estimated within the target error at the given confidence
+APPROXIMATE_TARGET_ERROR = 0.05
+APPROXIMATE_CONFIDENCE = 0.95
+
+# Precision of the HyperLogLog sketches used in the profile when exact_counts = false
+# (2^precision bytes per property & class, relative standard error 1.04 / sqrt(2^precision))
+HLL_DEFAULT_PRECISION = 14
+
+# Synthetic datasets (synthetic_dataset.py)
+SYNTHETIC_DEFAULT_VOCABULARIES = ('foaf', 'dcterms', 'skos')
+SYNTHETIC_DEFAULT_VIOLATION_RATE = 0.05
+# Generation stats (triples, injected violations) stored in the dataset folder
+SYNTHETIC_STATS_FILE_NAME = 'synthetic_stats.json'
+
+# Violations store (violations_format = parquet): one row per violation, sorted by metric & shape
+# Per-stage results files (results_format)
+RESULTS_FORMATS = ('json', 'ndjson')
+
+# Parsers of the RDF files (parser_backend): rdflib, Oxigraph's native parsers (oxrdflib) or the chunked N-Triples loader
+PARSER_BACKENDS = ('rdflib', 'oxigraph', 'ntriples')
+
+VIOLATIONS_FORMATS = ('csv', 'parquet')
+VIOLATIONS_COLUMNS = ('stage', 'metric', 'shape', 'focus_node', 'value', 'vocab')
+VIOLATIONS_ROW_GROUP_SIZE = 64 * 1024
+
+# Time budget (main.py --time-budget): the partial data results are written every interval (seconds)
+SCHEDULER_CHECKPOINT_INTERVAL = 30
+
+# Named graphs: lines buffered while the N-Quads are split, then appended to the file of each graph
+# (a file per graph can't be kept open, there can be thousands of graphs)
+NAMED_GRAPH_SPLIT_BUFFER_LINES = 100000
+
+# Violations shown per page in the streamlit dashboard
+DASHBOARD_VIOLATIONS_PAGE_SIZE = 100
+# Seconds between the checks of the results CSV when the dashboard reloads the results as they change
+DASHBOARD_REFRESH_INTERVAL = 2
 
 # Stores template for the results of shapes that will be validated against the data
 DQ_MEASURES_DATA_GENERIC_TEMPLATE_FILE_PATH = f'{METRICS_TEMPLATE_FOLDER_PATH}/dq_measures_data_generic_template.json'
@@ -22,12 +103,13 @@ DQ_MEASURES_METADATA_TEMPLATE_FILE_PATH = f'{METRICS_TEMPLATE_FOLDER_PATH}/dq_me
 # Stores template for the results of shapes that will be validated against the data
 # but to be able to instantiate this shapes we need to extract some metadata from the
 # vocabularies/ontologies
-DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH = f'{METRICS_TEMPLATE_FOLDER_PATH}/dq_measures_data_specific_temp.json'
+# (one per dataset, so that several assessments can run at the same time, e.g. the named graphs of a dataset)
+DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH = f'{METRICS_TEMPLATE_FOLDER_PATH}/dq_measures_data_specific_temp_{{dataset_name}}.json'
 
 # Stores template for the resuls of shapes that will be validated against vocabularies/ontologies
 DQ_MEASURES_VOCABULARIES_TEMPLATE_FILE_PATH = f'{METRICS_TEMPLATE_FOLDER_PATH}/dq_measures_vocabulary_template.json'
 # Same as above but stores results for shapes that need to be instantiated
-DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH = f'{METRICS_TEMPLATE_FOLDER_PATH}/dq_measures_vocabulary_specific_temp.json'
+DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH = f'{METRICS_TEMPLATE_FOLDER_PATH}/dq_measures_vocabulary_specific_temp_{{dataset_name}}.json'
 
 # Helper data structures for Data Quality Assessment
 BINARY_METRICS_DATA = {"MisplacedProperties", 
@@ -340,6 +422,283 @@ DQ_MEASURES_VOCABULARY_SPECIFIC = {
     }
 }
 
+# Rows of the results CSV of the metrics aggregated over the shapes of a family
+# (one shape per class/property), the score, message and violations are set by the ResultsAggregator
+AGGREGATED_METRICS_INFO = {
+    "misplaced_properties": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN2',
+        'metric': 'No misplaced classes or properties',
+        'metric_description': 'Verifies that properties aren\'t used as classes',
+        'score': 0,
+        'message': 'properties are used as classes',
+        'metric_type': 'binary',
+        'metric_calculation': "0 if property is used as a class, 1 otherwise.",
+        "meta_metric_calculation": "Number of correctly used properties / Number of properties defined in vocabularies",
+        'shape_name': 'MisplacedPropertiesShape',
+        "shape_template": "ex:MisplacedPropertiesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetNode PROPERTY_URI;\\n\\tsh:property [\\n\\tsh:path [sh:inversePath rdf:type];\\n\\tsh:maxCount 0;\\n\\t].",
+        'violations': '',
+        "violation_text": "properties used as a classes",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "misplaced_classes": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN2',
+        'metric': 'No misplaced classes or properties',
+        'metric_description': 'Verifies that classes aren\'t used as properties',
+        'score': 0,
+        'message': 'classes are used as properties',
+        'metric_type': 'binary',
+        'metric_calculation': "0 if property is used as a class, 1 otherwise.",
+        "meta_metric_calculation": "Number of correctly used classes / Number of classes defined in vocabularies",
+        'shape_name': 'MisplacedClassesShape',
+        "shape_template": "ex:MisplacedClassesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf rdf:type;\\n\\tsh:or (\\n\\t[sh:path rdf:type; sh:hasValue rdfs:Class;]\\n\\t[sh:path rdf:type; sh:hasValue rdf:Property;]\\n\\t[sh:path rdf:type; sh:hasValue owl:NamedIndividual;]\\n\\t[\\n\\tsh:path CLASS_URI;\\n\\tsh:maxCount 0;\\n\\t]\\n\\t).",
+        'violations': '',
+        "violation_text": "classes used as a property",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "correct_range": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN9',
+        'metric': 'Correct domain and range definition',
+        'metric_description': 'Verifies that properties are used with the correct range.',
+        'score': 0,
+        'message': 'are used with incorrect range',
+        'metric_type': 'count',
+        'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
+        'meta_metric_calculation': 'Number of properties used with a correct range / Number of properties with a defined range',
+        'shape_name': 'CorrectRangeShape',
+        "shape_template": "ex:CorrectRangeShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:property [\\nsh:path PROPERTY_URI;\\nsh:datatype DATATYPE; % or sh:class CLASS\\n].\\n\\nex:CorrectRangeShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:property [\\nsh:path PROPERTY_URI;\\nsh:nodeKind sh:BlankNodeOrIRI;\\n].\\n\\nex:CorrectRangeShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:property [\\nsh:path PROPERTY_URI;\\nsh:nodeKind sh:Literal;\\n].\\n\\nex:CorrectRangeShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:property [\\nsh:path PROPERTY_URI;\\nsh:or (\\n[ sh:nodeKind sh:BlankNodeOrIri; ]\\n[ sh:nodeKind sh:Literal; ]\\n);\\n].",
+        'violations': '',
+        "violation_text": "(property, individual score)",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "correct_domain": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN9',
+        'metric': 'Correct domain and range definition.',
+        'metric_description': 'Verifies that properties are used with the correct domain.',
+        'score': 0,
+        'message': 'properties are used with incorrect domains',
+        'metric_type': 'count',
+        'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
+        "meta_metric_calculation": "Number of properties used with their correct domain / Number of properties with a defined domain",
+        'shape_name': 'CorrectDomainShape',
+        "shape_template": "ex:CorrectDomainShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:class CLASS.\\n\\nex:CorrectDomainShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:nodeKind sh:BlankNodeOrIRI.",
+        'violations': '',
+        "violation_text": "(property, individual score)",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "entities_disjoint_classes": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN1',
+        'metric': 'No use of entities as members of disjoint classes',
+        'metric_description': 'Verifies there are no entities that are members of disjoint classes.',
+        'score': 0,
+        'message': 'classes have instances of disjoint classes',
+        'metric_type': 'count',
+        'metric_calculation': '1 - (Number of violations / Number of entities of the target class)',
+        "meta_metric_calculation": "Number of classes with no member as instance of a disjoint class / Number of disjoint classes",
+        'shape_name': 'EntitiesDisjointClassesShape',
+        "shape_template": "ex:EntitiesDisjointClassesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetClass CLASS_URI;\\n\\tsh:not [ sh:class DISJOINT_CLASS_URI].",
+        'violations': '',
+        "violation_text": "(disjoint class, individual score)",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "irreflexive_property": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN10',
+        'metric': 'No inconsistent values',
+        'metric_description': 'Verifies the correct usage of irreflexive properties.',
+        'score': 0,
+        'message': 'properties don\'t conform to their irreflexive characteristic',
+        'metric_type': 'count',
+        'metric_calculation': '1 - (Number of violations / Number of subjects that use the property)',
+        "meta_metric_calculation": "Number of irreflexive properties correctly used / Number of irreflexive properties",
+        'shape_name': 'IrreflexivePropertyShape',
+        "shape_template": "ex:IrreflexivePropertyShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:disjoint PROPERTY_URI.",
+        'violations': '',
+        "violation_text": "(irreflexive property, individual score)",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "self_descriptive_format_properties": {
+        "dimension": 'Interpretability',
+        "metric_id": "ITP1",
+        "metric": "Use of self-descriptive formats",
+        'metric_description': 'Verifies if properties use IRIs as values',
+        'score': 0,
+        'message': 'properties use at least one literal or blank node',
+        'metric_type': 'count',
+        'metric_calculation': '1 if the property uses IRIs as values, 0 otherwise.',
+        "meta_metric_calculation": "Number of properties that have IRIs as values / Number of properties used in the dataset",
+        'shape_name': 'SelfDescriptiveFormatPropertiesShape',
+        "shape_template": "ex:SelfDescriptiveFormatPropertiesShape\\na sh:NodeShape ;\\nsh:targetObjectsOf PROPERTY_URI;\\nsh:nodeKind sh:IRI.",
+        'violations': '',
+        "violation_text": "properties used with blank nodes or literals",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "misuse_object_properties": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN3',
+        'metric': 'No misuse of owl:DatatypeProperty or owl:ObjectProperty',
+        'metric_description': 'Verifies that owl:ObjectProperty aren\'t used with Literals',
+        'score': 0,
+        'message': 'object properties are used with literals or blank nodes',
+        'metric_type': 'count',
+        'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
+        "meta_metric_calculation": "Number of owl:ObjectProperty correctly used / Number of owl:ObjectProperty used in the dataset",
+        'shape_name': 'MisuseOwlObjectPropertiesShape',
+        "shape_template": "ex:MisuseObjectPropertiesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\t\\tsh:path PROPERTY_URI;\\n\\t\\tsh:nodeKind sh:BlankNodeOrIRI;\\n\\t].",
+        'violations': '',
+        "violation_text": "(object property, individual score)",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "misuse_datatype_properties": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN3',
+        'metric': 'No misuse of owl:DatatypeProperty or owl:ObjectProperty',
+        'metric_description': 'Verifies that owl:DatatypeProperty are used with Literals',
+        'score': 0,
+        'message': 'datatype properties are used with IRIs',
+        'metric_type': 'count',
+        'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
+        "meta_metric_calculation": "Number of owl:DatatypeProperty correctly used / Number of owl:DatatypeProperty used in the",
+        'shape_name': 'MisuseOwlDatatypePropertiesShape',
+        "shape_template": "ex:MisuseDatatypePropertiesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\tsh:path PROPERTY_URI;\\n\\tsh:nodeKind sh:Literal;\\n\\t].",
+        'violations': ' ',
+        "violation_text": "(datatype property, individual score)",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "functional_property": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN10',
+        'metric': 'No inconsistent values',
+        'metric_description': 'Verifies the correct usage of functional properties.',
+        'score': 0,
+        'message': 'properties don\'t conform to their functional characteristic',
+        'metric_type': 'count',
+        'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
+        "meta_metric_calculation": "Number of functional properties correctly used / Number of functional properties",
+        'shape_name': 'FunctionalPropertyShape',
+        "shape_template": "ex:FunctionalPropertyShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\t\\tsh:path PROPERTY_URI;\\n\\t\\tsh:maxCount 1;\\n\\t].",
+        'violations': '',
+        "violation_text": "(functional property, individual score)",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "asymmetric_property": {
+        'dimension': 'Consistency',
+        'metric_id': 'CN10',
+        'metric': 'No inconsistent values',
+        'metric_description': 'Verifies the correct usage of asymmetric properties.',
+        'score': 0,
+        'message': 'properties don\'t conform to their asymmetric characteristic',
+        'metric_type': 'count',
+        'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
+        "meta_metric_calculation": "Number of asymmetric properties correctly used / Number of asymmetric properties",
+        'shape_name': 'AsymmetricPropertyShape',
+        "shape_template": "ex:AsymmetricPropertyShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\t\\tsh:path [sh:inversePath PROPERTY_URI];\\n\\t\\tsh:disjoint PROPERTY_URI;\\n\\t].",
+        'violations': '',
+        "violation_text": "(asymmetric property, individual score)",
+        'num_violations': 0,
+        "vocab": ''
+    },
+    "schema_completeness_class_usage": {
+            'dimension': 'Completeness',
+            'metric_id': 'CP1',
+            'metric': 'Schema completeness',
+            'metric_description': 'Verifies that classes defined in vocabularies are used in the dataset.',
+            'score': 0,
+            'message': 'classes aren\'t used in the dataset',
+            'metric_type': 'binary',
+            "metric_calculation": "1 if the class is used, 0 otherwise",
+            "meta_metric_calculation": "Number of classes used from the vocabularies / Number of classes defined in vocabularies",
+            'shape_name': 'SchemaCompletenessClassUsageShape',
+            "shape_template": "ex:NotNamedIndividualShape\\n\\ta sh:NodeShape;\\n\\tsh:property [\\n\\t\\tsh:path rdf:type ;\\n\\t\\tsh:not [ sh:hasValue owl:NamedIndividual ] ;\\n\\t].\\nex:SchemaCompletenessClassUsageShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetNode CLASS_URI ;\\n\\tsh:property [\\n\\t\\tsh:path [ sh:inversePath rdf:type ] ;\\n\\t\\tsh:minCount 1 ;\\n\\t\\tsh:qualifiedValueShape [\\n\\t\\t\\tsh:node ex:NotNamedIndividualShape ;\\n\\t\\t];\\n\\t\\tsh:qualifiedMinCount 1 ;\\n\\t].",
+            'violations': '',
+            "violation_text": "classes defined in the vocabulary that are not used in the dataset",
+            'num_violations': 0,
+            "vocab": ''
+        },
+    "malformed_literal": {
+        "dimension": "Syntactic Validity",
+        "metric_id": "SV3",
+        "metric": "No malformed datatype literals",
+        "score": 0,
+        "message": "properties are used with malformed datatype values",
+        "metric_description": "Verifies that datatype property's values follow the expected lexical syntax of the datatype or that it isn't an ill-typed literal.",
+        "metric_type": "count",
+        "metric_calculation": "1 - (Number of violations / Number of entities that use the property)",
+        "meta_metric_calculation": "Number of correctly used properties / Number of properties with a datatype range",
+        'shape_name': 'MalformedDatatypeShape',
+        "shape_template": "ex:MalformedLiteralShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\tsh:path PROPERTY_URI ;\\n\\tsh:datatype DATATYPE_URI;\\n\\t].",
+        "violations": "",
+        "violation_text": "(property used with a malformed literal, individual score)",
+        "num_violations": 0,
+        "vocab": ''
+    },
+    "deprecated_property": {
+        "dimension": "Consistency",
+        "metric_id": "CN4",
+        "metric": "Members of owl:DeprecatedClass or owl:DeprecatedProperty not used",
+        "score": 0,
+        "message": 'deprecated properties are used in the dataset',
+        "metric_description": "Verifies that deprecated properties aren't used",
+        'metric_type': 'count',
+        'metric_calculation': '1 - (Number of violations / Number of entities)',
+        'meta_metric_calculation': 'Number of unused deprecated properties / Number of deprecated properties',
+        'shape_name': 'DeprecatedPropertiesShape',
+        "shape_template": "ex:DeprecatedPropertiesUsageShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf rdf:type;\\n\\tsh:or (\\n\\t\\t[sh:path rdf:type; sh:hasValue rdfs:Class;]\\n\\t\\t[sh:path rdf:type; sh:hasValue rdf:Property;]\\n\\t\\t[sh:path rdf:type; sh:hasValue owl:\\n\\t\\tNamedIndividual;]\\n\\t\\t[ sh:path PROPERTY_URI; sh:maxCount 0; ]\\n\\t).",
+        'violations': '',
+        "violation_text": "(deprecated property, individual score)",
+        'num_violations': 0,
+        'vocab': ''
+    },
+    "undefined_classes": {
+        "dimension": "Interpretability",
+        "metric_id": "ITP3",
+        "metric": "Invalid usage of undefined classes and properties",
+        "score": 0,
+        "message": "",
+        "metric_description": "Verifies that the classes used in the dataset are defined in the vocabulary.",
+        "metric_type": "binary",
+        "metric_calculation": "1 if the class is defined, 0 otherwise",
+        "meta_metric_calculation": "Number of defined classes (from the vocabulary) used / Number of classes (from the vocabulary) used in the dataset",
+        'shape_name': 'UndefinedClassShape',
+        "shape_template": "ex:UndefinedClassShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetNode CLASS_URI;\\n\\tsh:property [\\n\\t\\tsh:path rdf:type;\\n\\t\\tsh:hasValue rdfs:Class;\\n\\t\\tsh:minCount 1;\\n\\t].",
+        "violations": "",
+        "violation_text": "undefined classes",
+        "num_violations": 0,
+        "vocab": ''
+    },
+    "undefined_properties": {
+        "dimension": "Interpretability",
+        "metric_id": "ITP3",
+        "metric": "Invalid usage of undefined classes and properties",
+        "score": 0,
+        "message": "",
+        "metric_description": "Verifies that the properties used in the dataset are defined in the vocabulary.",
+        "metric_type": "binary",
+        "metric_calculation": "1 if the property is defined, 0 otherwise",
+        "meta_metric_calculation": "Number of defined properties (from the vocabulary) used / Number of properties (from the vocabulary) used in the dataset",
+        'shape_name': 'UndefinedPropertyShape',
+        "shape_template": "ex:UndefinedPropertyShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetNode PROPERTY_URI;\\n\\tsh:property [\\n\\t\\tsh:path rdf:type;\\n\\t\\tsh:hasValue rdf:Property;\\n\\t\\tsh:minCount 1;\\n\\t].",
+        "violations": "",
+        "violation_text": "undefined properties",
+        "num_violations": 0,
+        "vocab": ''
+    }
+}
+
 METRIC_COVERAGE = [
     ["Availability", "A1", "accessibility of the SPARQL endpoint and the server", "No"],
     ["Availability", "A2", "accessibility of the RDF dumps", "Partial"],
@@ -0,0 +1,334 @@
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import argparse
+import threading
+import traceback
+import socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from const import *
+from dq_assessment import DQAssessment
+from metric_selection import parse_metric_list
+from input_sources import GraphCache, set_graph_cache
+from main import save_run
+
+# Long-lived assessment process: the imports, the compiled shapes templates and the parsed graphs (data graphs,
+# metadata & vocabularies, see GraphCache) are kept between assessments, so that repeated or small assessments
+# don't pay for them again. The jobs are submitted to a local HTTP API (TCP or Unix socket) and run by a pool
+# of worker threads (--concurrency). The jobs of the same dataset run one after the other.
+#
+#   POST   /jobs                {"dataset": "pizza", "assessment": "ra"}, ?wait=1 answers when the job finishes
+#   GET    /jobs                jobs (queued, running & last finished ones)
+#   GET    /jobs/<id>           status & progress (phase of the assessment) of a job
+#   GET    /jobs/<id>/results   rows of the results CSV of a finished job
+#   DELETE /jobs/<id>           cancels a queued job
+#   GET    /status              queue, workers & cache
+#   DELETE /cache               empties the cache of parsed graphs
+
+ASSESSMENTS = {
+    "ra": (True, True, True),
+    "rm": (True, False, False),
+    "rd": (False, True, False),
+    "rv": (False, False, True)
+}
+
+
+class Job:
+    """
+        Assessment requested to the daemon
+    """
+    def __init__(self, request):
+        dataset = request.get("dataset")
+        if not dataset:
+            raise ValueError("No dataset name provided")
+        if not os.path.exists(f'config/{dataset}.ini'):
+            raise ValueError(f"Config file not found at path: config/{dataset}.ini")
+        assessment = request.get("assessment", "ra")
+        if assessment not in ASSESSMENTS:
+            raise ValueError(f"Unknown assessment '{assessment}', use one of: {', '.join(ASSESSMENTS)}")
+
+        self.job_id = uuid.uuid4().hex[:12]
+        self.dataset = dataset
+        self.assessment = assessment
+        self.request = request
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.dq_assessment = None
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def create_assessment(self):
+        metadata_shapes, data_shapes, vocab_shapes = ASSESSMENTS[self.assessment]
+        request = self.request
+        return DQAssessment(f'config/{self.dataset}.ini',
+                            metadata_shapes=metadata_shapes,
+                            data_shapes=data_shapes,
+                            vocab_shapes=vocab_shapes,
+                            profile_run=request.get("profile", False),
+                            approximate=request.get("approximate", False),
+                            sample_method=request.get("sample_method", "uniform"),
+                            target_error=request.get("target_error", APPROXIMATE_TARGET_ERROR),
+                            confidence=request.get("confidence", APPROXIMATE_CONFIDENCE),
+                            sample_seed=request.get("seed", 42),
+                            time_budget=request.get("time_budget"),
+                            include_metrics=parse_metric_list(request["include_metrics"]) if request.get("include_metrics") is not None else None,
+                            exclude_metrics=parse_metric_list(request["exclude_metrics"]) if request.get("exclude_metrics") is not None else None,
+                            graph_files=request.get("graph_file"))
+
+    def to_dict(self):
+        job = {
+            "job_id": self.job_id,
+            "dataset": self.dataset,
+            "assessment": self.assessment,
+            "status": self.status,
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_time": (self.finished_at or time.time()) - self.started_at if self.started_at else None
+        }
+        if self.status == "running" and self.dq_assessment is not None:
+            job["phase"] = self.dq_assessment.profiler.current_phase
+        if self.result is not None:
+            job["result"] = self.result
+        if self.error is not None:
+            job["error"] = self.error
+        return job
+
+
+class AssessmentDaemon:
+    """
+        Queue of assessment jobs run by worker threads
+    """
+    def __init__(self, concurrency=DAEMON_CONCURRENCY, cache_size=DAEMON_CACHE_SIZE, store=True):
+        self.concurrency = concurrency
+        self.store = store
+        self.graph_cache = GraphCache(cache_size)
+        set_graph_cache(self.graph_cache)
+
+        self.queue = queue.Queue()
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        # The jobs of a dataset write the same files, they aren't run at the same time
+        self.dataset_locks = {}
+        # run_info.json & the results store are shared by all the datasets
+        self.save_lock = threading.Lock()
+        self.started_at = time.time()
+
+        for _ in range(concurrency):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def submit(self, request):
+        job = Job(request)
+        with self.lock:
+            self.jobs[job.job_id] = job
+        self.queue.put(job)
+        logging.info(f"Job {job.job_id} queued: -{job.assessment} of {job.dataset}")
+        return job
+
+    def get_job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        # Checked & set under the lock of the workers, otherwise a job could be cancelled while it starts
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return False
+            job.status = "cancelled"
+            job.finished_at = time.time()
+        job.done.set()
+        return True
+
+    def _start_job(self, job):
+        # queued -> running, unless the job was cancelled while it was waiting
+        with self.lock:
+            if job.status != "queued":
+                return False
+            job.status = "running"
+            job.started_at = time.time()
+            return True
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                if job.status == "cancelled":
+                    continue
+                dataset_lock = self.dataset_locks.setdefault(job.dataset, threading.Lock())
+            with dataset_lock:
+                # The job can still be cancelled while it waits for the jobs of the same dataset
+                if self._start_job(job):
+                    self._run_job(job)
+            self._forget_finished_jobs()
+
+    def _run_job(self, job):
+        try:
+            job.dq_assessment = job.create_assessment()
+            job.dq_assessment.run()
+            with self.save_lock:
+                run_id = save_run(job.dq_assessment, profile=job.request.get("profile", False),
+                                  store=self.store and job.request.get("store", True))
+            dq_assessment = job.dq_assessment
+            job.result = {
+                "run_id": run_id,
+                "total_elapsed_time": dq_assessment.total_elapsed_time,
+                "num_inst_shapes": dq_assessment.counter_shapes,
+                "results_file": f'{DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=dq_assessment.dataset_name)}dq_assessment_{dq_assessment.dataset_name}.csv'
+            }
+            job.status = "finished"
+        except Exception as e:
+            logging.error(f"Job {job.job_id} failed:\n{traceback.format_exc()}")
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            job.done.set()
+        logging.info(f"Job {job.job_id} {job.status} in {job.finished_at - job.started_at}")
+
+    def _forget_finished_jobs(self):
+        with self.lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job.done.is_set()]
+            for job_id in finished[:max(len(finished) - DAEMON_MAX_FINISHED_JOBS, 0)]:
+                del self.jobs[job_id]
+
+    def to_dict(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return {
+            "uptime": time.time() - self.started_at,
+            "concurrency": self.concurrency,
+            "queued": sum(job.status == "queued" for job in jobs),
+            "running": sum(job.status == "running" for job in jobs),
+            "cache": self.graph_cache.to_dict()
+        }
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def get_job_or_404(self, job_id):
+        job = self.server.assessment_daemon.get_job(job_id)
+        if job is None:
+            self.send_json({"error": f"Job '{job_id}' not found"}, 404)
+        return job
+
+    def do_GET(self):
+        daemon = self.server.assessment_daemon
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if parts == ['status']:
+            self.send_json(daemon.to_dict())
+        elif parts == ['jobs']:
+            with daemon.lock:
+                jobs = list(daemon.jobs.values())
+            self.send_json([job.to_dict() for job in jobs])
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.get_job_or_404(parts[1])
+            if job is not None:
+                self.send_json(job.to_dict())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'results':
+            job = self.get_job_or_404(parts[1])
+            if job is None:
+                return
+            if job.status != "finished":
+                self.send_json({"error": f"Job '{job.job_id}' is {job.status}"}, 409)
+            else:
+                self.send_json(job.dq_assessment.results_rows)
+        else:
+            self.send_json({"error": f"Unknown path '{self.path}'"}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.strip('/') != 'jobs':
+            self.send_json({"error": f"Unknown path '{self.path}'"}, 404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            job = self.server.assessment_daemon.submit(request)
+        except (ValueError, AttributeError) as e:
+            self.send_json({"error": str(e)}, 400)
+            return
+
+        if parse_qs(url.query).get('wait', ['0'])[0] not in ('0', 'false'):
+            job.done.wait()
+            self.send_json(job.to_dict())
+        else:
+            self.send_json(job.to_dict(), 202)
+
+    def do_DELETE(self):
+        daemon = self.server.assessment_daemon
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if parts == ['cache']:
+            daemon.graph_cache.clear()
+            self.send_json(daemon.graph_cache.to_dict())
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.get_job_or_404(parts[1])
+            if job is None:
+                return
+            if daemon.cancel(job.job_id):
+                self.send_json(job.to_dict())
+            else:
+                self.send_json({"error": f"Job '{job.job_id}' is {job.status}, only queued jobs can be cancelled"}, 409)
+        else:
+            self.send_json({"error": f"Unknown path '{self.path}'"}, 404)
+
+    def address_string(self):
+        # The clients of a Unix socket don't have an address
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else 'unix-socket'
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} - {format % args}")
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(daemon, host=DAEMON_HOST, port=DAEMON_PORT, socket_path=None):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, DaemonRequestHandler)
+        address = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), DaemonRequestHandler)
+        address = f'http://{host}:{server.server_port}'
+    server.assessment_daemon = daemon
+    logging.info(f"Assessment daemon listening on {address} ({daemon.concurrency} workers, {daemon.graph_cache.max_graphs} cached graphs)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run DQA jobs submitted to a local HTTP API, keeping the parsed graphs & templates in memory")
+    parser.add_argument("--host", default=DAEMON_HOST, help="Address of the API (local by default)")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT, help="Port of the API")
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of a TCP port")
+    parser.add_argument("--concurrency", type=int, default=DAEMON_CONCURRENCY, help="Jobs run at the same time (the jobs of a dataset always run one after the other)")
+    parser.add_argument("--cache-size", type=int, default=DAEMON_CACHE_SIZE, help="Parsed graphs (data graphs, metadata & vocabularies) kept in memory")
+    parser.add_argument("--no-store", action="store_true", help=f"Don't append the runs to the results store ({RESULTS_STORE_FILE_PATH})")
+    args = parser.parse_args()
+    serve(AssessmentDaemon(args.concurrency, args.cache_size, store=not args.no_store), args.host, args.port, args.socket)
@@ -0,0 +1,123 @@
+import os
+import json
+import math
+from itertools import islice
+
+import pandas as pd
+import streamlit as st
+
+from const import DASHBOARD_VIOLATIONS_PAGE_SIZE, RESULTS_STORE_FILE_PATH
+from violations_store import load_violations
+from results_store import ResultsStore
+from compare_runs import compare_runs
+
+# Data layer of the streamlit dashboard. Streamlit reruns the whole script on every interaction,
+# so files are read once and cached, keyed by their modification time (a new run of the
+# assessment invalidates the cache). The results table is read without the violations, they're
+# only read when the violations of a row are shown, and only one page of violations is rendered at a time.
+
+
+def get_mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+@st.cache_data(show_spinner=False)
+def _load_json(path, mtime):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_json(path):
+    mtime = get_mtime(path)
+    return None if mtime is None else _load_json(path, mtime)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _load_results(csv_path, mtime):
+    # The violations can be hundreds of MB, only the summary columns are loaded
+    df = pd.read_csv(csv_path, usecols=lambda column: column != 'violations')
+    df['vocab'] = df['vocab'].fillna('')
+    df['violation_text'] = df['violation_text'].fillna('')
+    df['num_violations'] = df['num_violations'].fillna(0).astype(int)
+    return df
+
+def load_results(csv_path):
+    """
+    Results table, without the violations (see get_violations).
+    Cached as a resource: the same object is returned on every rerun, it must not be modified.
+    """
+    return _load_results(csv_path, get_mtime(csv_path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_inline_violations(csv_path, mtime):
+    # Violations of each row as written in the CSV, split when a row is shown
+    return pd.read_csv(csv_path, usecols=['violations'], dtype=str, keep_default_na=False)['violations']
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _load_row_violations(csv_path, mtime, index):
+    value = _load_inline_violations(csv_path, mtime).iloc[index]
+    return [v.strip() for v in value.split(';') if v.strip()]
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _load_shape_violations(violations_file_path, mtime, shape_name, vocab):
+    table = load_violations(violations_file_path, shape=shape_name, vocab=vocab or None, columns=['focus_node'])
+    return list(dict.fromkeys(str(v) for v in table.column('focus_node').to_pylist()))
+
+def get_violations(row, csv_path, violations_file_path=None):
+    """
+    Violations of a row of the results, read from the CSV the first time they're shown, or from the
+    violations file when they aren't inlined in the CSV (violations_format = parquet)
+    """
+    mtime = get_mtime(csv_path)
+    if _load_inline_violations(csv_path, mtime).iloc[row.name]:
+        return _load_row_violations(csv_path, mtime, row.name)
+    if violations_file_path is None or not row['num_violations']:
+        return []
+    return _load_shape_violations(violations_file_path, get_mtime(violations_file_path), row['shape_name'], row['vocab'])
+
+def get_violations_page(violations, page, page_size=DASHBOARD_VIOLATIONS_PAGE_SIZE):
+    """
+    Violations of a page (starting at 1) and number of pages
+    """
+    num_pages = max(1, math.ceil(len(violations) / page_size))
+    page = min(max(page, 1), num_pages)
+    return violations[(page - 1) * page_size:page * page_size], num_pages
+
+
+@st.cache_data(show_spinner=False)
+def _load_stored_runs(store_path, mtime):
+    with ResultsStore(store_path) as store:
+        return {dataset: store.get_runs(dataset) for dataset in store.get_datasets()}
+
+def load_stored_runs(store_path=RESULTS_STORE_FILE_PATH):
+    """
+    dataset -> runs in the results store
+    """
+    mtime = get_mtime(store_path)
+    return {} if mtime is None else _load_stored_runs(store_path, mtime)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _load_run_comparison(store_path, mtime, run_a, run_b):
+    with ResultsStore(store_path) as store:
+        return compare_runs(store, run_a, run_b)
+
+def load_run_comparison(run_a, run_b, store_path=RESULTS_STORE_FILE_PATH):
+    """
+    Per metric comparison of two runs, the added/removed entities are bitmaps of entity IDs (decoded per page)
+    """
+    return _load_run_comparison(store_path, get_mtime(store_path), run_a, run_b)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _get_entity_iris(store_path, entity_ids):
+    with ResultsStore(store_path) as store:
+        return store.get_iris(entity_ids)
+
+def get_entities_page(bitmap, page, page_size=DASHBOARD_VIOLATIONS_PAGE_SIZE, store_path=RESULTS_STORE_FILE_PATH):
+    """
+    IRIs of a page of the entities of a bitmap and number of pages
+    """
+    num_pages = max(1, math.ceil(len(bitmap) / page_size))
+    page = min(max(page, 1), num_pages)
+    entity_ids = tuple(islice(bitmap, (page - 1) * page_size, page * page_size))
+    return _get_entity_iris(store_path, entity_ids), num_pages
@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+from rdflib import RDF, SH, BNode, URIRef
+
+from const import *
+from dq_assessment import DQAssessment
+from run_profiler import RunProfiler
+from synthetic_dataset import generate_synthetic_dataset
+from utils import VALIDATION_ENGINES, load_graph_to_validate, get_metric_message
+
+logging.basicConfig(level=logging.INFO)
+
+REFERENCE_ENGINE = 'pyshacl'
+# Fields of the data results that every engine must reproduce exactly
+COMPARED_FIELDS = ('measure', 'num_violations', 'violations')
+
+
+def parse_violations(violations):
+    """
+    Violations are stored as a string joined by ';' (or '; '), their order depends on set iteration
+    """
+    if not violations:
+        return set()
+    return {violation.strip() for violation in str(violations).split(';') if violation.strip()}
+
+def get_result_shape(report_graph, result):
+    """
+    Name of the (node) shape that produced a validation result, e.g. FunctionalPropertyShape_3
+    """
+    source_shape = report_graph.value(result, SH.sourceShape)
+    if isinstance(source_shape, URIRef):
+        return str(source_shape).removeprefix("https://www.example.org/")
+    # Property shapes are blank nodes, the shape is identified by the metric & counter of the message
+    metric, _, counter = get_metric_message(report_graph, result)
+    return f'{metric}Shape' if counter == -1 else f'{metric}Shape_{counter}'
+
+def get_report_results(report_graph):
+    """
+    Set of (shape, focus node, path, value, constraint component) of the validation results of a report
+    """
+    report_results = set()
+    for result in report_graph.subjects(RDF.type, SH.ValidationResult):
+        result_path = report_graph.value(result, SH.resultPath)
+        value = report_graph.value(result, SH.value)
+        report_results.add((
+            get_result_shape(report_graph, result),
+            str(report_graph.value(result, SH.focusNode)),
+            # complex paths are copied to the report as new blank nodes
+            '_:path' if isinstance(result_path, BNode) else str(result_path),
+            None if value is None else str(value),
+            str(report_graph.value(result, SH.sourceConstraintComponent))
+        ))
+    return report_results
+
+
+def diff_results(reference_results, results):
+    """
+    Differences of measure, num_violations and violations per metric
+    """
+    differences = []
+    for metric in list(reference_results) + [metric for metric in results if metric not in reference_results]:
+        if metric not in results or metric not in reference_results:
+            differences.append({"metric": metric, "field": "metric", "reference": metric in reference_results, "engine": metric in results})
+            continue
+        for field in COMPARED_FIELDS:
+            reference_value = reference_results[metric].get(field)
+            value = results[metric].get(field)
+            if field == 'violations':
+                reference_value, value = parse_violations(reference_value), parse_violations(value)
+                if reference_value != value:
+                    differences.append({
+                        "metric": metric,
+                        "field": field,
+                        "only_reference": sorted(reference_value - value),
+                        "only_engine": sorted(value - reference_value)
+                    })
+            elif reference_value != value:
+                differences.append({"metric": metric, "field": field, "reference": reference_value, "engine": value})
+    return differences
+
+def get_first_divergence(reference_report_results, report_results):
+    """
+    First (by shape and focus node) validation result that is only produced by one of the engines
+    """
+    only_reference = reference_report_results - report_results
+    only_engine = report_results - reference_report_results
+    divergences = [(result, "reference") for result in only_reference] + [(result, "engine") for result in only_engine]
+    if not divergences:
+        return None
+    (shape, focus_node, path, value, component), produced_by = min(divergences, key=lambda divergence: tuple(str(field) for field in divergence[0]))
+    return {
+        "shape": shape,
+        "focus_node": focus_node,
+        "path": path,
+        "value": value,
+        "constraint_component": component,
+        "only_produced_by": produced_by,
+        "num_only_reference": len(only_reference),
+        "num_only_engine": len(only_engine)
+    }
+
+
+def check_dataset(dataset_name, engines):
+    """
+    Validates the data shapes of a dataset with the reference engine and each of the engines
+    (same shapes graph and same data graph) and compares the processed results
+    """
+    dq_assessment = DQAssessment(f'config/{dataset_name}.ini')
+    dq_assessment.profile_data()
+    # The contextual data shapes use the results of the metadata shapes (URI space & regex)
+    if dq_assessment.metadata_file:
+        dq_assessment.validate_metadata_shapes()
+
+    try:
+        shape_graph = dq_assessment.build_data_shapes()
+        data_graph = load_graph_to_validate(dq_assessment.graph_profile, dq_assessment.graph_files, dq_assessment.graph_file_format,
+                                            dq_assessment.vocab_names, dq_assessment.config)
+
+        engine_outputs = {}
+        for engine in [REFERENCE_ENGINE] + engines:
+            initial_time = time.perf_counter()
+            _, report_graph, _, _ = VALIDATION_ENGINES[engine](data_graph, shape_graph, RunProfiler(), 'data')
+            elapsed_time = time.perf_counter() - initial_time
+            engine_outputs[engine] = {
+                "elapsed_time": elapsed_time,
+                "results": dq_assessment.process_validation_result_data(report_graph),
+                "report_results": get_report_results(report_graph)
+            }
+            logging.info(f"{dataset_name}: validated with {engine} in {elapsed_time:.2f} s ({len(engine_outputs[engine]['report_results'])} validation results)")
+    finally:
+        # Same clean up as DQAssessment.run
+        if os.path.exists(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=dq_assessment.dataset_name)):
+            os.remove(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=dq_assessment.dataset_name))
+        if os.path.exists(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=dq_assessment.dataset_name)):
+            os.remove(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=dq_assessment.dataset_name))
+
+    reference = engine_outputs[REFERENCE_ENGINE]
+    checks = {}
+    for engine in engines:
+        output = engine_outputs[engine]
+        checks[engine] = {
+            "reference_elapsed_time": reference["elapsed_time"],
+            "elapsed_time": output["elapsed_time"],
+            "differences": diff_results(reference["results"], output["results"]),
+            "first_divergence": get_first_divergence(reference["report_results"], output["report_results"])
+        }
+    return checks
+
+
+def log_checks(dataset_name, checks):
+    for engine, check in checks.items():
+        if not check["differences"] and check["first_divergence"] is None:
+            logging.info(f"{dataset_name}: {engine} matches {REFERENCE_ENGINE} "
+                         f"({check['elapsed_time']:.2f} s vs {check['reference_elapsed_time']:.2f} s)")
+            continue
+
+        logging.error(f"{dataset_name}: {engine} diverges from {REFERENCE_ENGINE} in {len({d['metric'] for d in check['differences']})} metrics")
+        for difference in check["differences"]:
+            if difference["field"] == 'violations':
+                logging.error(f"  {difference['metric']} violations: {len(difference['only_reference'])} only in {REFERENCE_ENGINE} "
+                              f"{difference['only_reference'][:3]}, {len(difference['only_engine'])} only in {engine} {difference['only_engine'][:3]}")
+            else:
+                logging.error(f"  {difference['metric']} {difference['field']}: {difference['reference']} ({REFERENCE_ENGINE}) != {difference['engine']} ({engine})")
+        divergence = check["first_divergence"]
+        if divergence is not None:
+            logging.error(f"  First diverging result: shape {divergence['shape']}, focus node {divergence['focus_node']} "
+                          f"(path {divergence['path']}, value {divergence['value']}), only produced by {divergence['only_produced_by']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Checks that the validation engines produce the same data results as {REFERENCE_ENGINE}")
+    parser.add_argument("-d", nargs="*", default=[], help="Datasets (config names) to check, e.g. pizza")
+    parser.add_argument("--scales", nargs="*", default=[], help="Synthetic datasets to generate and check, e.g. 10K")
+    parser.add_argument("--engines", nargs="+", choices=[engine for engine in VALIDATION_ENGINES if engine != REFERENCE_ENGINE],
+                        default=[engine for engine in VALIDATION_ENGINES if engine != REFERENCE_ENGINE],
+                        help="Engines compared against the reference")
+    parser.add_argument("--output", help="JSON file where the differences are stored")
+    args = parser.parse_args()
+
+    dataset_names = list(args.d)
+    for scale in args.scales:
+        dataset_name, _ = generate_synthetic_dataset(scale)
+        dataset_names.append(dataset_name)
+    if not dataset_names:
+        raise Exception("No dataset to check, use -d and/or --scales")
+
+    all_checks = {}
+    for dataset_name in dataset_names:
+        all_checks[dataset_name] = check_dataset(dataset_name, args.engines)
+        log_checks(dataset_name, all_checks[dataset_name])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(all_checks, f, indent=4)
+
+    if any(check["differences"] or check["first_divergence"] for checks in all_checks.values() for check in checks.values()):
+        sys.exit(1)
+    logging.info(f"All engines match {REFERENCE_ENGINE}")
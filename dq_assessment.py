@@ -1,13 +1,23 @@
 import configparser
 import logging
-import csv
 from jinja2 import Environment, FileSystemLoader
 import time
-import glob
-from collections import defaultdict
+import random
+from functools import lru_cache
+from collections import defaultdict, Counter
 from rdflib.namespace import DCTERMS, VOID, SH, FOAF
 
 from shacl_shape_builder import SHACLShapeBuilder
+from run_profiler import RunProfiler, MemoryProfiler, SHAPE_NAME_PATTERN
+from sampling import GraphSampler, RESERVOIR_METHODS, sample_stream
+from shape_scheduler import ShapeScheduler
+from metric_selection import MetricSelection, parse_metric_list
+from bitmaps import EntityDictionary, new_bitmap
+from violations_store import ViolationsWriter, get_violations_file_path
+from results_aggregator import ResultsAggregator
+from results_io import write_results, check_results_format
+from input_sources import resolve_graph_files, get_parser_backend
+from named_graphs import is_named_graph_file, assess_named_graphs
 from utils import *
 
 import warnings
@@ -15,18 +25,63 @@ warnings.filterwarnings("ignore", category=UserWarning, module="rdflib.term")
 
 logging.basicConfig(level=logging.INFO)
 
+@lru_cache(maxsize=None)
+def get_shapes_environment():
+    """
+    Environment of the shapes templates, the templates are compiled once per process (e.g. in the daemon)
+    """
+    return Environment(loader=FileSystemLoader("dq_assessment/shapes"))
+
 class DQAssessment:
 
     def __init__(self, config_path, 
                  metadata_shapes=True, 
                  data_shapes=True, 
-                 vocab_shapes=True):
+                 vocab_shapes=True,
+                 profile_run=False,
+                 profile_memory=False,
+                 approximate=False,
+                 sample_method='uniform',
+                 target_error=APPROXIMATE_TARGET_ERROR,
+                 confidence=APPROXIMATE_CONFIDENCE,
+                 sample_seed=42,
+                 time_budget=None,
+                 include_metrics=None,
+                 exclude_metrics=None,
+                 graph_files=None,
+                 dataset_name=None,
+                 graph_file_format=None,
+                 metadata_dataset_name=None,
+                 vocabularies=None):
         
         self.metadata_shapes = metadata_shapes
         self.data_shapes = data_shapes
+        self.config_path = config_path
         self.config = self._load_config(config_path)
         self.vocab_shapes = vocab_shapes
         self._init_paths_and_params()
+        # e.g. the named graphs of a dataset are assessed as separate datasets with the config of the dataset
+        if dataset_name is not None:
+            self.dataset_name = dataset_name
+        if graph_file_format is not None:
+            self.graph_file_format = graph_file_format
+        # Dataset whose metadata results are used to instantiate the data shapes (the named graphs use the ones of their dataset)
+        self.metadata_dataset_name = metadata_dataset_name or self.dataset_name
+        # Vocabularies (sections of the config) profiled & validated in the vocabulary stage, e.g. the ones that changed (--watch).
+        # The data shapes are instantiated from the profiles of all the vocabularies
+        self.assessed_vocab_names = [vocab for vocab in self.vocab_names if vocabularies is None or vocab in vocabularies]
+
+        # Files of the data graph, the ones of the CLI override graph_file of the config
+        self.graph_files = resolve_graph_files(graph_files if graph_files is not None else self.graph_file_path) if data_shapes else []
+        # N-Quads/TriG data graphs are assessed per named graph (see named_graphs.py)
+        self.named_graphs = any(is_named_graph_file(path, self.graph_file_format) for path in self.graph_files)
+
+        # Metrics enabled in the run, the lists of the CLI override the ones of the config
+        if include_metrics is not None:
+            self.include_metrics = include_metrics
+        if exclude_metrics is not None:
+            self.exclude_metrics = exclude_metrics
+        self.metric_selection = MetricSelection(self.include_metrics, self.exclude_metrics)
 
         self.shape_builder = SHACLShapeBuilder(self)
         
@@ -36,6 +91,29 @@ class DQAssessment:
         self.vocab_shapes_elapsed_time = 0
         self.metadata_shapes_elapsed_time = 0
         self.graph_profile = None
+        self.results_rows = []
+        # Writes the results CSV as the results of each stage are produced
+        self.results_aggregator = None
+        self.binary_violation_counts = Counter()
+
+        # Records per-phase and per-shape timings when profile_run is enabled
+        # and per-phase peak memory & allocation sites when profile_memory is enabled
+        self.memory_profiler = MemoryProfiler() if profile_memory else None
+        self.profiler = RunProfiler(enabled=profile_run, memory_profiler=self.memory_profiler)
+
+        # Violating entities are stored as bitmaps of entity IDs, (vocab or None for data, metric) -> bitmap
+        self.entity_ids = EntityDictionary()
+        self.violation_bitmaps = {}
+        # With violations_format = parquet the violations are stored in a separate file instead of the results CSV
+        self.violations_writer = ViolationsWriter(self.get_max_violations, self.violations_sampling) if self.violations_format == 'parquet' else None
+
+        # With a time budget (seconds), the data shapes are scheduled by cost and validated until the deadline
+        self.time_budget = time_budget
+        self.deadline = None
+        self.scheduler = None
+
+        # In approximate mode the data shapes are validated against a sample of the entities
+        self.sampler = GraphSampler(self, sample_method, target_error, confidence, sample_seed) if approximate else None
 
     def _load_config(self, path):
         try:
@@ -56,8 +134,15 @@ class DQAssessment:
         self.graph_file_path = settings['graph_file']
         self.vocab_names = [v.strip() for v in settings["vocabularies"].split(",")]
 
+        # The data graph can be split in several (compressed) files: comma separated files/glob patterns,
+        # parsed into a single graph by parse_workers processes. Without a format, it's guessed from the extension.
         self.graph_file_path = settings['graph_file']
-        self.graph_file_format = settings['graph_file_format']
+        self.graph_file_format = settings.get('graph_file_format', fallback='').strip() or None
+        self.parse_workers = settings.getint('parse_workers', fallback=1)
+        # Parser of the RDF files (data graph, metadata & vocabularies): rdflib, oxigraph or ntriples (see input_sources.py)
+        self.parser_backend = get_parser_backend(self.config)
+        # Processes that assess the named graphs of N-Quads/TriG data graphs
+        self.named_graph_workers = settings.getint('named_graph_workers', fallback=1)
         self.dataset_name = settings["dataset_name"]
         self.dataset_name = self.dataset_name.lower().replace(" ", "_")
 
@@ -74,8 +159,33 @@ class DQAssessment:
         self.uris_max_length = settings['uris_max_length']
         self.vocab_names = [v.strip() for v in settings["vocabularies"].split(",")]
 
+        # Profile: distinct entities/subjects are estimated with HyperLogLog sketches when exact counts are disabled
+        self.exact_counts = settings.getboolean('exact_counts', fallback=True)
+        self.hll_precision = settings.getint('hll_precision', fallback=HLL_DEFAULT_PRECISION)
+
+        # Violations kept per metric in the results (0 = all), the number of violations is always exact
+        self.max_violations = settings.getint('max_violations', fallback=0)
+        self.violations_sampling = settings.get('violations_sampling', fallback='first').strip() or 'first'
+        if self.violations_sampling not in RESERVOIR_METHODS:
+            raise ValueError(f"Unknown violations_sampling '{self.violations_sampling}', use one of: {', '.join(RESERVOIR_METHODS)}")
+        # Max. per metric in the [max_violations] section, e.g. URIsLengthEntities = 100 (configparser lowercases the keys)
+        self.max_violations_per_metric = {}
+        if self.config.has_section('max_violations'):
+            self.max_violations_per_metric = {metric: int(value) for metric, value in self.config['max_violations'].items()}
+
+        # Metric names, metric IDs or dimensions, e.g. include_metrics = Consistency, LabelForEntities
+        self.include_metrics = parse_metric_list(settings.get('include_metrics', fallback=''))
+        self.exclude_metrics = parse_metric_list(settings.get('exclude_metrics', fallback=''))
+
+        # Per-stage results: indented "json" or "ndjson" (one line per metric, compact profiles) for large datasets
+        self.results_format = check_results_format(settings.get('results_format', fallback='json').strip() or 'json')
+
+        self.violations_format = settings.get('violations_format', fallback='csv').strip() or 'csv'
+        if self.violations_format not in VIOLATIONS_FORMATS:
+            raise ValueError(f"Unknown violations_format '{self.violations_format}', use one of: {', '.join(VIOLATIONS_FORMATS)}")
+
         # Shapes templates
-        env = Environment(loader=FileSystemLoader("dq_assessment/shapes"))
+        env = get_shapes_environment()
         self.data_template = env.get_template("data_shapes.template.ttl")
         self.metadata_template = env.get_template("metadata_shapes.template.ttl")
         self.vocabs_template = env.get_template("vocabulary_shapes.template.ttl")
@@ -83,31 +193,61 @@ class DQAssessment:
         self.regex_pattern = None
         self.uri_space = None
 
-        self.aggregate_dict_counter = {}
-
 
     def run(self):
 
-        self.profile_data()
+        if self.memory_profiler is not None:
+            self.memory_profiler.start()
+
+        try:
+            if self.named_graphs:
+                assess_named_graphs(self)
+            else:
+                self._run()
+        except BaseException:
+            # The results CSV of the previous run is kept
+            if self.results_aggregator is not None:
+                self.results_aggregator.discard()
+            raise
+        finally:
+            if self.memory_profiler is not None:
+                self.memory_profiler.stop()
+
+    def _run(self):
+
+        if self.time_budget is not None:
+            self.deadline = time.perf_counter() + self.time_budget
+
+        results_folder = DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)
+        self.results_aggregator = ResultsAggregator(f'{results_folder}/dq_assessment_{self.dataset_name}.csv',
+                                                    inline_violations=self.violations_writer is None,
+                                                    approximate=self.sampler is not None,
+                                                    status=self.time_budget is not None or self.metric_selection.active)
+
+        with self.profiler.phase('profiling', 'total'):
+            self.profile_data()
         logging.info(f"Finished profiling graph and vocabularies. Saved results in {PROFILE_DATASETS_FOLDER_PATH} & {PROFILE_VOCABULARIES_FOLDER_PATH}")
         
         initial_time = time.time() # start of validation
     
         # ---- Validate metadata shapes ----
         if self.metadata_shapes and self.metadata_file:
-            validation_time = self.validate_metadata_shapes()
+            with self.profiler.phase('metadata', 'total'):
+                validation_time = self.validate_metadata_shapes()
             self.metadata_shapes_elapsed_time = validation_time
             logging.info(f"Finished validating metadata shapes. \n Saved DQA results in '{DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)}dq_assessment_{self.dataset_name}_metadata.json'. Validation time: {validation_time}")
 
         # ---- Validate data shapes ----
         if self.data_shapes:
-            validation_time = self.validate_data_shapes()
+            with self.profiler.phase('data', 'total'):
+                validation_time = self.validate_data_shapes()
             self.data_shapes_elapsed_time = validation_time
             logging.info(f"Finished validating data shapes. Saved DQA results in '{DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)}/dq_assessment_{self.dataset_name}_data.json'. Validation time: {validation_time}")
 
         # ---- Validate shapes against vocabularies ----
         if self.vocab_shapes:
-            validation_time = self.validate_vocabulary_shapes()
+            with self.profiler.phase('vocabularies', 'total'):
+                validation_time = self.validate_vocabulary_shapes()
             self.vocab_shapes_elapsed_time = validation_time
             logging.info(f"Finished validating shapes against vocabularies. Saved DQA results in '{DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)}dq_assessment_[vocab_name].json'. Validation time: {validation_time}")
 
@@ -116,27 +256,37 @@ class DQAssessment:
         logging.info(f"Total elapsed time: {self.total_elapsed_time}")
 
         # Remove specific .json result file created for shapes that need instantiation from vocabularies
-        if os.path.exists(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH):
-            os.remove(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH)
+        if os.path.exists(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name)):
+            os.remove(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name))
+
+        if os.path.exists(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name)):
+            os.remove(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name))
 
-        if os.path.exists(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH):
-            os.remove(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH)
+        with self.profiler.phase('results', 'csv_writing'):
+            self.results_aggregator.close()
+        self.counter_shapes = self.results_aggregator.num_shapes
+        # Rows of the CSV, appended to the results store by main.py
+        self.results_rows = self.results_aggregator.rows
 
-        self.create_dq_results_csv()
+        if self.violations_writer is not None:
+            with self.profiler.phase('results', 'violations_writing'):
+                self.violations_writer.write(get_violations_file_path(DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name), self.dataset_name))
 
 
     def profile_data(self):
         if self.data_shapes:
             graph_profile_output_path = f'{PROFILE_DATASETS_FOLDER_PATH}/{self.dataset_name}.json'
-            self.graph_profile = profile_graph(self, graph_profile_output_path)
+            with self.profiler.phase('profiling', 'graph_profile'):
+                self.graph_profile = profile_graph(self, graph_profile_output_path)
             logging.info(f"Graph profile saved in {graph_profile_output_path}.")
 
         if self.vocab_shapes:
             # Maps a vocabulary with its namespace
             dict_vocab_file = {}
-            for vocab in self.vocab_names:
+            for vocab in self.assessed_vocab_names:
                 
-                vocab_ns = profile_vocab(self, vocab)
+                with self.profiler.phase('profiling', 'vocabulary_profile'):
+                    vocab_ns = profile_vocab(self, vocab)
                 vocab_name = self.config[vocab]["vocab_name"]
                 dict_vocab_file[vocab_name] = vocab_ns
                 
@@ -150,7 +300,14 @@ class DQAssessment:
         validation_time = 0
 
         # Generate metadata shapes
-        shape_graph = create_shape_graph(self.metadata_template.module.metadata_shape(self.metadata_class))
+        with self.profiler.phase('metadata', 'shape_building'):
+            # The metadata metrics share a single shape, it's only left out when all of them are disabled
+            with open(DQ_MEASURES_METADATA_TEMPLATE_FILE_PATH, 'r', encoding='utf-8') as f:
+                metadata_metrics = json.load(f)
+            shacl_shapes = ''
+            if any(self.is_metric_enabled(metric) for metric in metadata_metrics):
+                shacl_shapes = self.metadata_template.module.metadata_shape(self.metadata_class)
+            shape_graph = create_shape_graph(shacl_shapes)
 
         # Save shapes
         folder_path = f'{DATASETS_FOLDER_PATH}/{self.dataset_name}/shapes'
@@ -160,9 +317,15 @@ class DQAssessment:
         logging.info(f'Metadata shapes for dataset {self.dataset_name} saved in {file_path}')
         
         # Run validation 
-        _, val_graph, _ , _, validation_time = validate_shacl_constraints(None, self.metadata_file, self.metadata_file_format, shape_graph, vocabs=None, config=None)
+        skipped = self.is_past_deadline()
+        if len(shape_graph) and not skipped:
+            _, val_graph, _ , _, validation_time = validate_shacl_constraints(None, self.metadata_file, self.metadata_file_format, shape_graph, vocabs=None, config=self.config, profiler=self.profiler, stage='metadata')
+        else:
+            # All the metrics of the stage are disabled or the time budget was exceeded, the file isn't loaded
+            val_graph = Graph()
         # Process & store validation results
-        self.process_validation_result_metadata(val_graph)
+        with self.profiler.phase('metadata', 'result_processing'):
+            self.process_validation_result_metadata(val_graph, skipped)
         
         logging.info(f"Finished DQA for metadata file. Results saved in '{DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)}/dq_assessment_{self.dataset_name}_metadata.json'. \n")
 
@@ -176,7 +339,7 @@ class DQAssessment:
         for class_ in self.graph_profile['classes']:
             class_ns = get_ns(class_)
 
-            for vocab in self.vocab_names:
+            for vocab in self.assessed_vocab_names:
                 vocab_name = self.config[vocab]["vocab_name"]
                 vocab_ns = self.dict_vocab_ns_file[vocab_name] 
 
@@ -189,7 +352,7 @@ class DQAssessment:
         property_vocab_map = {}
         for prop_ in self.graph_profile['properties']:
             prop_ns = get_ns(prop_)
-            for vocab in self.vocab_names:
+            for vocab in self.assessed_vocab_names:
                 vocab_name = self.config[vocab]["vocab_name"]
                 vocab_ns = self.dict_vocab_ns_file[vocab_name]
 
@@ -199,14 +362,15 @@ class DQAssessment:
                     property_vocab_map[vocab_name].append(prop_)
 
         self.counter_vocab_map = {}
-        for vocab in self.vocab_names:
+        for vocab in self.assessed_vocab_names:
             vocab_name = self.config[vocab]['vocab_name']
 
-            # Instantiate shapes
-            shacl_shapes = self.shape_builder.vocabulary_shapes(self, vocab, property_vocab_map, class_vocab_map)
+            with self.profiler.phase('vocabularies', 'shape_building'):
+                # Instantiate shapes
+                shacl_shapes = self.shape_builder.vocabulary_shapes(self, vocab, property_vocab_map, class_vocab_map)
 
-            # Create shape graph
-            shape_graph = create_shape_graph(shacl_shapes)
+                # Create shape graph
+                shape_graph = create_shape_graph(shacl_shapes)
 
             # Store shapes
             folder_path = f'{DATASETS_FOLDER_PATH}/{self.dataset_name}/shapes'
@@ -218,13 +382,20 @@ class DQAssessment:
             # Validate shapes
             file_path = self.config[vocab]["file_path"]
             file_format = self.config[vocab]["file_format"]
-            _, val_graph, _, _, validation_time = validate_shacl_constraints(None, file_path, file_format, shape_graph, vocabs=[vocab], config=self.config)
+            skipped = self.is_past_deadline()
+            if skipped:
+                logging.info(f"Time budget exceeded, the shapes of vocabulary {vocab_name} aren't validated")
+            if len(shape_graph) and not skipped:
+                _, val_graph, _, _, validation_time = validate_shacl_constraints(None, file_path, file_format, shape_graph, vocabs=[vocab], config=self.config, profiler=self.profiler, stage='vocabularies')
+            else:
+                val_graph = Graph()
 
             with open(f'{PROFILE_VOCABULARIES_FOLDER_PATH}/{vocab_name}.json', 'r', encoding='utf-8') as f:
                 vocab_profile = json.load(f)
 
             # Process validation results
-            self.process_validation_result_vocabularies(val_graph, vocab_name, vocab_profile, property_vocab_map, class_vocab_map)
+            with self.profiler.phase('vocabularies', 'result_processing'):
+                self.process_validation_result_vocabularies(val_graph, vocab_name, vocab_profile, property_vocab_map, class_vocab_map, skipped)
 
         return validation_time
 
@@ -234,22 +405,7 @@ class DQAssessment:
         """
         validation_time = 0
 
-        # Instantiate shapes
-        accessibility_shapes = self.shape_builder.accessibility_data_shapes()
-        self.regex_pattern, self.uri_space, contextual_shapes = self.shape_builder.contextual_data_shapes()
-        representational_shapes, self.shape_property_map_representational = self.shape_builder.representational_data_shapes(self.graph_profile)
-
-        # Update graph_profile because it gets updated inside intrinsic_data_shapes
-        intrinsic_shapes, self.graph_profile, self.shape_property_map_intrinsic, self.shape_class_map = self.shape_builder.intrinsic_data_shapes(self.graph_profile)
-
-        shacl_shapes = (accessibility_shapes + '\n' + 
-                        contextual_shapes + '\n' +
-                        representational_shapes + '\n' +
-                        intrinsic_shapes
-                    )
-
-        # Create shapes graph
-        shape_graph = create_shape_graph(shacl_shapes)
+        shape_graph = self.build_data_shapes()
 
         # Save shapes graph
         folder_path = f'{DATASETS_FOLDER_PATH}/{self.dataset_name}/shapes'
@@ -258,23 +414,149 @@ class DQAssessment:
         shape_graph.serialize(destination=file_path, format='turtle')
         logging.info(f'Data shapes for dataset {self.dataset_name} saved in {file_path}')
 
-        _, val_graph, _, self.graph_profile, validation_time = validate_shacl_constraints(self.graph_profile, self.graph_file_path, self.graph_file_format, shape_graph, self.vocab_names, self.config)
+        engine = None
+        if self.time_budget is not None:
+            self.scheduler = ShapeScheduler(self.graph_profile, self.deadline, on_checkpoint=self.write_partial_data_results)
+            engine = self.scheduler
+
+        if len(shape_graph):
+            _, val_graph, _, self.graph_profile, validation_time = validate_shacl_constraints(self.graph_profile, self.graph_files, self.graph_file_format, shape_graph, self.vocab_names, self.config, profiler=self.profiler, stage='data', engine=engine, transform=self.sampler)
+        else:
+            val_graph = Graph()
+
+        with self.profiler.phase('data', 'result_processing'):
+            # Process validation results
+            if self.sampler is not None:
+                val_graph = self.sampler.filter_report(val_graph)
+            results = self.process_validation_result_data(val_graph)
+            self.add_denominators(results)
+            if self.sampler is not None:
+                self.add_confidence_intervals(results)
+            if self.scheduler is not None:
+                self.mark_skipped_shapes(results, self.scheduler.skipped_shapes, self.scheduler.validated_shapes, 'skipped')
+            self.mark_disabled_metrics(results)
+            
+            # Store dq assessment results
+            folder_path = DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)
+            os.makedirs(folder_path, exist_ok=True)
+            file_path = f'{folder_path}/dq_assessment_{self.dataset_name}_data.json'
+            write_results(file_path, results, self.results_format)
+            self.aggregate_results(results, self.binary_violation_counts, stage='data')
+
+        return validation_time
+
+    def write_partial_data_results(self, report_graph, pending_shapes):
+        """
+            Writes the data results of the shapes validated so far (time budget checkpoints),
+            the metrics of the pending shapes are marked as pending
+        """
+        if self.sampler is not None:
+            report_graph = self.sampler.filter_report(report_graph)
+
+        # The violations of the final results are recorded once, after the validation
+        writer, bitmaps = self.violations_writer, self.violation_bitmaps
+        self.violations_writer, self.violation_bitmaps = None, {}
+        try:
+            results = self.process_validation_result_data(report_graph)
+        finally:
+            self.violations_writer, self.violation_bitmaps = writer, bitmaps
+        self.mark_skipped_shapes(results, pending_shapes, self.scheduler.validated_shapes, 'pending')
 
-        # Process validation results
-        results = self.process_validation_result_data(val_graph)
-        
-        # Store dq assessment results
         folder_path = DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)
         os.makedirs(folder_path, exist_ok=True)
         file_path = f'{folder_path}/dq_assessment_{self.dataset_name}_data.json'
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=4)
+        self.mark_disabled_metrics(results)
+        file_path = write_results(file_path, results, self.results_format)
+        logging.info(f"Partial data results saved in {file_path} ({len(self.scheduler.validated_shapes)} shapes validated, {len(pending_shapes)} pending)")
 
-        return validation_time
+    def mark_skipped_shapes(self, results, skipped_shapes, validated_shapes, status):
+        """
+            Marks the metrics whose shapes weren't validated (time budget): no measure and status skipped/pending.
+            Metrics with several shapes (e.g. DeprecatedClasses) are only marked if none of their shapes was validated.
+            The skipped shapes instantiated per class/property make their family row partial (ResultsAggregator).
+        """
+        def get_result_key(shape_uri):
+            match = SHAPE_NAME_PATTERN.match(shape_uri.removeprefix("https://www.example.org/"))
+            if match is None:
+                return None
+            metric, counter = match.group('metric'), match.group('counter')
+            return f'{metric}_{counter}' if counter is not None and f'{metric}_{counter}' in results else metric
+
+        validated_keys = {get_result_key(shape) for shape in validated_shapes}
+        for key in {get_result_key(shape) for shape in skipped_shapes} - validated_keys:
+            if key not in results:
+                continue
+            results[key]['measure'] = None
+            results[key]['status'] = status
+            results[key]['message'] = 'Not evaluated: the time budget was exceeded.' if status == 'skipped' else 'Not evaluated yet.'
+            results[key]['violations'] = ''
+            results[key]['num_violations'] = 0
+
+    def is_past_deadline(self):
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def mark_skipped_stage(self, results):
+        """
+            Marks all the metrics of a stage that wasn't validated because the time budget was exceeded
+            (metadata or a vocabulary), the shapes instantiated per class/property make a single skipped row
+        """
+        for info in results.values():
+            if not isinstance(info, dict):
+                continue
+            info['measure'] = None
+            info['status'] = 'skipped'
+            info['message'] = 'Not evaluated: the time budget was exceeded.'
+            info['violations'] = ''
+            info['num_violations'] = 0
+
+    def is_metric_enabled(self, metric):
+        return self.metric_selection.is_enabled(metric)
 
-    def process_validation_result_metadata(self, results_graph):
+    def mark_disabled_metrics(self, results):
+        """
+            Marks the metrics disabled in the config/CLI (include_metrics/exclude_metrics): their shapes
+            weren't instantiated, so they have no measure and status skipped.
+        """
+        if not self.metric_selection.active:
+            return
+        for key, info in results.items():
+            if not isinstance(info, dict) or self.is_metric_enabled(key):
+                continue
+            info['measure'] = None
+            info['status'] = 'skipped'
+            info['message'] = 'Not evaluated: the metric is disabled in the metric selection.'
+            info['violations'] = ''
+            info['num_violations'] = 0
+
+    def build_data_shapes(self):
+        """
+            Instantiates the data shapes and returns the shapes graph.
+            The maps of shapes to properties/classes used to process the validation results are kept in self.
+        """
+        with self.profiler.phase('data', 'shape_building'):
+            # Instantiate shapes
+            accessibility_shapes = self.shape_builder.accessibility_data_shapes()
+            self.regex_pattern, self.uri_space, contextual_shapes = self.shape_builder.contextual_data_shapes()
+            representational_shapes, self.shape_property_map_representational = self.shape_builder.representational_data_shapes(self.graph_profile)
+
+            # Update graph_profile because it gets updated inside intrinsic_data_shapes
+            intrinsic_shapes, self.graph_profile, self.shape_property_map_intrinsic, self.shape_class_map = self.shape_builder.intrinsic_data_shapes(self.graph_profile)
+
+            shacl_shapes = (accessibility_shapes + '\n' + 
+                            contextual_shapes + '\n' +
+                            representational_shapes + '\n' +
+                            intrinsic_shapes
+                        )
+
+            # Create shapes graph
+            shape_graph = create_shape_graph(shacl_shapes)
+
+        return shape_graph
+
+    def process_validation_result_metadata(self, results_graph, skipped=False):
         """
             Process validation results for shapes validated against the metadata
+            (skipped: not validated, the time budget was exceeded)
         """
         
         with open(DQ_MEASURES_METADATA_TEMPLATE_FILE_PATH, 'r', encoding='utf-8') as f:
@@ -287,8 +569,11 @@ class DQAssessment:
         validation_results = results_graph.subjects(RDF.type, SH.ValidationResult)
         if not any(validation_results):
             # If no validation results, save template files without updating measures
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=4)
+            if skipped:
+                self.mark_skipped_stage(results)
+            self.mark_disabled_metrics(results)
+            write_results(file_path, results, self.results_format)
+            self.aggregate_results(results, stage='metadata')
             return
 
         for result in results_graph.subjects(RDF.type, SH.ValidationResult):
@@ -317,7 +602,12 @@ class DQAssessment:
                 if result_path == DCTERMS.license:
                     metric = 'MachineReadableLicense'
 
+            if not self.is_metric_enabled(metric):
+                # The metric shares the metadata shape with metrics that are enabled
+                continue
+
             results[metric]["measure"] = 0
+            self.add_violation('metadata', results_graph, result, metric)
 
             constraint_type = results_graph.value(result, SH.sourceConstraintComponent)
             if constraint_type != SH.MinCountConstraintComponent and constraint_type != SH.OrConstraintComponent:
@@ -328,22 +618,23 @@ class DQAssessment:
                 # If the constraint is a MinCount, it means the property is not present
                 results[metric]["message"] = message
             
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=4)
+        self.mark_disabled_metrics(results)
+        write_results(file_path, results, self.results_format)
+        self.aggregate_results(results, stage='metadata')
 
 
-    def process_validation_result_vocabularies(self, results_graph, vocab, vocab_profile, property_vocab_map, class_vocab_map):
+    def process_validation_result_vocabularies(self, results_graph, vocab, vocab_profile, property_vocab_map, class_vocab_map, skipped=False):
 
         with open(DQ_MEASURES_VOCABULARIES_TEMPLATE_FILE_PATH, 'r', encoding='utf-8') as f:
             metrics_generic = json.load(f)
   
-        if os.path.exists(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH):
-            with open(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH, 'r', encoding='utf-8') as f:
+        if os.path.exists(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name)):
+            with open(DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name), 'r', encoding='utf-8') as f:
                 metrics_specific = json.load(f)
         
         results = metrics_generic | metrics_specific
 
-        violating_entities_per_shape = defaultdict(set)
+        violating_entities_per_shape = defaultdict(new_bitmap)
 
         folder_path = DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)
         file_path = f'{folder_path}dq_assessment_vocabularies_{vocab}.json'
@@ -353,8 +644,13 @@ class DQAssessment:
             # If no validation results, save template files without updating measures
             for metric, info in results.items():
                 info['vocab'] = vocab
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=4)
+                if metric in ('LabelForClasses', 'LabelForProperties'):
+                    info['denominator'] = get_vocabulary_denominator(metric, vocab_profile)
+            if skipped:
+                self.mark_skipped_stage(results)
+            self.mark_disabled_metrics(results)
+            write_results(file_path, results, self.results_format)
+            self.aggregate_results(results, stage=f'vocabularies.{vocab}')
             return
 
         for result in results_graph.subjects(RDF.type, SH.ValidationResult):
@@ -381,35 +677,38 @@ class DQAssessment:
             elif metric and focus_node:
                 # consider unique focus nodes for each metric
                 if metric not in violating_entities_per_shape:
-                    violating_entities_per_shape[metric] = set()
+                    violating_entities_per_shape[metric] = new_bitmap()
                 
                 # TODO: check if this is needed
                 # check that the class/property is actually from the vocabulary
-                violating_entities_per_shape[metric].add(focus_node)
+                violating_entities_per_shape[metric].add(self.entity_ids.encode(focus_node))
+
+            self.add_violation('vocabularies', results_graph, result, metric, vocab)
 
             if results[metric]["message"] == "":
                 results[metric]["message"] = message
         
         for metric, nodes in violating_entities_per_shape.items():
+            self.violation_bitmaps[(vocab, metric)] = nodes
             count = len(nodes)
-            if metric == 'LabelForClasses':
-                denominator = vocab_profile.get("num_all_classes", 1) + vocab_profile.get("num_other_classes", 1)
-            elif metric == 'LabelForProperties':
-                denominator = vocab_profile.get("num_all_properties", 1)+ vocab_profile.get("num_other_properties", 1)
+            denominator = get_vocabulary_denominator(metric, vocab_profile)
             
             ratio = 1 - (count / denominator)
             results[metric]["measure"] = ratio
-            results[metric]['violations'] = '; '.join(nodes)
+            results[metric]['violations'] = self.capture_violations(metric, nodes)
             results[metric]['num_violations'] = count
         
         for metric, info in results.items():
             info['vocab'] = vocab
+            if metric in ('LabelForClasses', 'LabelForProperties'):
+                info['denominator'] = get_vocabulary_denominator(metric, vocab_profile)
 
         folder_path = DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)
         file_path = f'{folder_path}dq_assessment_vocabularies_{vocab}.json'
         os.makedirs(folder_path, exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=4)
+        self.mark_disabled_metrics(results)
+        write_results(file_path, results, self.results_format)
+        self.aggregate_results(results, stage=f'vocabularies.{vocab}')
 
 
     def process_validation_result_data(self, results_graph):
@@ -417,14 +716,18 @@ class DQAssessment:
         Process validation results for shapes validated against the data.
         """
         
-        violating_entities_per_shape = defaultdict(lambda: {"entities": set()})
+        violating_entities_per_shape = defaultdict(lambda: {"entities": new_bitmap()})
+        # Violating entities/values of the binary metrics whose violations are listed (e.g. DeprecatedClasses)
+        binary_violations = defaultdict(new_bitmap)
+        # Violations listed in the results of binary metrics (e.g. DeprecatedClasses), counted as they are added
+        self.binary_violation_counts = Counter()
         
         with open(DQ_MEASURES_DATA_GENERIC_TEMPLATE_FILE_PATH, 'r', encoding='utf-8') as f:
             metrics_generic = json.load(f)
         
         metrics_specific = {}
-        if os.path.exists(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH):
-            with open(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH, 'r', encoding='utf-8') as f:
+        if os.path.exists(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name)):
+            with open(DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name), 'r', encoding='utf-8') as f:
                 metrics_specific = json.load(f)
 
         results = metrics_generic | metrics_specific
@@ -476,11 +779,8 @@ class DQAssessment:
                     metric.startswith("SelfDescriptiveFormatProperties")):
                     
                     focus_node = results_graph.value(result, SH.focusNode)
-                    if "violations" not in results[metric] or results[metric]['violations'] == '':
-                        results[metric]['violations'] = str(focus_node.toPython())
-                        
-                    elif results[metric]['violations'] != '':
-                        results[metric]['violations'] += ';' + str(focus_node.toPython())
+                    self.binary_violation_counts[metric] += 1
+                    binary_violations[metric].add(self.entity_ids.encode(focus_node))
 
                 results[metric]["measure"] = 0 
             
@@ -500,22 +800,22 @@ class DQAssessment:
                     if metric not in violating_entities_per_shape:
                         if metric == 'UsageExternalURIEntities':
                             violating_entities_per_shape[metric] = {
-                                "entities": set(),
+                                "entities": new_bitmap(),
                                 "property": self.interlinking_property
                             }
                         elif metric == 'DifferentLanguagesLabelsEntities':
                             violating_entities_per_shape[metric] = {
-                                "entities": set(),
+                                "entities": new_bitmap(),
                                 "property": self.labeling_property
                             }
                         elif metric == 'DifferentLanguagesDescriptionsEntities':
                             violating_entities_per_shape[metric] = {
-                                "entities": set(),
+                                "entities": new_bitmap(),
                                 "property": self.description_property
                             }
                         else:
                             violating_entities_per_shape[metric] = {
-                                "entities": set(),
+                                "entities": new_bitmap(),
                                 "property": self.shape_property_map_intrinsic[int(counter)]
                             }
 
@@ -526,7 +826,7 @@ class DQAssessment:
                     if metric not in violating_entities_per_shape:
    
                         violating_entities_per_shape[metric] = {
-                            "entities": set(),
+                            "entities": new_bitmap(),
                             "class": self.shape_class_map[int(counter)]
                         }
                 else:
@@ -537,18 +837,18 @@ class DQAssessment:
                         
                         if metric.startswith("DeprecatedProp"):
                             violating_entities_per_shape[metric] = {
-                                "entities": set(),
+                                "entities": new_bitmap(),
                                 "property": self.shape_property_map_intrinsic[int(counter)]
                             }
                         else:
                             violating_entities_per_shape[metric] = {
-                                "entities": set()
+                                "entities": new_bitmap()
                             }
 
                 focus_node = results_graph.value(result, SH.focusNode)
 
                 if metric and focus_node:
-                    violating_entities_per_shape[metric]['entities'].add(focus_node)
+                    violating_entities_per_shape[metric]['entities'].add(self.entity_ids.encode(focus_node))
 
                 if results[metric]["message"] == "":
                     results[metric]["message"] = message
@@ -558,735 +858,121 @@ class DQAssessment:
                     # hence, the property can be present but is not being used properly
                     message += ' (the values for the property are not correct)'
 
+            self.add_violation('data', results_graph, result, metric)
+
         for metric, info in violating_entities_per_shape.items():
 
+            self.violation_bitmaps[(None, metric)] = info["entities"]
             count = len(info["entities"])
-            denominator = get_denominator(metric, info, self.graph_profile)
+            # In approximate mode the ratios are estimated on the sample
+            profile = self.graph_profile if self.sampler is None else self.sampler.sample_profile
+            denominator = get_denominator(metric, info, profile)
+            if "estimates" in profile:
+                # Estimated counts can be slightly lower than the number of violating entities
+                denominator = max(denominator, count)
             ratio = 1 - (count / denominator)
             results[metric]["measure"] = ratio
-            results[metric]['violations'] = '; '.join(info['entities'])
+            results[metric]['denominator'] = denominator
+            results[metric]['violations'] = self.capture_violations(metric, info['entities'])
             results[metric]['num_violations'] = count
                 
             if 'class' in info:
                 results[metric]['class'] = info['class']
             elif 'property' in info:
                 results[metric]['property'] = info['property']
+
+        # num_violations of these metrics is the number of validation results (binary_violation_counts)
+        for metric, entities in binary_violations.items():
+            self.violation_bitmaps[(None, metric)] = entities
+            results[metric]['violations'] = self.capture_violations(metric, entities)
             
         return results
     
-    def create_aggregate_metric(self, metric_name, score, uri, type_, tuple_=False):
-        # type_ can be 'classes' or 'properties'
-        self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] += 1
-        if str(score) == "1":
-            self.aggregate_dict_counter[metric_name][f'{metric_name}_ones'] += 1
-        else:
-            if tuple_:
-                self.aggregate_dict_counter[metric_name][f'{metric_name}_{type_}'].append((uri, score))
-            else:
-                self.aggregate_dict_counter[metric_name][f'{metric_name}_{type_}'].append(uri)
-
-    def create_metric_info(self, metric_name, ratio, violations, num_violations, vocab=None):
-
-        metric_dict = {
-            "misplaced_properties": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN2',
-                'metric': 'No misplaced classes or properties',
-                'metric_description': 'Verifies that properties aren\'t used as classes',
-                'score': 0,
-                'message': 'properties are used as classes',
-                'metric_type': 'binary',
-                'metric_calculation': "0 if property is used as a class, 1 otherwise.",
-                "meta_metric_calculation": "Number of correctly used properties / Number of properties defined in vocabularies",
-                'shape_name': 'MisplacedPropertiesShape',
-                "shape_template": "ex:MisplacedPropertiesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetNode PROPERTY_URI;\\n\\tsh:property [\\n\\tsh:path [sh:inversePath rdf:type];\\n\\tsh:maxCount 0;\\n\\t].",
-                'violations': '',
-                "violation_text": "properties used as a classes",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "misplaced_classes": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN2',
-                'metric': 'No misplaced classes or properties',
-                'metric_description': 'Verifies that classes aren\'t used as properties',
-                'score': 0,
-                'message': 'classes are used as properties',
-                'metric_type': 'binary',
-                'metric_calculation': "0 if property is used as a class, 1 otherwise.",
-                "meta_metric_calculation": "Number of correctly used classes / Number of classes defined in vocabularies",
-                'shape_name': 'MisplacedClassesShape',
-                "shape_template": "ex:MisplacedClassesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf rdf:type;\\n\\tsh:or (\\n\\t[sh:path rdf:type; sh:hasValue rdfs:Class;]\\n\\t[sh:path rdf:type; sh:hasValue rdf:Property;]\\n\\t[sh:path rdf:type; sh:hasValue owl:NamedIndividual;]\\n\\t[\\n\\tsh:path CLASS_URI;\\n\\tsh:maxCount 0;\\n\\t]\\n\\t).",
-                'violations': '',
-                "violation_text": "classes used as a property",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "correct_range": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN9',
-                'metric': 'Correct domain and range definition',
-                'metric_description': 'Verifies that properties are used with the correct range.',
-                'score': 0,
-                'message': 'are used with incorrect range',
-                'metric_type': 'count',
-                'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
-                'meta_metric_calculation': 'Number of properties used with a correct range / Number of properties with a defined range',
-                'shape_name': 'CorrectRangeShape',
-                "shape_template": "ex:CorrectRangeShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:property [\\nsh:path PROPERTY_URI;\\nsh:datatype DATATYPE; % or sh:class CLASS\\n].\\n\\nex:CorrectRangeShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:property [\\nsh:path PROPERTY_URI;\\nsh:nodeKind sh:BlankNodeOrIRI;\\n].\\n\\nex:CorrectRangeShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:property [\\nsh:path PROPERTY_URI;\\nsh:nodeKind sh:Literal;\\n].\\n\\nex:CorrectRangeShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:property [\\nsh:path PROPERTY_URI;\\nsh:or (\\n[ sh:nodeKind sh:BlankNodeOrIri; ]\\n[ sh:nodeKind sh:Literal; ]\\n);\\n].",
-                'violations': '',
-                "violation_text": "(property, individual score)",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "correct_domain": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN9',
-                'metric': 'Correct domain and range definition.',
-                'metric_description': 'Verifies that properties are used with the correct domain.',
-                'score': 0,
-                'message': 'properties are used with incorrect domains',
-                'metric_type': 'count',
-                'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
-                "meta_metric_calculation": "Number of properties used with their correct domain / Number of properties with a defined domain",
-                'shape_name': 'CorrectDomainShape',
-                "shape_template": "ex:CorrectDomainShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:class CLASS.\\n\\nex:CorrectDomainShape\\na sh:NodeShape ;\\nsh:targetSubjectsOf PROPERTY_URI;\\nsh:nodeKind sh:BlankNodeOrIRI.",
-                'violations': '',
-                "violation_text": "(property, individual score)",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "entities_disjoint_classes": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN1',
-                'metric': 'No use of entities as members of disjoint classes',
-                'metric_description': 'Verifies there are no entities that are members of disjoint classes.',
-                'score': 0,
-                'message': 'classes have instances of disjoint classes',
-                'metric_type': 'count',
-                'metric_calculation': '1 - (Number of violations / Number of entities of the target class)',
-                "meta_metric_calculation": "Number of classes with no member as instance of a disjoint class / Number of disjoint classes",
-                'shape_name': 'EntitiesDisjointClassesShape',
-                "shape_template": "ex:EntitiesDisjointClassesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetClass CLASS_URI;\\n\\tsh:not [ sh:class DISJOINT_CLASS_URI].",
-                'violations': '',
-                "violation_text": "(disjoint class, individual score)",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "irreflexive_property": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN10',
-                'metric': 'No inconsistent values',
-                'metric_description': 'Verifies the correct usage of irreflexive properties.',
-                'score': 0,
-                'message': 'properties don\'t conform to their irreflexive characteristic',
-                'metric_type': 'count',
-                'metric_calculation': '1 - (Number of violations / Number of subjects that use the property)',
-                "meta_metric_calculation": "Number of irreflexive properties correctly used / Number of irreflexive properties",
-                'shape_name': 'IrreflexivePropertyShape',
-                "shape_template": "ex:IrreflexivePropertyShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:disjoint PROPERTY_URI.",
-                'violations': '',
-                "violation_text": "(irreflexive property, individual score)",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "self_descriptive_format_properties": {
-                "dimension": 'Interpretability',
-                "metric_id": "ITP1",
-                "metric": "Use of self-descriptive formats",
-                'metric_description': 'Verifies if properties use IRIs as values',
-                'score': 0,
-                'message': 'properties use at least one literal or blank node',
-                'metric_type': 'count',
-                'metric_calculation': '1 if the property uses IRIs as values, 0 otherwise.',
-                "meta_metric_calculation": "Number of properties that have IRIs as values / Number of properties used in the dataset",
-                'shape_name': 'SelfDescriptiveFormatPropertiesShape',
-                "shape_template": "ex:SelfDescriptiveFormatPropertiesShape\\na sh:NodeShape ;\\nsh:targetObjectsOf PROPERTY_URI;\\nsh:nodeKind sh:IRI.",
-                'violations': '',
-                "violation_text": "properties used with blank nodes or literals",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "misuse_object_properties": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN3',
-                'metric': 'No misuse of owl:DatatypeProperty or owl:ObjectProperty',
-                'metric_description': 'Verifies that owl:ObjectProperty aren\'t used with Literals',
-                'score': 0,
-                'message': 'object properties are used with literals or blank nodes',
-                'metric_type': 'count',
-                'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
-                "meta_metric_calculation": "Number of owl:ObjectProperty correctly used / Number of owl:ObjectProperty used in the dataset",
-                'shape_name': 'MisuseOwlObjectPropertiesShape',
-                "shape_template": "ex:MisuseObjectPropertiesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\t\\tsh:path PROPERTY_URI;\\n\\t\\tsh:nodeKind sh:BlankNodeOrIRI;\\n\\t].",
-                'violations': '',
-                "violation_text": "(object property, individual score)",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "misuse_datatype_properties": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN3',
-                'metric': 'No misuse of owl:DatatypeProperty or owl:ObjectProperty',
-                'metric_description': 'Verifies that owl:DatatypeProperty are used with Literals',
-                'score': 0,
-                'message': 'datatype properties are used with IRIs',
-                'metric_type': 'count',
-                'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
-                "meta_metric_calculation": "Number of owl:DatatypeProperty correctly used / Number of owl:DatatypeProperty used in the",
-                'shape_name': 'MisuseOwlDatatypePropertiesShape',
-                "shape_template": "ex:MisuseDatatypePropertiesShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\tsh:path PROPERTY_URI;\\n\\tsh:nodeKind sh:Literal;\\n\\t].",
-                'violations': ' ',
-                "violation_text": "(datatype property, individual score)",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "functional_property": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN10',
-                'metric': 'No inconsistent values',
-                'metric_description': 'Verifies the correct usage of functional properties.',
-                'score': 0,
-                'message': 'properties don\'t conform to their functional characteristic',
-                'metric_type': 'count',
-                'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
-                "meta_metric_calculation": "Number of functional properties correctly used / Number of functional properties",
-                'shape_name': 'FunctionalPropertyShape',
-                "shape_template": "ex:FunctionalPropertyShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\t\\tsh:path PROPERTY_URI;\\n\\t\\tsh:maxCount 1;\\n\\t].",
-                'violations': '',
-                "violation_text": "(functional property, individual score)",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "asymmetric_property": {
-                'dimension': 'Consistency',
-                'metric_id': 'CN10',
-                'metric': 'No inconsistent values',
-                'metric_description': 'Verifies the correct usage of asymmetric properties.',
-                'score': 0,
-                'message': 'properties don\'t conform to their asymmetric characteristic',
-                'metric_type': 'count',
-                'metric_calculation': '1 - (Number of violations / Number of entities that use the property)',
-                "meta_metric_calculation": "Number of asymmetric properties correctly used / Number of asymmetric properties",
-                'shape_name': 'AsymmetricPropertyShape',
-                "shape_template": "ex:AsymmetricPropertyShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\t\\tsh:path [sh:inversePath PROPERTY_URI];\\n\\t\\tsh:disjoint PROPERTY_URI;\\n\\t].",
-                'violations': '',
-                "violation_text": "(asymmetric property, individual score)",
-                'num_violations': 0,
-                "vocab": ''
-            },
-            "schema_completeness_class_usage": {
-                    'dimension': 'Completeness',
-                    'metric_id': 'CP1',
-                    'metric': 'Schema completeness',
-                    'metric_description': 'Verifies that classes defined in vocabularies are used in the dataset.',
-                    'score': 0,
-                    'message': 'classes aren\'t used in the dataset',
-                    'metric_type': 'binary',
-                    "metric_calculation": "1 if the class is used, 0 otherwise",
-                    "meta_metric_calculation": "Number of classes used from the vocabularies / Number of classes defined in vocabularies",
-                    'shape_name': 'SchemaCompletenessClassUsageShape',
-                    "shape_template": "ex:NotNamedIndividualShape\\n\\ta sh:NodeShape;\\n\\tsh:property [\\n\\t\\tsh:path rdf:type ;\\n\\t\\tsh:not [ sh:hasValue owl:NamedIndividual ] ;\\n\\t].\\nex:SchemaCompletenessClassUsageShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetNode CLASS_URI ;\\n\\tsh:property [\\n\\t\\tsh:path [ sh:inversePath rdf:type ] ;\\n\\t\\tsh:minCount 1 ;\\n\\t\\tsh:qualifiedValueShape [\\n\\t\\t\\tsh:node ex:NotNamedIndividualShape ;\\n\\t\\t];\\n\\t\\tsh:qualifiedMinCount 1 ;\\n\\t].",
-                    'violations': '',
-                    "violation_text": "classes defined in the vocabulary that are not used in the dataset",
-                    'num_violations': 0,
-                    "vocab": ''
-                },
-            "malformed_literal": {
-                "dimension": "Syntactic Validity",
-                "metric_id": "SV3",
-                "metric": "No malformed datatype literals",
-                "score": 0,
-                "message": "properties are used with malformed datatype values",
-                "metric_description": "Verifies that datatype property's values follow the expected lexical syntax of the datatype or that it isn't an ill-typed literal.",
-                "metric_type": "count",
-                "metric_calculation": "1 - (Number of violations / Number of entities that use the property)",
-                "meta_metric_calculation": "Number of correctly used properties / Number of properties with a datatype range",
-                'shape_name': 'MalformedDatatypeShape',
-                "shape_template": "ex:MalformedLiteralShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf PROPERTY_URI;\\n\\tsh:property [\\n\\tsh:path PROPERTY_URI ;\\n\\tsh:datatype DATATYPE_URI;\\n\\t].",
-                "violations": "",
-                "violation_text": "(property used with a malformed literal, individual score)",
-                "num_violations": 0,
-                "vocab": ''
-            },
-            "deprecated_property": {
-                "dimension": "Consistency",
-                "metric_id": "CN4",
-                "metric": "Members of owl:DeprecatedClass or owl:DeprecatedProperty not used",
-                "score": 0,
-                "message": 'deprecated properties are used in the dataset',
-                "metric_description": "Verifies that deprecated properties aren't used",
-                'metric_type': 'count',
-                'metric_calculation': '1 - (Number of violations / Number of entities)',
-                'meta_metric_calculation': 'Number of unused deprecated properties / Number of deprecated properties',
-                'shape_name': 'DeprecatedPropertiesShape',
-                "shape_template": "ex:DeprecatedPropertiesUsageShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetSubjectsOf rdf:type;\\n\\tsh:or (\\n\\t\\t[sh:path rdf:type; sh:hasValue rdfs:Class;]\\n\\t\\t[sh:path rdf:type; sh:hasValue rdf:Property;]\\n\\t\\t[sh:path rdf:type; sh:hasValue owl:\\n\\t\\tNamedIndividual;]\\n\\t\\t[ sh:path PROPERTY_URI; sh:maxCount 0; ]\\n\\t).",
-                'violations': '',
-                "violation_text": "(deprecated property, individual score)",
-                'num_violations': 0,
-                'vocab': ''
-            },
-            "undefined_classes": {
-                "dimension": "Interpretability",
-                "metric_id": "ITP3",
-                "metric": "Invalid usage of undefined classes and properties",
-                "score": 0,
-                "message": "",
-                "metric_description": "Verifies that the classes used in the dataset are defined in the vocabulary.",
-                "metric_type": "binary",
-                "metric_calculation": "1 if the class is defined, 0 otherwise",
-                "meta_metric_calculation": "Number of defined classes (from the vocabulary) used / Number of classes (from the vocabulary) used in the dataset",
-                'shape_name': 'UndefinedClassShape',
-                "shape_template": "ex:UndefinedClassShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetNode CLASS_URI;\\n\\tsh:property [\\n\\t\\tsh:path rdf:type;\\n\\t\\tsh:hasValue rdfs:Class;\\n\\t\\tsh:minCount 1;\\n\\t].",
-                "violations": "",
-                "violation_text": "undefined classes",
-                "num_violations": 0,
-                "vocab": ''
-            },
-            "undefined_properties": {
-                "dimension": "Interpretability",
-                "metric_id": "ITP3",
-                "metric": "Invalid usage of undefined classes and properties",
-                "score": 0,
-                "message": "",
-                "metric_description": "Verifies that the properties used in the dataset are defined in the vocabulary.",
-                "metric_type": "binary",
-                "metric_calculation": "1 if the property is defined, 0 otherwise",
-                "meta_metric_calculation": "Number of defined properties (from the vocabulary) used / Number of properties (from the vocabulary) used in the dataset",
-                'shape_name': 'UndefinedPropertyShape',
-                "shape_template": "ex:UndefinedPropertyShape\\n\\ta sh:NodeShape ;\\n\\tsh:targetNode PROPERTY_URI;\\n\\tsh:property [\\n\\t\\tsh:path rdf:type;\\n\\t\\tsh:hasValue rdf:Property;\\n\\t\\tsh:minCount 1;\\n\\t].",
-                "violations": "",
-                "violation_text": "undefined properties",
-                "num_violations": 0,
-                "vocab": ''
-            }
-
-        }
-
-        metric_dict[metric_name]["score"] = ratio
-        
-        if ratio < 1 and not vocab:
-            param_shapes = f'count_{metric_name}_shapes'
-            param_ones = f'{metric_name}_ones'
-            metric_dict[metric_name]["message"] = f'{self.aggregate_dict_counter[metric_name][param_shapes] - self.aggregate_dict_counter[metric_name][param_ones]} ' + metric_dict[metric_name]["message"]
-        else:
-            metric_dict[metric_name]["message"] = ''
-
-        metric_dict[metric_name]["violations"] = violations
-        metric_dict[metric_name]["num_violations"] = num_violations
-
-        if vocab:
-            metric_dict[metric_name]["vocab"] = vocab
-
-        return metric_dict[metric_name]
-
-        
-    def create_dq_results_csv(self):
-
+    def get_max_violations(self, metric):
         """
-        Create a CSV with columns: 'dimension', 'metric', 'metric_id', 'metric_description', 'score', 'message', 'metric_type', 'metric_calculation', 'meta_metric_calculation', 'shape_template', 'violations'
-        from DQ assessment JSON files.
+        Max. number of violations kept for a metric (0 = all)
         """
-        results_folder = DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)
-
-        files = []
-        if self.validate_metadata_shapes: 
-            files.append(f'dq_assessment_{self.dataset_name}_metadata.json')
-        
-        if self.validate_data_shapes: 
-            files.append(f'dq_assessment_{self.dataset_name}_data.json')
-
-        if self.validate_vocabulary_shapes:
-            vocab_files = [file.split("/")[-1] for file in glob.glob(f'{results_folder}dq_assessment_vocabularies_*.json')]
-            files.extend(vocab_files)
+        return self.max_violations_per_metric.get(metric.split('_')[0].lower(), self.max_violations)
 
-        rows = []
-        counter_shapes = 0
+    def capture_violations(self, metric, bitmap):
+        """
+        Violating entities of a metric stored in the results: all of them, or the first (by ID, i.e. order of the report)
+        or a reservoir sample of max_violations
+        """
+        max_violations = self.get_max_violations(metric)
+        if max_violations and len(bitmap) > max_violations:
+            bitmap = sample_stream(bitmap, max_violations, self.violations_sampling, random.Random(metric))
+        return '; '.join(self.entity_ids.decode_all(bitmap))
 
-        for filename in files:
+    def add_violation(self, stage, results_graph, result, metric, vocab=None):
+        """
+        Stores a validation result in the violations file (violations_format = parquet)
+        """
+        if self.violations_writer is None:
+            return
+        self.violations_writer.add(stage, metric, results_graph.value(result, SH.focusNode),
+                                   results_graph.value(result, SH.value), vocab)
 
-            file_path = os.path.join(results_folder, filename)
-            
-            if not os.path.exists(file_path):
+    def add_denominators(self, results):
+        """
+        Adds the denominator of the ratio of the entity ratio metrics that have no violations
+        (e.g. the weight of the score of a named graph in the rollup)
+        """
+        profile = self.graph_profile if self.sampler is None else self.sampler.sample_profile
+        metric_properties = {
+            'UsageExternalURIEntities': self.interlinking_property,
+            'DifferentLanguagesLabelsEntities': self.labeling_property,
+            'DifferentLanguagesDescriptionsEntities': self.description_property
+        }
+        for metric, info in results.items():
+            # The shapes instantiated per class/property are aggregated per family
+            if metric not in COUNT_METRICS or not isinstance(info, dict) or 'denominator' in info:
                 continue
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            self.aggregate_dict_counter = {
-                "misplaced_properties": {
-                    "misplaced_properties_ones": 0,
-                    "count_misplaced_properties_shapes": 0,
-                    "misplaced_properties_properties": []
-                },
-                "misplaced_classes": {
-                    "misplaced_classes_ones": 0,
-                    "count_misplaced_classes_shapes": 0,
-                    "misplaced_classes_classes": []
-                },
-                "correct_range": {
-                    "correct_range_ones": 0,
-                    "count_correct_range_shapes": 0,
-                    "correct_range_properties": []
-                },
-                "correct_domain": {
-                    "correct_domain_ones": 0,
-                    "count_correct_domain_shapes": 0,
-                    "correct_domain_properties": []
-                },
-                "entities_disjoint_classes": {
-                    "entities_disjoint_classes_ones": 0,
-                    "count_entities_disjoint_classes_shapes": 0,
-                    "entities_disjoint_classes_classes": []
-                },
-                "misuse_datatype_properties": {
-                    "misuse_datatype_properties_ones": 0,
-                    "count_misuse_datatype_properties_shapes": 0,
-                    "misuse_datatype_properties_properties": []
-                },
-                "misuse_object_properties": {
-                    "misuse_object_properties_ones": 0,
-                    "count_misuse_object_properties_shapes": 0,
-                    "misuse_object_properties_properties": []
-                },
-                "irreflexive_property": {
-                    "irreflexive_property_ones": 0,
-                    "count_irreflexive_property_shapes": 0,
-                    "irreflexive_property_properties": []
-                },
-                "self_descriptive_format_properties": {
-                    "self_descriptive_format_properties_ones": 0,
-                    "count_self_descriptive_format_properties_shapes": 0,
-                    "self_descriptive_format_properties_properties": []
-                },
-                "functional_property": {
-                    "functional_property_ones": 0,
-                    "count_functional_property_shapes": 0,
-                    "functional_property_properties": []
-                },
-                "asymmetric_property": {
-                    "asymmetric_property_ones": 0,
-                    "count_asymmetric_property_shapes": 0,
-                    "asymmetric_property_properties": []
-                },
-                "schema_completeness_class_usage": {
-                    "schema_completeness_class_usage_ones": 0,
-                    "count_schema_completeness_class_usage_shapes": 0,
-                    "schema_completeness_class_usage_classes": []
-                },
-                "malformed_literal": {
-                    "malformed_literal_ones": 0,
-                    "count_malformed_literal_shapes": 0,
-                    "malformed_literal_properties": []
-                },
-                "undefined_classes": {
-                    "undefined_classes_ones": {},
-                    "count_undefined_classes_shapes": {},
-                    "undefined_classes_classes": {}
-                },
-                "undefined_properties": {
-                    "undefined_properties_ones": {},
-                    "count_undefined_properties_shapes": {},
-                    "undefined_properties_properties": {}
-                },
-                "deprecated_property": {
-                    "deprecated_property_ones": 0,
-                    "count_deprecated_property_shapes": 0,
-                    "deprecated_property_properties": []
-                }
-            }
-
-            for shape_name, info in data.items():
-                counter_shapes += 1
-                
-                if not isinstance(info, dict):
-                    continue
-
-                dimension = info.get('dimension', '')
-                score = info.get('measure', '')
-                description = info.get('description', '')
-                message = info.get('message', '')
-                metric_name = info.get('metric', '')
-                metric_id = info.get('metric_id', '')
-                metric_type = info.get('metric_type', '')
-                metric_calculation = info.get('metric_calculation', '')
-                meta_metric_calculation = info.get('meta_metric_calculation', '')
-                shape_template = info.get('shape_template', '')
-                num_violations = info.get('num_violations', 0)
-                violations = info.get('violations', '')
-                violation_text = info.get('violation_text', '')
-                class_uri = info.get('class', '')
-                property_uri = info.get('property', '')
-                vocab = info.get('vocab', '')
-
-                if shape_name.startswith("MisplacedProp"):
-                    # this counts the number of properties, since I create 1 shape 
-                    # per property and in the results I have a result per shape
-                    self.create_aggregate_metric("misplaced_properties", score, property_uri, type_="properties", tuple_=False)
-
-                elif shape_name.startswith("MisplacedClasses"):
-
-                    # this counts the number of classes, since I create 1 shape 
-                    # per class and in the results I have a result per shape
-                    self.create_aggregate_metric("misplaced_classes", score, class_uri, type_='classes', tuple_=False)
-                
-                elif shape_name.startswith("CorrectRange_"):
-                    self.create_aggregate_metric("correct_range", score, property_uri, type_="properties", tuple_=True)
-
-                elif shape_name.startswith("CorrectDomain_"):
-                    self.create_aggregate_metric("correct_domain", score, property_uri, type_="properties", tuple_=True)
-
-                elif shape_name.startswith("EntitiesDisjointClasses_"):
-                    self.aggregate_dict_counter['entities_disjoint_classes']['count_entities_disjoint_classes_shapes'] += 2
-                    if str(score) == "1":
-                        self.aggregate_dict_counter['entities_disjoint_classes']['entities_disjoint_classes_ones'] += 2 # is this ok?????
-                    else:
-                        self.aggregate_dict_counter['entities_disjoint_classes']['entities_disjoint_classes_classes'].append((class_uri['first_class'], class_uri['second_class'], score))
-                
-                elif shape_name.startswith("MisuseOwlObjectProperties_"):
-                    # Count the number of properties that are used correctly (there's no triple that uses them incorrectly) 
-                    # over total number of owl object properties
-                    self.create_aggregate_metric("misuse_object_properties", score, property_uri, type_="properties", tuple_=True)
-
-                elif shape_name.startswith("MisuseOwlDatatypeProperties_"):
-                    self.create_aggregate_metric("misuse_datatype_properties", score, property_uri, type_="properties", tuple_=True)
-
-                elif shape_name.startswith("IrreflexiveProperty_"):
-                    self.create_aggregate_metric("irreflexive_property", score, property_uri, type_="properties", tuple_=True)
+            denominator = get_denominator(metric, {'property': metric_properties[metric]} if metric in metric_properties else {}, profile)
+            if denominator is not None:
+                info['denominator'] = denominator
 
-                elif shape_name.startswith("SelfDescriptiveFormatProperties"):
-                    self.create_aggregate_metric("self_descriptive_format_properties", score, property_uri, type_="properties", tuple_=False)
-
-                elif shape_name.startswith("FunctionalProperty"):
-                    self.create_aggregate_metric("functional_property", score, property_uri, type_="properties", tuple_=True)
-
-                elif shape_name.startswith("AsymmetricProperty"):
-                    self.create_aggregate_metric("asymmetric_property", score, property_uri, type_="properties", tuple_=True)
-
-                elif shape_name.startswith("SchemaCompletenessClassUsage"):
-                    self.create_aggregate_metric("schema_completeness_class_usage", score, class_uri, type_='classes', tuple_=False)
+    def add_confidence_intervals(self, results):
+        """
+        Adds the sample size and the confidence interval of the estimate of each entity ratio metric (approximate mode)
+        """
+        for metric, info in results.items():
+            metric_prefix = metric.split('_')[0] if '_' in metric else metric
+            if metric_prefix not in COUNT_METRICS:
+                continue
+            try:
+                sample_size = get_denominator(metric, info, self.sampler.sample_profile)
+            except (KeyError, TypeError): # the class of the shape isn't known
+                sample_size = None
+            if not sample_size:
+                continue
+            info['sample_size'] = sample_size
+            info['confidence'] = self.sampler.confidence
+            info['confidence_interval'] = self.sampler.confidence_interval(float(info['measure']), sample_size)
 
-                elif shape_name.startswith("MalformedLiteral"):
-                    # 1 shape per property, so this counts the number of properties
-                    self.create_aggregate_metric("malformed_literal", score, property_uri, type_="properties", tuple_=True)
-                
-                elif shape_name.startswith("DeprecatedProperties"):
-                    # 1 shape per property, so this counts the number of properties
-                    self.create_aggregate_metric("deprecated_property", score, property_uri, type_="properties", tuple_=True)
-
-                elif shape_name.startswith("UndefinedClass"):
-                    metric_name = "undefined_classes"
-                    if vocab not in self.aggregate_dict_counter[metric_name]['count_undefined_classes_shapes'].keys():
-                        self.aggregate_dict_counter[metric_name]['count_undefined_classes_shapes'][vocab] = 0
-                        self.aggregate_dict_counter[metric_name]['undefined_classes_ones'][vocab] = 0
-                        self.aggregate_dict_counter[metric_name]['undefined_classes_classes'][vocab] = []
-
-                    self.aggregate_dict_counter[metric_name]['count_undefined_classes_shapes'][vocab] += 1
-                    if str(score) == '1':
-                        self.aggregate_dict_counter[metric_name]['undefined_classes_ones'][vocab] += 1
-                    else:
-                        self.aggregate_dict_counter[metric_name]['undefined_classes_classes'][vocab].append(class_uri)
-
-                elif shape_name.startswith("UndefinedProperty"):
-                    metric_name = "undefined_properties"
-                    if vocab not in self.aggregate_dict_counter[metric_name]['count_undefined_properties_shapes'].keys():
-                        self.aggregate_dict_counter[metric_name]['count_undefined_properties_shapes'][vocab] = 0
-                        self.aggregate_dict_counter[metric_name]['undefined_properties_ones'][vocab] = 0
-                        self.aggregate_dict_counter[metric_name]['undefined_properties_properties'][vocab] = []
-
-                    self.aggregate_dict_counter[metric_name]['count_undefined_properties_shapes'][vocab] += 1
-                    if str(score) == '1':
-                        self.aggregate_dict_counter[metric_name]['undefined_properties_ones'][vocab] += 1
-                    else:
-                        self.aggregate_dict_counter[metric_name]['undefined_properties_properties'][vocab].append(property_uri)
+    def aggregate_results(self, results, num_violations=None, stage=None):
+        """
+            Writes the rows of the results of a stage to the results CSV (aggregating the metrics
+            instantiated per class/property) and adds the number of shapes of some of them to the graph profile
+        """
+        if self.results_aggregator is None:
+            # A stage validated on its own, outside of run() (e.g. differential_check.py)
+            return
+        self.results_aggregator.add_results(results, num_violations, stage=stage)
 
-                else:
+        if self.graph_profile is None:
+            return
+        num_shapes = self.results_aggregator.num_aggregated_shapes
+        # this shape is instantiated for every property used in the dataset that
+        # has a domain defined
+        if num_shapes.get("correct_domain"):
+            self.graph_profile['num_properties_domain'] = num_shapes["correct_domain"]
 
-                    if shape_name.startswith("DeprecatedClasses"):
-                        num_violations = len([v for v in violations.split(";") if v.strip()])
-                    
-                    # violations contains the values of the property that are used multiple times
-                    if shape_name.startswith("InverseFunctionalPropertyUniqueness"):
-                        value_violations = [v.strip() for v in violations.split(";")]
-                        num_violations = len(value_violations)
-                        
-                        if len(value_violations) > 0:
-                            violations = f'({property_uri}); ' + violations + ' )'
-
-                    rows.append({
-                        'dimension': dimension,
-                        'metric': metric_name,
-                        'metric_id': metric_id,
-                        'metric_description': description,
-                        'score': score,
-                        'message': message,
-                        'metric_type': metric_type,
-                        'metric_calculation': metric_calculation,
-                        'meta_metric_calculation': meta_metric_calculation,
-                        'shape_name': shape_name,
-                        'shape_template': shape_template,
-                        'violations': violations,
-                        'violation_text': violation_text,
-                        'num_violations': num_violations,
-                        'vocab': vocab
-                    })
-
-            # Misuse properties
-            metric_name = "misplaced_properties"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                # I create a shape for each property and from the validation result
-                # I save the score 1 or 0 for each shape 
-
-                # misplaced_properties_ones : counts the number of properties correctly used
-                # count_misplaced_properties_shapes : counts the number of properties (shapes)
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-                
-            metric_name = "misplaced_classes"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
+        # this shape is instantiated for every property defined in all vocabs
+        if num_shapes.get("misplaced_properties"):
+            self.graph_profile['num_properties_vocabularies'] = num_shapes["misplaced_properties"]
 
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join(self.aggregate_dict_counter[metric_name][f'{metric_name}_classes'])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_classes'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-                
-            # Correct range object
-            metric_name = "correct_range"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({p},{s})' for p, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_properties']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-
-            # Correct domain
-            metric_name = "correct_domain"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({p},{s})' for p, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_properties']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-
-            # Entities in disjoint classes
-            metric_name = "entities_disjoint_classes"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({fc},{sc},{s})' for fc, sc, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_classes']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_classes'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-
-            # Irreflexive properties
-            metric_name = "irreflexive_property"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({p},{s})' for p, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_properties']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-            
-            # Self descriptive formats properties
-            metric_name = "self_descriptive_format_properties"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-
-            # Misuse object properties
-            metric_name = "misuse_object_properties"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({p},{s})' for p, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_properties']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-
-            # Misuse datatype properties
-            metric_name = "misuse_datatype_properties"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({p},{s})' for p, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_properties']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-
-            # Functional properties
-            metric_name = "functional_property"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({p},{s})' for p, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_properties']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-
-            metric_name = "asymmetric_property"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({p},{s})' for p, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_properties']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-
-            # Schema completeness class usage
-            metric_name = "schema_completeness_class_usage"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join(self.aggregate_dict_counter[metric_name][f'{metric_name}_classes'])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_classes'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-                
-            metric_name = "malformed_literal"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({p},{s})' for p, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_properties']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-            
-            metric_name = "undefined_properties"
-            if len(self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'].keys()) > 0:
-                for vocab in self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'].keys():
-                    ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones'][vocab] / self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'][vocab])
-                    violations = "; ".join(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'][vocab])
-                    num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'][vocab])
-                    rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations, vocab=vocab))
-            
-            metric_name = "undefined_classes"
-            if len(self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'].keys()) > 0:
-                for vocab in self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'].keys():
-                    ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones'][vocab] / self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'][vocab])
-                    violations = "; ".join(self.aggregate_dict_counter[metric_name][f'{metric_name}_classes'][vocab])
-                    num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_classes'][vocab])
-                    rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations, vocab=vocab))
-
-            metric_name = "deprecated_property"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                ratio = (self.aggregate_dict_counter[metric_name][f'{metric_name}_ones']/self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'])
-                violations = '; '.join([f'({p},{s})' for p, s in self.aggregate_dict_counter[metric_name][f'{metric_name}_properties']])
-                num_violations = len(self.aggregate_dict_counter[metric_name][f'{metric_name}_properties'])
-                rows.append(self.create_metric_info(metric_name, ratio, violations, num_violations))
-                    
+        # this shapes is instantiated for every class defined in the vocab
+        if num_shapes.get("schema_completeness_class_usage"):
+            self.graph_profile['num_classes_vocabularies'] = num_shapes["schema_completeness_class_usage"]
 
-            # this shape is instantiated for every property used in the dataset that
-            # has a domain defined
-            metric_name = "correct_domain"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                self.graph_profile['num_properties_domain'] = self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes']
-
-            # this shape is instantiated for every property defined in all vocabs
-            metric_name = "misplaced_properties"
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                self.graph_profile['num_properties_vocabularies'] = self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes']
-
-            # this shapes is instantiated for every class defined in the vocab
-            metric_name = 'schema_completeness_class_usage'
-            if self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes'] > 0:
-                self.graph_profile['num_classes_vocabularies'] = self.aggregate_dict_counter[metric_name][f'count_{metric_name}_shapes']
-
-        output_csv_path = f'{results_folder}/dq_assessment_{self.dataset_name}.csv'
-
-        with open(output_csv_path, 'w', encoding='utf-8', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=['dimension','metric_id', 'metric', 
-                                                         'score', 'message', 'metric_description', 'metric_type', 
-                                                         'metric_calculation', 'meta_metric_calculation', 'shape_name', 'shape_template',
-                                                         'violations', 'violation_text', 'num_violations', 'vocab'])
-            writer.writeheader()
-            for row in rows:
-                writer.writerow(row)
-
-        self.counter_shapes = counter_shapes
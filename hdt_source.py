@@ -0,0 +1,140 @@
+import os
+import time
+import logging
+from collections import Counter
+
+from rdflib import Graph, RDF, URIRef
+from rdflib.store import Store
+
+try:
+    from rdflib_hdt import HDTStore
+except ImportError: # optional, only needed for graph_file_format = hdt
+    HDTStore = None
+
+# HDT files (graph_file_format = hdt) aren't parsed: the data graph is a read-only rdflib graph backed by the
+# memory-mapped HDT file (rdflib_hdt), and the graph profile is computed from the HDT dictionary & indexes.
+
+# Positions of the terms in the HDT dictionary (term IDs of rdflib_hdt)
+SUBJECT, PREDICATE, OBJECT = 0, 1, 2
+
+
+def is_hdt_file(path, file_format=None):
+    if file_format:
+        return file_format.lower() == 'hdt'
+    return path.lower().endswith('.hdt')
+
+def open_hdt_graph(path):
+    """
+    Read-only graph of an HDT file, memory-mapped. The index of the file (<path>.index.v1-1)
+    is created next to it the first time it's opened.
+    """
+    if HDTStore is None:
+        raise ImportError(f"Reading '{path}' needs rdflib-hdt (pip install rdflib-hdt)")
+    initial_time = time.time()
+    graph = Graph(store=HDTStore(os.path.abspath(path)))
+    logging.info(f"Opened HDT file {path} ({len(graph)} triples) in {time.time() - initial_time}")
+    return graph
+
+def is_hdt_graph(graph):
+    return HDTStore is not None and isinstance(graph.store, HDTStore)
+
+
+class UnionStore(Store):
+    """
+        Read-only union of graphs, so that the HDT data graph and the vocabularies (Tbox) are validated
+        together without copying the data graph into memory. The triples of a graph that are also in
+        a previous graph are skipped (the graphs after the first one should be small).
+    """
+    def __init__(self, graphs):
+        super().__init__()
+        self.graphs = graphs
+
+    def triples(self, triple_pattern, context=None):
+        for position, graph in enumerate(self.graphs):
+            for triple in graph.triples(triple_pattern):
+                if position and any(triple in previous_graph for previous_graph in self.graphs[:position]):
+                    continue
+                yield triple, iter(())
+
+    def __len__(self, context=None):
+        # Distinct triples, as in triples(): only the triples of the graphs after the first one are checked
+        num_triples = len(self.graphs[0]) if self.graphs else 0
+        for position, graph in enumerate(self.graphs[1:], start=1):
+            num_triples += sum(1 for triple in graph if not any(triple in previous_graph for previous_graph in self.graphs[:position]))
+        return num_triples
+
+    def add(self, triple, context=None, quoted=False):
+        raise TypeError("The union of graphs is read only")
+
+    def addN(self, quads):
+        raise TypeError("The union of graphs is read only")
+
+    def remove(self, triple, context=None):
+        raise TypeError("The union of graphs is read only")
+
+def union_graph(*graphs):
+    return Graph(store=UnionStore(list(graphs)))
+
+
+def count_distinct_subjects(triple_ids):
+    """
+    Distinct subjects of the triples of a predicate. HDT returns the triples of ?P? patterns
+    in subject order, so it's the number of times the subject changes.
+    """
+    num_subjects = 0
+    previous_subject = None
+    for s, _, _ in triple_ids:
+        if s != previous_subject:
+            num_subjects += 1
+            previous_subject = s
+    return num_subjects
+
+def compute_hdt_profile(dq_assessment, graph):
+    """
+    Same statistics as compute_graph_profile, from the HDT dictionary & indexes instead of the triples:
+    the predicates are the IDs of the predicate dictionary, the number of triples of each one is the
+    cardinality of its pattern, and the classes & entities come from the rdf:type triples (term IDs).
+    """
+    document = graph.store.hdt_document
+
+    triples_per_property = {}
+    subjects_per_property = {}
+    for predicate_id in range(1, document.nb_predicates + 1):
+        predicate = str(document.id_to_term(predicate_id, PREDICATE))
+        triple_ids, cardinality = document.search_ids((0, predicate_id, 0))
+        triples_per_property[predicate] = cardinality
+        subjects_per_property[predicate] = count_distinct_subjects(triple_ids)
+
+    # Entities per class, from the rdf:type triples (an entity is counted once per class)
+    entities_per_class = Counter()
+    num_entities = 0
+    type_id = document.term_to_id(RDF.type, PREDICATE)
+    if type_id:
+        previous_subject = None
+        triple_ids, _ = document.search_ids((0, type_id, 0))
+        for s, _, o in triple_ids:
+            entities_per_class[o] += 1
+            if s != previous_subject:
+                num_entities += 1
+                previous_subject = s
+    entities_per_class = {str(document.id_to_term(class_id, OBJECT)): count for class_id, count in entities_per_class.items()}
+
+    def count_subjects(property_uri):
+        return subjects_per_property.get(str(URIRef(property_uri)), 0) if property_uri else 0
+
+    profile = {
+        "num_triples": document.total_triples,
+        "num_classes": len(entities_per_class),
+        "num_entities": num_entities,
+        "num_properties": len(triples_per_property),
+        "subjects_per_property": subjects_per_property,
+        "triples_per_property": triples_per_property,
+        "entities_per_class": entities_per_class,
+        "num_entities_with_interlinking": count_subjects(dq_assessment.interlinking_property),
+        "num_entities_label_property": count_subjects(dq_assessment.labeling_property),
+        "num_entities_description_property": count_subjects(dq_assessment.description_property),
+        "classes": list(entities_per_class),
+        "properties": list(triples_per_property)
+    }
+
+    return profile
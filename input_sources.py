@@ -0,0 +1,320 @@
+import os
+import bz2
+import glob
+import gzip
+import lzma
+import time
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+from rdflib import Graph, URIRef, BNode, Literal, XSD
+from rdflib.util import guess_format
+
+from const import PARSER_BACKENDS
+from ntriples_loader import EncodedTriples, is_ntriples_file, load_ntriples
+from hdt_source import is_hdt_file, open_hdt_graph
+
+try:
+    import pyzstd
+except ImportError: # optional, only needed for .zst inputs
+    pyzstd = None
+
+try:
+    import pyoxigraph
+except ImportError: # optional, only needed for parser_backend = oxigraph
+    pyoxigraph = None
+
+# The data graph (graph_file) can be a single file, a comma separated list of files and/or glob patterns
+# (e.g. datasets/dbpedia/dump_*.nt.gz). Compressed files are decompressed while they are parsed, without
+# writing a decompressed copy to disk. With parse_workers > 1 the files are parsed in parallel processes
+# and their triples are added to the same graph. Uncompressed N-Triples files are split in chunks parsed by
+# all the workers instead (see ntriples_loader.py). HDT files aren't parsed, they're memory-mapped (see hdt_source.py).
+#
+# Every RDF file (data graph, metadata & vocabularies) is parsed by parse_graph with the parser_backend of the config:
+# rdflib's parsers, Oxigraph's native parsers (pyoxigraph, the triples are added to the rdflib graph) or the chunked
+# N-Triples loader. The formats a backend can't parse (e.g. Turtle with the N-Triples loader) are parsed by rdflib.
+
+def _open_zstd(path):
+    if pyzstd is None:
+        raise ImportError(f"Reading '{path}' needs pyzstd (pip install pyzstd)")
+    return pyzstd.ZstdFile(path, 'rb')
+
+# Extension -> function that opens the file as a binary stream of the decompressed data
+COMPRESSION_OPENERS = {
+    '.gz': lambda path: gzip.open(path, 'rb'),
+    '.bz2': lambda path: bz2.open(path, 'rb'),
+    '.xz': lambda path: lzma.open(path, 'rb'),
+    '.zst': _open_zstd,
+    '.zstd': _open_zstd
+}
+
+
+def resolve_graph_files(graph_file):
+    """
+    Files of the data graph, graph_file is the value of the config (comma separated files/glob patterns) or a list
+    """
+    items = graph_file.split(',') if isinstance(graph_file, str) else graph_file
+    graph_files = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        if glob.has_magic(item):
+            matches = sorted(glob.glob(item))
+            if not matches:
+                raise FileNotFoundError(f"No graph files match '{item}'")
+        else:
+            if not os.path.exists(item):
+                raise FileNotFoundError(f"Graph file '{item}' not found")
+            matches = [item]
+        graph_files += [path for path in matches if path not in graph_files]
+
+    if not graph_files:
+        raise ValueError("No graph file provided (graph_file in the [settings] of the config)")
+    return graph_files
+
+def get_compression(path):
+    extension = os.path.splitext(path)[1].lower()
+    return extension if extension in COMPRESSION_OPENERS else None
+
+def get_graph_file_format(path, file_format=None):
+    """
+    RDF format of a graph file: the format of the config or, if it's empty, the one of the extension
+    (without the compression extension, e.g. data.nt.gz -> nt)
+    """
+    if file_format:
+        return file_format
+    if get_compression(path):
+        path = os.path.splitext(path)[0]
+    guessed_format = guess_format(path)
+    if guessed_format is None:
+        raise ValueError(f"Unknown RDF format of '{path}', set graph_file_format in the config")
+    return guessed_format
+
+def open_graph_file(path):
+    """
+    Binary stream of a graph file, decompressed while it's read
+    """
+    compression = get_compression(path)
+    if compression is None:
+        return open(path, 'rb')
+    return COMPRESSION_OPENERS[compression](path)
+
+class GraphCache:
+    """
+        Parsed graphs kept in memory between assessments (daemon.py), the least recently used ones are
+        evicted. A graph is parsed again when one of its files changes (modification time or size).
+        The cached graphs are shared by the assessments, they're only read.
+    """
+    def __init__(self, max_graphs):
+        self.max_graphs = max_graphs
+        self.graphs = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_parse(self, paths, file_format, parser_backend, parse):
+        files = []
+        for path in paths:
+            stat = os.stat(path)
+            files.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+        key = (tuple(files), file_format, parser_backend)
+
+        with self.lock:
+            graph = self.graphs.get(key)
+            if graph is not None:
+                self.graphs.move_to_end(key)
+                self.hits += 1
+                return graph
+            self.misses += 1
+
+        graph = parse()
+        with self.lock:
+            self.graphs[key] = graph
+            while len(self.graphs) > self.max_graphs:
+                self.graphs.popitem(last=False)
+        return graph
+
+    def clear(self):
+        with self.lock:
+            self.graphs.clear()
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "max_graphs": self.max_graphs,
+                "graphs": [{"files": [path for path, _, _ in files], "num_triples": len(graph)} for (files, _, _), graph in self.graphs.items()],
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+# Cache of the parsed graphs, only enabled in the daemon (see set_graph_cache)
+graph_cache = None
+
+def set_graph_cache(cache):
+    global graph_cache
+    graph_cache = cache
+
+def _get_graph(paths, file_format, parser_backend, parse):
+    if graph_cache is None:
+        return parse()
+    return graph_cache.get_or_parse(paths, file_format, parser_backend, parse)
+
+
+def can_split(path, file_format=None):
+    return get_compression(path) is None and is_ntriples_file(path, file_format)
+
+def check_parser_backend(parser_backend):
+    if parser_backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser_backend '{parser_backend}', use one of: {', '.join(PARSER_BACKENDS)}")
+    if parser_backend == 'oxigraph' and pyoxigraph is None:
+        raise ImportError("parser_backend = oxigraph needs pyoxigraph (pip install pyoxigraph)")
+    return parser_backend
+
+def get_parser_backend(config):
+    """
+    parser_backend of the [settings] of a config (rdflib without a config)
+    """
+    if config is None:
+        return 'rdflib'
+    return check_parser_backend(config['settings'].get('parser_backend', fallback='rdflib').strip() or 'rdflib')
+
+def get_oxigraph_format(file_format):
+    """
+    Oxigraph format of an rdflib format, None if Oxigraph can't parse it
+    """
+    if pyoxigraph is None:
+        return None
+    return {
+        'turtle': pyoxigraph.RdfFormat.TURTLE,
+        'ttl': pyoxigraph.RdfFormat.TURTLE,
+        'n3': pyoxigraph.RdfFormat.N3,
+        'nt': pyoxigraph.RdfFormat.N_TRIPLES,
+        'nt11': pyoxigraph.RdfFormat.N_TRIPLES,
+        'ntriples': pyoxigraph.RdfFormat.N_TRIPLES,
+        'xml': pyoxigraph.RdfFormat.RDF_XML,
+        'application/rdf+xml': pyoxigraph.RdfFormat.RDF_XML,
+        'nquads': pyoxigraph.RdfFormat.N_QUADS,
+        'trig': pyoxigraph.RdfFormat.TRIG,
+        'json-ld': pyoxigraph.RdfFormat.JSON_LD
+    }.get(file_format.lower())
+
+def _parse_oxigraph(path, oxigraph_format, graph):
+    """
+    Adds the triples of Oxigraph's parser to graph. The terms are converted once, and the literals without a
+    datatype are kept without it (Oxigraph gives them xsd:string) so that the graph is the same as with rdflib.
+    """
+    terms = {}
+
+    def convert(term):
+        converted = terms.get(term)
+        if converted is None:
+            if isinstance(term, pyoxigraph.NamedNode):
+                converted = URIRef(term.value)
+            elif isinstance(term, pyoxigraph.BlankNode):
+                # New blank nodes for each file, as rdflib does
+                converted = BNode()
+            elif term.language:
+                converted = Literal(term.value, lang=term.language)
+            elif term.datatype.value == str(XSD.string):
+                converted = Literal(term.value)
+            else:
+                converted = Literal(term.value, datatype=URIRef(term.datatype.value))
+            terms[term] = converted
+        return converted
+
+    # Relative IRIs are resolved against the file, as rdflib does. Lenient: the IRIs aren't validated (rdflib doesn't either)
+    arguments = {"format": oxigraph_format, "base_iri": Path(path).absolute().as_uri(), "lenient": True}
+    with open_graph_file(path) as stream:
+        graph.addN((convert(quad.subject), convert(quad.predicate), convert(quad.object), graph)
+                   for quad in pyoxigraph.parse(stream, **arguments))
+    return graph
+
+def parse_graph(path, file_format=None, graph=None, parser_backend='rdflib', workers=1):
+    """
+    Parses a (possibly compressed) RDF file into graph with a parser backend (see PARSER_BACKENDS)
+    """
+    if graph is None:
+        return _get_graph([path], file_format, parser_backend, lambda: parse_graph(path, file_format, Graph(), parser_backend, workers))
+    file_format = get_graph_file_format(path, file_format)
+
+    if parser_backend == 'ntriples' and can_split(path, file_format):
+        return load_ntriples(path, workers).to_graph(graph)
+    if parser_backend == 'oxigraph':
+        oxigraph_format = get_oxigraph_format(file_format)
+        if oxigraph_format is not None:
+            # Into a new graph when graph already has triples, so that the triples of a file Oxigraph can't parse are discarded
+            oxigraph_graph = graph if not len(graph) else Graph()
+            try:
+                _parse_oxigraph(path, oxigraph_format, oxigraph_graph)
+            except SyntaxError as e:
+                # Oxigraph is stricter than rdflib (e.g. some DTDs of RDF/XML files)
+                logging.warning(f"Oxigraph can't parse {path} ({e}), parsing it with rdflib")
+                oxigraph_graph.remove((None, None, None))
+            else:
+                if oxigraph_graph is not graph:
+                    graph.addN((s, p, o, graph) for s, p, o in oxigraph_graph)
+                return graph
+
+    if get_compression(path) is None:
+        return graph.parse(path, format=file_format)
+
+    # Relative IRIs are resolved against the file, as when rdflib opens it
+    with open_graph_file(path) as stream:
+        graph.parse(source=stream, format=file_format, publicID=Path(path).absolute().as_uri())
+    return graph
+
+def _parse_graph_triples(path, file_format, parser_backend):
+    # Runs in a worker process, the triples are sent back to the main process
+    return list(parse_graph(path, file_format, parser_backend=parser_backend))
+
+def parse_graph_files(graph_files, file_format=None, workers=1, graph=None, parser_backend='rdflib'):
+    """
+    Parses the files of the data graph (see resolve_graph_files) into a single graph, or opens the read-only graph of an HDT file
+    """
+    graph_files = resolve_graph_files(graph_files)
+    if graph is None:
+        return _get_graph(graph_files, file_format, parser_backend, lambda: parse_graph_files(graph_files, file_format, workers, Graph(), parser_backend))
+
+    if any(is_hdt_file(path, file_format) for path in graph_files):
+        if len(graph_files) > 1:
+            raise ValueError("An HDT data graph must be a single file")
+        return open_hdt_graph(graph_files[0])
+
+    initial_time = time.time()
+    num_files = len(graph_files)
+    if parser_backend == 'ntriples':
+        # N-Triples files are parsed by all the workers, one after the other (the graph dedups the triples)
+        for path in graph_files:
+            if can_split(path, file_format):
+                load_ntriples(path, workers, EncodedTriples(dedup=False)).to_graph(graph)
+        graph_files = [path for path in graph_files if not can_split(path, file_format)]
+
+    workers = min(workers, len(graph_files))
+    if workers <= 1:
+        for path in graph_files:
+            parse_graph(path, file_format, graph, parser_backend)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for triples in executor.map(_parse_graph_triples, graph_files, [file_format] * len(graph_files), [parser_backend] * len(graph_files)):
+                graph.addN((s, p, o, graph) for s, p, o in triples)
+
+    if num_files > 1:
+        logging.info(f"Parsed {num_files} graph files ({len(graph)} triples) in {time.time() - initial_time}")
+    return graph
+
+def parse_encoded_triples(graph_files, file_format=None, workers=1):
+    """
+    Triples of the data graph as EncodedTriples, without building a graph (e.g. for the profile with sketches,
+    which only iterates the triples). None if some file isn't an uncompressed N-Triples file.
+    """
+    graph_files = resolve_graph_files(graph_files)
+    if not all(can_split(path, file_format) for path in graph_files):
+        return None
+    encoded_triples = EncodedTriples()
+    for path in graph_files:
+        load_ntriples(path, workers, encoded_triples)
+    return encoded_triples
@@ -1,10 +1,39 @@
 import os
-from utils import *
 import json
 from const import *
+import logging
 import argparse
+import configparser
 
-from dq_assessment import DQAssessment
+from metric_selection import parse_metric_list
+from results_io import write_json
+
+# The assessment modules (rdflib, pyshacl, jinja2...) are imported when they're needed, so --help and the errors
+# of the arguments & config are immediate (see benchmark.py startup)
+
+
+def check_config(config_path):
+    """
+    Checks that the config of the dataset exists and has the settings of the assessment, before importing
+    the assessment modules
+    """
+    config = configparser.ConfigParser()
+    try:
+        if not config.read(config_path):
+            raise FileNotFoundError(f"Config file not found at path: {config_path}")
+    except configparser.ParsingError as e:
+        raise ValueError(f"Failed to parse config file '{config_path}': {e}")
+
+    if 'settings' not in config:
+        raise ValueError(f"No [settings] section in the config file '{config_path}'")
+    missing = [key for key in CONFIG_REQUIRED_SETTINGS if key not in config['settings']]
+    for vocab in (v.strip() for v in config['settings'].get('vocabularies', '').split(",")):
+        if vocab and vocab not in config:
+            missing.append(f"[{vocab}]")
+        elif vocab:
+            missing += [f"{vocab}.{key}" for key in CONFIG_REQUIRED_VOCABULARY_SETTINGS if key not in config[vocab]]
+    if missing:
+        raise ValueError(f"Missing settings in the config file '{config_path}': {', '.join(missing)}")
 
 
 def execute_assessment(args):
@@ -14,7 +43,6 @@ def execute_assessment(args):
     elif not args.ra and not args.rd and not args.rm and not args.rv:
         raise Exception("Specify assessment to run (ra, rd, rm or rv)")
     else:
-        config_file_path = f'config/{args.d}.ini'
         if args.ra:
             metadata_shapes = True
             data_shapes = True
@@ -24,39 +52,98 @@ def execute_assessment(args):
             data_shapes = args.rd
             vocab_shapes = args.rv
 
-        dq_assessment = DQAssessment(config_file_path, 
-                                    metadata_shapes=metadata_shapes, 
-                                    data_shapes=data_shapes, 
-                                    vocab_shapes=vocab_shapes)
+        check_config(f'config/{args.d}.ini')
+
+        if args.watch:
+            from watch import watch_assessment
 
+            watch_assessment(lambda **stages: create_assessment(args, **stages), metadata_shapes, data_shapes, vocab_shapes,
+                             save_run=lambda dq_assessment: save_run(dq_assessment, profile=args.profile, store=not args.no_store),
+                             graph_file=args.graph_file)
+            return
+
+        dq_assessment = create_assessment(args, metadata_shapes, data_shapes, vocab_shapes)
         dq_assessment.run()
+        save_run(dq_assessment, profile=args.profile, store=not args.no_store)
 
-        output_path = "run_info.json"
 
-        # Load existing run_info if it exists
-        if os.path.exists(output_path):
-            with open(output_path, "r", encoding="utf-8") as f:
-                run_info = json.load(f)
-        else:
-            run_info = {}
+def create_assessment(args, metadata_shapes, data_shapes, vocab_shapes, vocabularies=None):
+    """
+    DQAssessment of a run with the options of the CLI (vocabularies: the ones assessed in the vocabulary stage)
+    """
+    from dq_assessment import DQAssessment
+
+    return DQAssessment(f'config/{args.d}.ini',
+                        metadata_shapes=metadata_shapes,
+                        data_shapes=data_shapes,
+                        vocab_shapes=vocab_shapes,
+                        profile_run=args.profile,
+                        profile_memory=args.profile_memory,
+                        approximate=args.approximate,
+                        sample_method=args.sample_method,
+                        target_error=args.target_error,
+                        confidence=args.confidence,
+                        sample_seed=args.seed,
+                        time_budget=args.time_budget,
+                        include_metrics=parse_metric_list(args.include_metrics) if args.include_metrics is not None else None,
+                        exclude_metrics=parse_metric_list(args.exclude_metrics) if args.exclude_metrics is not None else None,
+                        graph_files=args.graph_file,
+                        vocabularies=vocabularies)
+
+
+def save_run(dq_assessment, profile=False, store=True):
+    """
+    Saves the run info, graph profile & run profile of a finished assessment and appends it to the
+    results store. Returns the run ID in the store (None when it isn't stored).
+    """
+    output_path = "run_info.json"
+
+    # Load existing run_info if it exists
+    if os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            run_info = json.load(f)
+    else:
+        run_info = {}
+
+    run_info[dq_assessment.dataset_name] = {
+        "total_elapsed_time": dq_assessment.total_elapsed_time,
+        "vocab_shapes_elapsed_time": dq_assessment.vocab_shapes_elapsed_time,
+        "data_shapes_elapsed_time": dq_assessment.data_shapes_elapsed_time,
+        "metadata_shapes_elapsed_time": dq_assessment.metadata_shapes_elapsed_time,
+        "num_inst_shapes": dq_assessment.counter_shapes,
+        "graph_profile": dq_assessment.graph_profile
+    }
+
+    if dq_assessment.sampler is not None:
+        run_info[dq_assessment.dataset_name]["approximate"] = dq_assessment.sampler.to_dict()
+
+    if dq_assessment.scheduler is not None:
+        run_info[dq_assessment.dataset_name]["time_budget"] = {"seconds": dq_assessment.time_budget} | dq_assessment.scheduler.to_dict()
+
+    if dq_assessment.metric_selection.active:
+        run_info[dq_assessment.dataset_name]["metric_selection"] = dq_assessment.metric_selection.to_dict()
+
+    if dq_assessment.memory_profiler is not None:
+        run_info[dq_assessment.dataset_name]["memory_profile"] = dq_assessment.memory_profiler.to_dict()
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(run_info, f, indent=4)
+
+    write_json(f'{PROFILE_DATASETS_FOLDER_PATH}/{dq_assessment.dataset_name}.json', dq_assessment.graph_profile, compact=dq_assessment.results_format == 'ndjson')
 
-        run_info[dq_assessment.dataset_name] = {
-            "total_elapsed_time": dq_assessment.total_elapsed_time,
-            "vocab_shapes_elapsed_time": dq_assessment.vocab_shapes_elapsed_time,
-            "data_shapes_elapsed_time": dq_assessment.data_shapes_elapsed_time,
-            "metadata_shapes_elapsed_time": dq_assessment.metadata_shapes_elapsed_time,
-            "num_inst_shapes": dq_assessment.counter_shapes,
-            "graph_profile": dq_assessment.graph_profile
-        }
+    if profile:
+        dq_assessment.profiler.save(RUN_PROFILE_FILE_PATH, dq_assessment.dataset_name)
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(run_info, f, indent=4)
+    run_id = None
+    if store:
+        from results_store import ResultsStore
+        with ResultsStore(RESULTS_STORE_FILE_PATH) as results_store:
+            run_id = results_store.add_run(dq_assessment, run_info[dq_assessment.dataset_name])
+        logging.info(f"Run {run_id} of {dq_assessment.dataset_name} appended to the results store {RESULTS_STORE_FILE_PATH}")
+    return run_id
 
-        with open(f'{PROFILE_DATASETS_FOLDER_PATH}/{dq_assessment.dataset_name}.json', "w", encoding="utf-8") as f:
-            json.dump(dq_assessment.graph_profile, f, indent=4)
-        
 
-if "__main__":
+if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run DQA on a dataset")
     parser.add_argument(
         "-d",
@@ -70,6 +157,19 @@ if "__main__":
     group.add_argument("-rm", action="store_true", help="Run the assessment only on metadata")
     group.add_argument("-rd", action="store_true", help="Run the assessment only on data")
     group.add_argument("-rv", action="store_true", help="Run the assessment only on vocabularies")
+    parser.add_argument("--profile", action="store_true", help="Record per-phase and per-shape timings & memory in run_profile.json (shapes are validated one at a time)")
+    parser.add_argument("--profile-memory", action="store_true", help="Record the peak memory of each phase and the top allocation sites of the top-level phases in run_info.json (tracemalloc traces every allocation, ~9x slower validation)")
+    parser.add_argument("--approximate", action="store_true", help="Validate the data shapes on a sample of the entities and report estimates with confidence intervals")
+    parser.add_argument("--sample-method", choices=["uniform", "stratified"], default="uniform", help="Uniform sample of the entities or stratified by class (--approximate)")
+    parser.add_argument("--target-error", type=float, default=APPROXIMATE_TARGET_ERROR, help="Max. margin of error of the estimates, sets the sample size (--approximate)")
+    parser.add_argument("--confidence", type=float, default=APPROXIMATE_CONFIDENCE, help="Confidence level of the intervals (--approximate)")
+    parser.add_argument("--time-budget", type=float, help="Max. seconds of the run: the data shapes are validated cheapest first until the deadline, the rest are marked as skipped")
+    parser.add_argument("--include-metrics", help="Comma separated metrics, metric IDs or dimensions to assess, the rest are skipped (overrides include_metrics of the config)")
+    parser.add_argument("--exclude-metrics", help="Comma separated metrics, metric IDs or dimensions that aren't assessed (overrides exclude_metrics of the config)")
+    parser.add_argument("--graph-file", nargs="+", help="Files or glob patterns of the data graph, also compressed (.gz, .bz2, .xz, .zst), parsed into a single graph (overrides graph_file of the config)")
+    parser.add_argument("--no-store", action="store_true", help=f"Don't append the results of the run to the results store ({RESULTS_STORE_FILE_PATH})")
+    parser.add_argument("--watch", action="store_true", help="Keep running and assess again the stages that depend on the input files (data graph, metadata, vocabularies & config) when they change")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the sample (--approximate)")
     args = parser.parse_args()
     print(args)
     execute_assessment(args)
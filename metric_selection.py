@@ -0,0 +1,71 @@
+import json
+
+from const import (DQ_MEASURES_DATA_GENERIC_TEMPLATE_FILE_PATH, DQ_MEASURES_METADATA_TEMPLATE_FILE_PATH,
+                   DQ_MEASURES_VOCABULARIES_TEMPLATE_FILE_PATH, DQ_MEASURES_DATA_SPECIFIC,
+                   DQ_MEASURES_VOCABULARY_SPECIFIC)
+
+
+def parse_metric_list(value):
+    """
+    Comma separated list of the config/CLI (e.g. "Consistency, LabelForEntities, U3")
+    """
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def load_metric_catalog():
+    """
+    metric name (key of the results without the shape counter) -> (metric_id, dimension)
+    """
+    metrics = {}
+    for file_path in (DQ_MEASURES_METADATA_TEMPLATE_FILE_PATH, DQ_MEASURES_DATA_GENERIC_TEMPLATE_FILE_PATH, DQ_MEASURES_VOCABULARIES_TEMPLATE_FILE_PATH):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            metrics.update(json.load(f))
+    metrics.update(DQ_MEASURES_DATA_SPECIFIC)
+    metrics.update(DQ_MEASURES_VOCABULARY_SPECIFIC)
+    return {name: (info.get('metric_id', ''), info.get('dimension', '')) for name, info in metrics.items()}
+
+
+class MetricSelection:
+    """
+        Metrics enabled in a run. include and exclude are lists of metric names (e.g. FunctionalProperty),
+        metric IDs (e.g. CN10) or dimensions (e.g. Consistency), case insensitive.
+        With an include list only the metrics that match it are enabled, the exclude list is applied afterwards.
+    """
+    def __init__(self, include=None, exclude=None):
+        self.catalog = load_metric_catalog()
+        self.include = [self._check(selector) for selector in include or []]
+        self.exclude = [self._check(selector) for selector in exclude or []]
+
+    def _check(self, selector):
+        selector = selector.lower()
+        if not any(selector in self._get_names(metric) for metric in self.catalog):
+            raise ValueError(f"Unknown metric, metric ID or dimension '{selector}' in the metric selection")
+        return selector
+
+    def _get_names(self, metric):
+        metric_id, dimension = self.catalog.get(metric, ('', ''))
+        return {metric.lower(), metric_id.lower(), dimension.lower()}
+
+    @property
+    def active(self):
+        return bool(self.include or self.exclude)
+
+    def is_enabled(self, metric):
+        """
+        metric is a metric name or the key of a shape in the results (e.g. FunctionalProperty_3)
+        """
+        names = self._get_names(metric.split('_')[0])
+        if self.include and not names & set(self.include):
+            return False
+        return not names & set(self.exclude)
+
+    def get_disabled_metrics(self):
+        return [metric for metric in self.catalog if not self.is_enabled(metric)]
+
+    def to_dict(self):
+        return {
+            "include": self.include,
+            "exclude": self.exclude,
+            "disabled_metrics": self.get_disabled_metrics()
+        }
@@ -0,0 +1,277 @@
+import os
+import re
+import time
+import hashlib
+import logging
+
+from rdflib import Dataset
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser, r_wspace, r_tail
+from rdflib.exceptions import ParserError
+
+from const import DATASETS_FOLDER_PATH, DQ_ASSESSMENT_RESULTS_FOLDER_PATH, NAMED_GRAPH_SPLIT_BUFFER_LINES
+from input_sources import get_graph_file_format, open_graph_file
+from ntriples_loader import NTRIPLES_FORMATS, _BlankNodeLabels
+from results_aggregator import ResultsAggregator
+from results_io import write_json
+from results_store import to_float
+
+# N-Quads & TriG data graphs (graph_file_format = nquads/trig or .nq/.trig files) are assessed per named graph:
+# the input is split in one N-Triples file per graph (datasets/<dataset>/graphs/), without loading the N-Quads
+# into a graph, and the data & vocabulary shapes of each graph are validated as a separate dataset
+# (<dataset>__<graph>) by named_graph_workers processes. The results CSV of the dataset has the rollup of the
+# graphs (min of the binary scores, ratios weighted by their denominators, sum of the violations) and a score column per graph.
+
+NAMED_GRAPH_FORMATS = {'nquads', 'nq', 'trig'}
+DEFAULT_GRAPH = 'default'
+
+
+def is_named_graph_file(path, file_format=None):
+    return get_graph_file_format(path, file_format).lower() in NAMED_GRAPH_FORMATS
+
+def get_graph_slug(graph):
+    """
+    Name of a graph in the file names & CSV columns: last segment of its IRI and a hash of the IRI (unique)
+    """
+    if graph == DEFAULT_GRAPH:
+        return DEFAULT_GRAPH
+    segment = re.split(r'[/#:]', graph.rstrip('/#'))[-1]
+    segment = re.sub(r'[^a-z0-9]+', '_', segment.lower()).strip('_')[:40]
+    digest = hashlib.blake2b(graph.encode('utf-8'), digest_size=4).hexdigest()
+    return f'{segment}_{digest}' if segment else digest
+
+
+class _NamedGraphSplitter(W3CNTriplesParser):
+    """
+        Copies each line of an N-Quads file (or N-Triples, all in the default graph) to the
+        N-Triples file of its graph. The terms are parsed to find the graph label, but the
+        triples are written as they are in the input. The lines are buffered and appended to the
+        files of their graphs every buffer_lines lines, only one file is open at a time.
+    """
+    def __init__(self, folder_path, buffer_lines=NAMED_GRAPH_SPLIT_BUFFER_LINES):
+        # Blank node labels are kept as they are
+        super().__init__(bnode_context=_BlankNodeLabels(''))
+        self.folder_path = folder_path
+        self.buffer_lines = buffer_lines
+        self.graphs = {}
+        # graph -> info of the graph & lines that haven't been written yet
+        self.buffers = {}
+        self.num_buffered = 0
+
+    def parseline(self, bnode_context=None):
+        self.eat(r_wspace)
+        if (not self.line) or self.line.startswith("#"):
+            return
+        line = self.line
+
+        self.subject(bnode_context)
+        self.eat(r_wspace)
+        self.predicate()
+        self.eat(r_wspace)
+        self.object(bnode_context)
+        triple = line[:len(line) - len(self.line)].rstrip()
+        self.eat(r_wspace)
+
+        graph = self.uriref() or self.nodeid(bnode_context)
+        self.eat(r_tail)
+        if self.line:
+            raise ParserError("Trailing garbage")
+        self.write(str(graph) if graph else DEFAULT_GRAPH, f'{triple} .\n')
+
+    def write(self, graph, line):
+        if graph not in self.buffers:
+            slug = get_graph_slug(graph)
+            file_path = f'{self.folder_path}/{slug}.nt'
+            self.graphs[slug] = {"graph": graph, "file_path": file_path, "num_triples": 0}
+            # The file of a previous split is replaced
+            open(file_path, 'w', encoding='utf-8').close()
+            self.buffers[graph] = (self.graphs[slug], [])
+        info, lines = self.buffers[graph]
+        lines.append(line)
+        info["num_triples"] += 1
+        self.num_buffered += 1
+        if self.num_buffered >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        for info, lines in self.buffers.values():
+            if lines:
+                with open(info["file_path"], 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+                lines.clear()
+        self.num_buffered = 0
+
+    def close(self):
+        self.flush()
+
+
+def split_named_graphs(graph_files, file_format, folder_path):
+    """
+    Writes the triples of each graph of the data graph files in folder_path/<graph slug>.nt,
+    returns graph slug -> {graph IRI, file path, number of lines}
+    """
+    initial_time = time.time()
+    os.makedirs(folder_path, exist_ok=True)
+    splitter = _NamedGraphSplitter(folder_path)
+    try:
+        for path in graph_files:
+            path_format = get_graph_file_format(path, file_format).lower()
+            if path_format == 'trig':
+                # The TriG parser needs the whole file, it's loaded in a dataset and its graphs are written one by one
+                dataset = Dataset()
+                with open_graph_file(path) as stream:
+                    dataset.parse(source=stream, format='trig')
+                for graph in dataset.graphs():
+                    graph_name = DEFAULT_GRAPH if graph.identifier == DATASET_DEFAULT_GRAPH_ID else str(graph.identifier)
+                    for line in graph.serialize(format='nt').splitlines():
+                        if line.strip():
+                            splitter.write(graph_name, f'{line}\n')
+            elif path_format in NAMED_GRAPH_FORMATS | NTRIPLES_FORMATS:
+                with open_graph_file(path) as stream:
+                    splitter.parse(stream)
+            else:
+                raise ValueError(f"'{path}' can't be split in named graphs, use N-Quads, TriG or N-Triples files")
+    finally:
+        splitter.close()
+
+    graphs = dict(sorted(splitter.graphs.items()))
+    write_json(f'{folder_path}/graphs.json', graphs)
+    logging.info(f"Split {len(graph_files)} graph files in {len(graphs)} named graphs ({folder_path}) in {time.time() - initial_time}")
+    return graphs
+
+
+def assess_named_graph(config_path, dataset_name, graph_slug, graph_file, options):
+    """
+    Data & vocabulary shapes of a named graph, runs in a worker process
+    """
+    from dq_assessment import DQAssessment
+
+    dq_assessment = DQAssessment(config_path, metadata_shapes=False, dataset_name=f'{dataset_name}__{graph_slug}',
+                                 graph_files=[graph_file], graph_file_format='nt', metadata_dataset_name=dataset_name, **options)
+    dq_assessment.run()
+    graph_profile = dq_assessment.graph_profile or {}
+    return {
+        "results_rows": dq_assessment.results_rows,
+        "graph_profile": {key: graph_profile.get(key) for key in ("num_triples", "num_entities", "num_classes", "num_properties")},
+        "num_inst_shapes": dq_assessment.counter_shapes,
+        "data_shapes_elapsed_time": dq_assessment.data_shapes_elapsed_time,
+        "vocab_shapes_elapsed_time": dq_assessment.vocab_shapes_elapsed_time
+    }
+
+
+def combine_scores(scores, binary):
+    """
+    Score of a list of (score, denominator): binary metrics pass if they pass everywhere (min),
+    ratios are pooled (mean weighted by the denominator of each score)
+    """
+    if binary:
+        return min(score for score, _ in scores)
+    total_weight = sum(weight for _, weight in scores)
+    if not total_weight:
+        return sum(score for score, _ in scores) / len(scores)
+    return sum(score * weight for score, weight in scores) / total_weight
+
+def rollup_results(graph_results):
+    """
+    Rows of the union of the graphs: one per metric (metric ID, shape family & vocabulary), with the score of
+    each graph, the score of the union and the sum of the violations. The scores of the binary metrics are
+    combined with min, the ratios weighted by their denominators (e.g. entities, subjects of a property or
+    properties of an aggregated metric), also the shapes of a family instantiated per class/property.
+    """
+    rollup = {}
+    for slug, result in graph_results.items():
+        # Weight of the ratios without a denominator
+        graph_weight = max(int(result["graph_profile"].get("num_entities") or 0), 1)
+        for row in result["results_rows"]:
+            # Shapes instantiated per class/property are rolled up per family, e.g. InverseFunctionalPropertyUniqueness_83
+            family = row.get('shape_name', '').split('_')[0]
+            key = (row.get('metric_id'), family, row.get('vocab', ''))
+            if key not in rollup:
+                rollup[key] = {"row": dict(row, shape_name=family), "scores": {}, "num_violations": 0, "binary": True}
+            entry = rollup[key]
+            score = to_float(row.get('score'))
+            if score is None:
+                # Skipped in the graph (metric selection)
+                continue
+            denominator = row.get('denominator')
+            # The aggregated metrics (e.g. MisplacedPropertiesShape) are ratios of binary shapes
+            entry["binary"] = entry["binary"] and denominator is None and row.get('metric_type') == 'binary'
+            entry["scores"].setdefault(slug, []).append((score, graph_weight if denominator is None else float(denominator)))
+            entry["num_violations"] += int(row.get('num_violations') or 0)
+
+    rows = []
+    for entry in rollup.values():
+        row = entry["row"]
+        row.pop('denominator', None)
+        graph_scores = {slug: combine_scores(scores, entry["binary"]) for slug, scores in entry["scores"].items()}
+        all_scores = [score for scores in entry["scores"].values() for score in scores]
+        row['score'] = combine_scores(all_scores, entry["binary"]) if all_scores else ''
+        row['num_violations'] = entry["num_violations"]
+        # The message of a graph doesn't apply to the union (e.g. the number of classes without a domain)
+        row['message'] = ''
+        row['num_graphs'] = len(graph_scores)
+        for slug, score in graph_scores.items():
+            row[f'score_{slug}'] = score
+        if 'status' in row:
+            row['status'] = 'evaluated' if graph_scores else 'skipped'
+        rows.append(row)
+    return rows
+
+
+def assess_named_graphs(dq_assessment):
+    """
+    Runs the assessment of a dataset of named graphs (see DQAssessment.run), the metadata is validated once
+    """
+    graphs_folder = f'{DATASETS_FOLDER_PATH}/{dq_assessment.dataset_name}/graphs'
+    with dq_assessment.profiler.phase('profiling', 'graph_splitting'):
+        graphs = split_named_graphs(dq_assessment.graph_files, dq_assessment.graph_file_format, graphs_folder)
+
+    results_folder = DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=dq_assessment.dataset_name)
+    dq_assessment.results_aggregator = ResultsAggregator(f'{results_folder}/dq_assessment_{dq_assessment.dataset_name}.csv',
+                                                         inline_violations=False,
+                                                         status=dq_assessment.metric_selection.active,
+                                                         extra_fieldnames=['num_graphs'] + [f'score_{slug}' for slug in graphs])
+
+    initial_time = time.time()
+
+    if dq_assessment.metadata_shapes and dq_assessment.metadata_file:
+        with dq_assessment.profiler.phase('metadata', 'total'):
+            dq_assessment.metadata_shapes_elapsed_time = dq_assessment.validate_metadata_shapes()
+        logging.info(f"Finished validating metadata shapes. Validation time: {dq_assessment.metadata_shapes_elapsed_time}")
+
+    # Each graph is assessed as the dataset <dataset>__<graph slug>, with the metric selection of the run
+    options = {
+        "data_shapes": dq_assessment.data_shapes,
+        "vocab_shapes": dq_assessment.vocab_shapes,
+        "include_metrics": dq_assessment.include_metrics,
+        "exclude_metrics": dq_assessment.exclude_metrics
+    }
+    arguments = [(dq_assessment.config_path, dq_assessment.dataset_name, slug, info["file_path"], options) for slug, info in graphs.items()]
+    workers = min(dq_assessment.named_graph_workers, len(arguments))
+    with dq_assessment.profiler.phase('data', 'named_graphs'):
+        if workers <= 1:
+            graph_results = [assess_named_graph(*args) for args in arguments]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                graph_results = list(executor.map(assess_named_graph, *zip(*arguments)))
+    graph_results = dict(zip(graphs, graph_results))
+
+    for row in rollup_results(graph_results):
+        dq_assessment.results_aggregator.write_row(row)
+
+    dq_assessment.data_shapes_elapsed_time = sum(result["data_shapes_elapsed_time"] for result in graph_results.values())
+    dq_assessment.vocab_shapes_elapsed_time = sum(result["vocab_shapes_elapsed_time"] for result in graph_results.values())
+    dq_assessment.total_elapsed_time = time.time() - initial_time
+    logging.info(f"Assessed {len(graphs)} named graphs with {max(workers, 1)} workers. Total elapsed time: {dq_assessment.total_elapsed_time}")
+
+    dq_assessment.graph_profile = {
+        "num_triples": sum(result["graph_profile"]["num_triples"] or 0 for result in graph_results.values()),
+        "num_entities": sum(result["graph_profile"]["num_entities"] or 0 for result in graph_results.values()),
+        "named_graphs": {slug: {"graph": graphs[slug]["graph"]} | result["graph_profile"] for slug, result in graph_results.items()}
+    }
+
+    with dq_assessment.profiler.phase('results', 'csv_writing'):
+        dq_assessment.results_aggregator.close()
+    dq_assessment.counter_shapes = dq_assessment.results_aggregator.num_shapes + sum(result["num_inst_shapes"] for result in graph_results.values())
+    dq_assessment.results_rows = dq_assessment.results_aggregator.rows
@@ -0,0 +1,182 @@
+import os
+import mmap
+import time
+import uuid
+import logging
+from array import array
+
+from rdflib import Graph, URIRef, BNode, Literal
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+
+from bitmaps import EntityDictionary
+
+# N-Triples files are split in chunks on line boundaries that are parsed by several processes.
+# Each process sends back the distinct terms of its chunk and the triples as an array of term IDs,
+# which are re-encoded with the IDs of the whole file (EncodedTriples) and iterated directly (e.g. to
+# compute the graph profile with sketches), or added to a graph (parser_backend = ntriples). Adding the
+# triples to an rdflib graph is serial, so with the default parser the graphs aren't built from chunks.
+
+# Chunks per worker (smaller chunks balance the work when some parts of the file have longer lines)
+CHUNKS_PER_WORKER = 4
+MIN_CHUNK_SIZE = 1 << 20 # bytes
+NTRIPLES_FORMATS = {'nt', 'nt11', 'ntriples', 'n-triples'}
+
+
+class _BlankNodeLabels(dict):
+    """
+        Blank nodes of the N-Triples parser: the same label gets the same blank node in every chunk of a file
+    """
+    def __init__(self, prefix):
+        super().__init__()
+        self.prefix = prefix
+
+    def get(self, label, default=None):
+        return f'{self.prefix}{label}'
+
+
+def _term_to_key(term):
+    # Terms are sent to the main process as tuples of strings, faster to (un)pickle than rdflib terms
+    if isinstance(term, Literal):
+        return ('l', str(term), term.language, term.datatype and str(term.datatype))
+    return ('b' if isinstance(term, BNode) else 'u', str(term))
+
+def _key_to_term(key):
+    if key[0] == 'l':
+        return Literal(key[1], lang=key[2], datatype=key[3] and URIRef(key[3]))
+    return BNode(key[1]) if key[0] == 'b' else URIRef(key[1])
+
+
+class _EncodingSink:
+    """
+        Sink of the N-Triples parser that encodes the terms of a chunk with local IDs
+    """
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+        self.triples = array('I')
+
+    def encode(self, term):
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def triple(self, s, p, o):
+        self.triples.extend((self.encode(s), self.encode(p), self.encode(o)))
+
+
+class EncodedTriples:
+    """
+        Triples of a graph as an array of term IDs (3 per triple), with a dictionary of the terms.
+        Duplicated triples are kept once, as in a graph, unless dedup is False (e.g. the triples
+        are added to a graph, which already keeps them once).
+    """
+    def __init__(self, dedup=True):
+        self.dictionary = EntityDictionary()
+        self.triples = array('I')
+        # term key (see _term_to_key) -> term ID, and the triples already added (s, p, o IDs packed in an int)
+        self._term_ids = {}
+        self._triple_keys = set() if dedup else None
+
+    def encode(self, term_key):
+        term_id = self._term_ids.get(term_key)
+        if term_id is None:
+            term_id = self.dictionary.encode(_key_to_term(term_key))
+            self._term_ids[term_key] = term_id
+        return term_id
+
+    def add_chunk(self, term_keys, triples):
+        """
+        Adds the triples of a chunk, encoded with the IDs of its terms
+        """
+        ids = array('I', (self.encode(term_key) for term_key in term_keys))
+        if self._triple_keys is None:
+            # The IDs of the chunk are remapped to the IDs of the file
+            self.triples.extend(map(ids.__getitem__, triples))
+            return
+        for i in range(0, len(triples), 3):
+            s, p, o = ids[triples[i]], ids[triples[i + 1]], ids[triples[i + 2]]
+            triple_key = (s << 64) | (p << 32) | o
+            if triple_key not in self._triple_keys:
+                self._triple_keys.add(triple_key)
+                self.triples.extend((s, p, o))
+
+    def __len__(self):
+        return len(self.triples) // 3
+
+    def __iter__(self):
+        terms = self.dictionary.terms
+        triples = self.triples
+        for i in range(0, len(triples), 3):
+            yield terms[triples[i]], terms[triples[i + 1]], terms[triples[i + 2]]
+
+    def to_graph(self, graph=None):
+        if graph is None:
+            graph = Graph()
+        graph.addN((s, p, o, graph) for s, p, o in self)
+        return graph
+
+
+def is_ntriples_file(path, file_format=None):
+    """
+    Uncompressed N-Triples files can be split in chunks
+    """
+    if file_format:
+        return file_format.lower() in NTRIPLES_FORMATS
+    return os.path.splitext(path)[1].lower() == '.nt'
+
+def split_chunks(path, num_chunks):
+    """
+    Byte ranges (start, end) of the file that end in a new line, about the same size
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    chunk_size = max(size // num_chunks, MIN_CHUNK_SIZE)
+
+    chunks = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            end = data.find(b'\n', min(start + chunk_size, size) - 1)
+            end = size if end == -1 else end + 1
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+def parse_chunk(path, start, end, bnode_prefix):
+    """
+    Parses the lines between two offsets of an N-Triples file, returns the terms (as keys) and the triples (term IDs)
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        chunk = data[start:end]
+    sink = _EncodingSink()
+    W3CNTriplesParser(sink, bnode_context=_BlankNodeLabels(bnode_prefix)).parsestring(chunk)
+    return [_term_to_key(term) for term in sink.terms], sink.triples
+
+def load_ntriples(path, workers=os.cpu_count(), encoded_triples=None):
+    """
+    Parses an N-Triples file with several processes, returns the EncodedTriples
+    """
+    if encoded_triples is None:
+        encoded_triples = EncodedTriples()
+
+    initial_time = time.time()
+    chunks = split_chunks(path, max(workers, 1) * CHUNKS_PER_WORKER)
+    # Blank node labels are scoped to the file
+    bnode_prefix = f'N{uuid.uuid4().hex}'
+    if workers <= 1 or len(chunks) <= 1:
+        for start, end in chunks:
+            encoded_triples.add_chunk(*parse_chunk(path, start, end, bnode_prefix))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(parse_chunk, path, start, end, bnode_prefix) for start, end in chunks]
+            # In the order of the file
+            for future in futures:
+                encoded_triples.add_chunk(*future.result())
+
+    logging.info(f"Parsed {path} ({len(encoded_triples)} triples, {len(chunks)} chunks, {workers} workers) in {time.time() - initial_time}")
+    return encoded_triples
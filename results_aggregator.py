@@ -0,0 +1,268 @@
+import os
+import csv
+import copy
+
+from const import AGGREGATED_METRICS_INFO
+
+# Metric family (shape name without the counter) -> (aggregated metric, field of the result with the
+# class/property of the shape, whether the violations keep the score of the shape). Families whose
+# results are per vocabulary are aggregated per vocabulary. In the order of the rows in the CSV.
+AGGREGATED_METRICS = {
+    "MisplacedProperties": ("misplaced_properties", "property", False),
+    "MisplacedClasses": ("misplaced_classes", "class", False),
+    "CorrectRange": ("correct_range", "property", True),
+    "CorrectDomain": ("correct_domain", "property", True),
+    "EntitiesDisjointClasses": ("entities_disjoint_classes", "class", True),
+    "IrreflexiveProperty": ("irreflexive_property", "property", True),
+    "SelfDescriptiveFormatProperties": ("self_descriptive_format_properties", "property", False),
+    "MisuseOwlObjectProperties": ("misuse_object_properties", "property", True),
+    "MisuseOwlDatatypeProperties": ("misuse_datatype_properties", "property", True),
+    "FunctionalProperty": ("functional_property", "property", True),
+    "AsymmetricProperty": ("asymmetric_property", "property", True),
+    "SchemaCompletenessClassUsage": ("schema_completeness_class_usage", "class", False),
+    "MalformedLiteral": ("malformed_literal", "property", True),
+    "UndefinedProperty": ("undefined_properties", "property", False),
+    "UndefinedClass": ("undefined_classes", "class", False),
+    "DeprecatedProperties": ("deprecated_property", "property", True),
+}
+AGGREGATED_METRICS_ORDER = {name: position for position, (name, _, _) in enumerate(AGGREGATED_METRICS.values())}
+VOCABULARY_AGGREGATED_METRICS = {"undefined_properties", "undefined_classes"}
+
+RESULTS_FIELDNAMES = ['dimension','metric_id', 'metric',
+                      'score', 'message', 'metric_description', 'metric_type',
+                      'metric_calculation', 'meta_metric_calculation', 'shape_name', 'shape_template',
+                      'violations', 'violation_text', 'num_violations', 'vocab']
+
+
+class AggregatedMetric:
+    """
+        Shapes of a family that conform (ones) and the classes/properties of the ones that don't.
+        The shapes that weren't validated (time budget) are counted apart, the score is the one of the
+        validated shapes and the row is partial (or skipped when none was validated).
+    """
+    def __init__(self, name, vocab=None):
+        self.name = name
+        self.vocab = vocab
+        self.num_shapes = 0
+        self.num_ones = 0
+        self.violations = []
+        self.num_skipped = 0
+        self.skipped_message = ''
+        # Each shape of disjoint classes checks a pair of classes
+        self.weight = 2 if name == 'entities_disjoint_classes' else 1
+
+    def add(self, score, violation):
+        self.num_shapes += self.weight
+        if str(score) == "1":
+            self.num_ones += self.weight
+        else:
+            self.violations.append(violation)
+
+    def skip(self, message):
+        self.num_skipped += self.weight
+        self.skipped_message = message
+
+    def to_row(self):
+        row = copy.copy(AGGREGATED_METRICS_INFO[self.name])
+        if not self.num_shapes:
+            row.update({'score': '', 'message': self.skipped_message, 'violations': '', 'num_violations': 0,
+                        'status': 'skipped', 'validated_shapes': 0, 'total_shapes': self.num_skipped // self.weight})
+            if self.vocab:
+                row['vocab'] = self.vocab
+            return row
+
+        ratio = self.num_ones / self.num_shapes
+        row['score'] = ratio
+        row['denominator'] = self.num_shapes
+        if ratio < 1 and not self.vocab:
+            row['message'] = f'{self.num_shapes - self.num_ones} ' + row['message']
+        else:
+            row['message'] = ''
+        # (property, score) and (first class, second class, score) tuples are written as (a,b)
+        row['violations'] = '; '.join(f"({','.join(str(value) for value in violation)})" if isinstance(violation, tuple) else str(violation)
+                                      for violation in self.violations)
+        row['num_violations'] = len(self.violations)
+        if self.vocab:
+            row['vocab'] = self.vocab
+        if self.num_skipped:
+            num_validated = self.num_shapes // self.weight
+            num_total = (self.num_shapes + self.num_skipped) // self.weight
+            row['message'] = ' '.join(message for message in (row['message'], f'Partial: {num_validated} of {num_total} shapes validated.') if message)
+            row.update({'status': 'partial', 'validated_shapes': num_validated, 'total_shapes': num_total})
+        return row
+
+
+class ResultsAggregator:
+    """
+        Writes the results CSV while the results of each stage are produced: the results of a stage
+        (metadata, data or a vocabulary) are turned into rows and streamed to the CSV, and the shapes
+        instantiated per class/property are aggregated per metric family (AGGREGATED_METRICS) and
+        written after the rows of the stage. The CSV is written to a temporary file that replaces the
+        previous results when the run finishes.
+    """
+    def __init__(self, file_path, inline_violations=True, approximate=False, status=False, extra_fieldnames=None):
+        self.file_path = file_path
+        self.inline_violations = inline_violations
+        self.approximate = approximate
+        self.status = status
+
+        self.fieldnames = list(RESULTS_FIELDNAMES)
+        if approximate:
+            # Estimates of the entity ratio metrics
+            self.fieldnames += ['confidence_interval', 'sample_size']
+        if status:
+            # Metrics skipped by the time budget or disabled in the metric selection, and the shapes
+            # validated of the aggregated metrics with skipped shapes (partial)
+            self.fieldnames += ['status', 'validated_shapes', 'total_shapes']
+        if extra_fieldnames:
+            # e.g. the score of each named graph (named_graphs.py)
+            self.fieldnames += extra_fieldnames
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self.temp_file_path = f'{file_path}.tmp'
+        self.file = open(self.temp_file_path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames)
+        self.writer.writeheader()
+
+        # Shapes of the results and rows of the CSV without the violations (for the results store)
+        self.num_shapes = 0
+        self.rows = []
+        # aggregated metric -> number of shapes of the last stage, e.g. to count the properties with a domain
+        self.num_aggregated_shapes = {}
+        # [stage, number of rows, number of shapes] in the order of the CSV, e.g. to replace the rows of a stage (--watch)
+        self.stages = []
+
+    def write_row(self, row):
+        if self.status:
+            row.setdefault('status', 'evaluated')
+        # The denominator of the score isn't a column of the CSV, it's kept in the rows (e.g. to roll up the named graphs)
+        self.writer.writerow({field: value for field, value in row.items() if field != 'denominator'})
+        if self.stages:
+            self.stages[-1][1] += 1
+        self.rows.append({field: value for field, value in row.items() if field not in ('violations', 'violation_text')})
+
+    def add_results(self, results, num_violations=None, stage=None):
+        """
+        Writes the rows of the results of a stage. num_violations overrides the number of violations
+        of the shapes whose violations are counted while they are collected (e.g. DeprecatedClasses).
+        """
+        num_violations = num_violations or {}
+        if stage is not None:
+            self.stages.append([stage, 0, 0])
+        aggregated = {}
+        for shape_name, info in results.items():
+            self.num_shapes += 1
+            if self.stages:
+                self.stages[-1][2] += 1
+            if not isinstance(info, dict):
+                continue
+
+            family = shape_name.split('_')[0]
+            if info.get('status') == 'skipped':
+                if family in AGGREGATED_METRICS and family != shape_name:
+                    # A shape of the family not validated before the deadline (time budget), the family row is partial
+                    name = AGGREGATED_METRICS[family][0]
+                    self.get_aggregated_metric(aggregated, name, info).skip(info.get('message', ''))
+                    continue
+                # Not validated before the deadline (time budget) or disabled in the metric selection (a single row for the family)
+                self.write_row(self.create_skipped_row(shape_name, info))
+                continue
+
+            if family in AGGREGATED_METRICS:
+                name, field, with_score = AGGREGATED_METRICS[family]
+                metric = self.get_aggregated_metric(aggregated, name, info)
+
+                score = info.get('measure', '')
+                if str(score) == "1":
+                    violation = None
+                elif name == 'entities_disjoint_classes':
+                    violation = (info['class']['first_class'], info['class']['second_class'], score)
+                elif with_score:
+                    violation = (info.get(field, ''), score)
+                else:
+                    violation = info.get(field, '')
+                metric.add(score, violation)
+                continue
+
+            self.write_row(self.create_row(shape_name, info, num_violations.get(shape_name)))
+
+        self.num_aggregated_shapes = {}
+        for (name, vocab) in sorted(aggregated, key=lambda key: AGGREGATED_METRICS_ORDER[key[0]]):
+            metric = aggregated[(name, vocab)]
+            self.num_aggregated_shapes[name] = self.num_aggregated_shapes.get(name, 0) + metric.num_shapes + metric.num_skipped
+            self.write_row(metric.to_row())
+
+    def get_aggregated_metric(self, aggregated, name, info):
+        vocab = info.get('vocab', '') if name in VOCABULARY_AGGREGATED_METRICS else None
+        if (name, vocab) not in aggregated:
+            aggregated[(name, vocab)] = AggregatedMetric(name, vocab)
+        return aggregated[(name, vocab)]
+
+    def create_skipped_row(self, shape_name, info):
+        return {
+            'dimension': info.get('dimension', ''),
+            'metric': info.get('metric', ''),
+            'metric_id': info.get('metric_id', ''),
+            'metric_description': info.get('description', ''),
+            'score': '',
+            'message': info.get('message', ''),
+            'metric_type': info.get('metric_type', ''),
+            'metric_calculation': info.get('metric_calculation', ''),
+            'meta_metric_calculation': info.get('meta_metric_calculation', ''),
+            'shape_name': shape_name,
+            'shape_template': info.get('shape_template', ''),
+            'num_violations': 0,
+            'vocab': info.get('vocab', ''),
+            'status': 'skipped'
+        }
+
+    def create_row(self, shape_name, info, num_violations=None):
+        violations = info.get('violations', '')
+        violation_text = info.get('violation_text', '')
+        if num_violations is None:
+            num_violations = info.get('num_violations', 0)
+
+        if shape_name.startswith("InverseFunctionalPropertyUniqueness") and num_violations:
+            # violations contains the values of the property that are used multiple times
+            violations = f"({info.get('property', '')}); " + violations + ' )'
+
+        if not self.inline_violations:
+            # The violations are in the violations file, the CSV keeps the scores and counts
+            violations, violation_text = '', ''
+
+        row = {
+            'dimension': info.get('dimension', ''),
+            'metric': info.get('metric', ''),
+            'metric_id': info.get('metric_id', ''),
+            'metric_description': info.get('description', ''),
+            'score': info.get('measure', ''),
+            'message': info.get('message', ''),
+            'metric_type': info.get('metric_type', ''),
+            'metric_calculation': info.get('metric_calculation', ''),
+            'meta_metric_calculation': info.get('meta_metric_calculation', ''),
+            'shape_name': shape_name,
+            'shape_template': info.get('shape_template', ''),
+            'violations': violations,
+            'violation_text': violation_text,
+            'num_violations': num_violations,
+            'vocab': info.get('vocab', '')
+        }
+        if info.get('denominator') is not None:
+            row['denominator'] = info['denominator']
+        if self.approximate:
+            confidence_interval = info.get('confidence_interval')
+            row['confidence_interval'] = f'[{confidence_interval[0]:.4f}, {confidence_interval[1]:.4f}]' if confidence_interval else ''
+            row['sample_size'] = info.get('sample_size', '')
+        return row
+
+    def close(self):
+        """
+        Replaces the previous results CSV with the one of the run
+        """
+        self.file.close()
+        os.replace(self.temp_file_path, self.file_path)
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.temp_file_path):
+            os.remove(self.temp_file_path)
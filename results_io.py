@@ -0,0 +1,95 @@
+import os
+import json
+
+try:
+    import orjson
+except ImportError: # optional, the json module is used instead
+    orjson = None
+
+from const import RESULTS_FORMATS
+
+# The per-stage results are written as indented JSON by default (results_format = json). For large
+# datasets, results_format = ndjson writes one line per metric/shape ({"Metric_counter": {...}}) as the
+# results are written, without indentation, and the graph profile is written as compact JSON.
+# orjson is used to encode/decode when it's installed.
+
+
+def check_results_format(results_format):
+    if results_format not in RESULTS_FORMATS:
+        raise ValueError(f"Unknown results_format '{results_format}', use one of: {', '.join(RESULTS_FORMATS)}")
+    return results_format
+
+def dumps(data):
+    """
+    Compact JSON (bytes)
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=str, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def get_results_file_path(file_path, results_format='json'):
+    """
+    Path of a results file (e.g. results/dq_assessment_pizza_data.json) in the results format
+    """
+    base_path = file_path.removesuffix('.ndjson').removesuffix('.json')
+    return f'{base_path}.{results_format}'
+
+def write_results(file_path, results, results_format='json'):
+    """
+    Writes the results of a stage (file_path with the .json extension) and removes the file of the other format,
+    so the results of a previous run aren't read instead. Returns the path of the file.
+    """
+    for other_format in RESULTS_FORMATS:
+        other_file_path = get_results_file_path(file_path, other_format)
+        if other_format != results_format and os.path.exists(other_file_path):
+            os.remove(other_file_path)
+
+    file_path = get_results_file_path(file_path, results_format)
+    if results_format == 'ndjson':
+        with open(file_path, 'wb') as f:
+            for key, info in results.items():
+                f.write(dumps({key: info}) + b'\n')
+    else:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    return file_path
+
+def load_results(file_path):
+    """
+    Reads the results of a stage in any results format (file_path can have the .json or .ndjson extension)
+    """
+    for results_format in RESULTS_FORMATS:
+        format_file_path = get_results_file_path(file_path, results_format)
+        if not os.path.exists(format_file_path):
+            continue
+        if results_format == 'ndjson':
+            results = {}
+            with open(format_file_path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        results.update(loads(line))
+            return results
+        with open(format_file_path, 'rb') as f:
+            return loads(f.read())
+    raise FileNotFoundError(f"No results file for '{file_path}'")
+
+
+def write_json(file_path, data, compact=False):
+    """
+    Writes a JSON file (e.g. the graph profile), indented or compact. The file is replaced once it's
+    written, so that the assessments running at the same time (e.g. of named graphs) never read it half written.
+    """
+    temp_file_path = f'{file_path}.{os.getpid()}.tmp'
+    if compact:
+        with open(temp_file_path, 'wb') as f:
+            f.write(dumps(data))
+    else:
+        with open(temp_file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+    os.replace(temp_file_path, file_path)
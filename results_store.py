@@ -0,0 +1,246 @@
+import json
+import sqlite3
+import logging
+import argparse
+from datetime import datetime, timezone
+
+from const import RESULTS_STORE_FILE_PATH
+
+logging.basicConfig(level=logging.INFO)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    total_elapsed_time REAL,
+    num_inst_shapes INTEGER,
+    num_triples INTEGER,
+    approximate INTEGER NOT NULL DEFAULT 0,
+    graph_profile TEXT,
+    run_info TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_dataset ON runs (dataset, run_id);
+
+CREATE TABLE IF NOT EXISTS metric_results (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    dataset TEXT NOT NULL,
+    dimension TEXT,
+    metric_id TEXT,
+    metric TEXT,
+    shape_name TEXT NOT NULL,
+    vocab TEXT NOT NULL DEFAULT '',
+    score REAL,
+    num_violations INTEGER,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS metric_results_metric ON metric_results (dataset, metric_id, run_id);
+CREATE INDEX IF NOT EXISTS metric_results_shape ON metric_results (dataset, shape_name, run_id);
+CREATE INDEX IF NOT EXISTS metric_results_dimension ON metric_results (dataset, dimension, run_id);
+
+CREATE TABLE IF NOT EXISTS timings (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    elapsed_time REAL,
+    peak_rss INTEGER
+);
+CREATE INDEX IF NOT EXISTS timings_run ON timings (run_id);
+
+-- Entities are stored once and referenced by ID from the violations of every run
+CREATE TABLE IF NOT EXISTS entities (
+    entity_id INTEGER PRIMARY KEY,
+    iri TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS violations (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    shape_name TEXT NOT NULL,
+    vocab TEXT NOT NULL DEFAULT '',
+    entity_id INTEGER NOT NULL REFERENCES entities (entity_id)
+);
+CREATE INDEX IF NOT EXISTS violations_run ON violations (run_id, shape_name, vocab, entity_id);
+"""
+
+# Validation time of each stage in run_info.json
+STAGE_ELAPSED_TIMES = {
+    'metadata': 'metadata_shapes_elapsed_time',
+    'data': 'data_shapes_elapsed_time',
+    'vocabularies': 'vocab_shapes_elapsed_time'
+}
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultsStore:
+    """
+        History of the runs (scores, profile, timings and violating entities of each metric)
+        in a SQLite file, so that runs can be compared without keeping copies of the results files.
+    """
+    def __init__(self, path=RESULTS_STORE_FILE_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def add_run(self, dq_assessment, run_info):
+        """
+        Appends the results of a DQAssessment run (run_info is its entry of run_info.json) and returns the run ID
+        """
+        graph_profile = dq_assessment.graph_profile or {}
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (dataset, timestamp, total_elapsed_time, num_inst_shapes, num_triples, approximate, graph_profile, run_info) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (dq_assessment.dataset_name, datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                 dq_assessment.total_elapsed_time, dq_assessment.counter_shapes, graph_profile.get('num_triples'),
+                 int(dq_assessment.sampler is not None), json.dumps(graph_profile, default=str), json.dumps(run_info, default=str)))
+            run_id = cursor.lastrowid
+
+            self.connection.executemany(
+                "INSERT INTO metric_results (run_id, dataset, dimension, metric_id, metric, shape_name, vocab, score, num_violations, message) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, dq_assessment.dataset_name, row.get('dimension'), row.get('metric_id'), row.get('metric'),
+                  row.get('shape_name') or row.get('metric'), row.get('vocab') or '', to_float(row.get('score')),
+                  row.get('num_violations') or 0, row.get('message')) for row in dq_assessment.results_rows])
+
+            self.connection.executemany(
+                "INSERT INTO timings (run_id, stage, phase, elapsed_time, peak_rss) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, stage, 'stage_time', run_info.get(key), None) for stage, key in STAGE_ELAPSED_TIMES.items()] +
+                [(run_id, stage, phase, info['elapsed_time'], info.get('peak_rss'))
+                 for stage, phases in dq_assessment.profiler.phases.items() for phase, info in phases.items()])
+
+            self._add_violations(run_id, dq_assessment)
+        return run_id
+
+    def _add_violations(self, run_id, dq_assessment):
+        # Not imported by the readers of the store (e.g. the dashboard), rdflib is loaded by the assessment
+        from rdflib import BNode
+
+        for (vocab, shape_name), bitmap in dq_assessment.violation_bitmaps.items():
+            # Blank node labels change in every run, they can't be compared across runs
+            iris = [str(entity) for entity in dq_assessment.entity_ids.decode_all(bitmap) if not isinstance(entity, BNode)]
+            self.connection.executemany("INSERT OR IGNORE INTO entities (iri) VALUES (?)", [(iri,) for iri in iris])
+            self.connection.executemany(
+                "INSERT INTO violations (run_id, shape_name, vocab, entity_id) SELECT ?, ?, ?, entity_id FROM entities WHERE iri = ?",
+                [(run_id, shape_name, vocab or '', iri) for iri in iris])
+
+    def get_runs(self, dataset):
+        return [dict(row) for row in self.connection.execute(
+            "SELECT run_id, dataset, timestamp, total_elapsed_time, num_inst_shapes, num_triples, approximate "
+            "FROM runs WHERE dataset = ? ORDER BY run_id", (dataset,))]
+
+    def get_datasets(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT dataset FROM runs ORDER BY dataset")]
+
+    def get_metric_results(self, run_id):
+        """
+        (shape_name, vocab) -> metric row of a run
+        """
+        return {(row['shape_name'], row['vocab']): dict(row) for row in self.connection.execute(
+            "SELECT dimension, metric_id, metric, shape_name, vocab, score, num_violations FROM metric_results WHERE run_id = ?", (run_id,))}
+
+    def get_violation_ids(self, run_id):
+        """
+        (shape_name, vocab) -> sorted entity IDs of the violations of a run (read in the order of the index)
+        """
+        violation_ids = {}
+        for shape_name, vocab, entity_id in self.connection.execute(
+                "SELECT shape_name, vocab, entity_id FROM violations WHERE run_id = ? ORDER BY shape_name, vocab, entity_id", (run_id,)):
+            violation_ids.setdefault((shape_name, vocab), []).append(entity_id)
+        return violation_ids
+
+    def get_iris(self, entity_ids):
+        """
+        IRIs of entity IDs (in the same order)
+        """
+        iris = {}
+        entity_ids = list(entity_ids)
+        # SQLite limits the number of parameters of a query
+        for start in range(0, len(entity_ids), 900):
+            chunk = entity_ids[start:start + 900]
+            iris.update(self.connection.execute(
+                f"SELECT entity_id, iri FROM entities WHERE entity_id IN ({', '.join('?' * len(chunk))})", chunk).fetchall())
+        return [iris[entity_id] for entity_id in entity_ids]
+
+    def get_previous_run_id(self, dataset, run_id=None):
+        """
+        ID of the run before run_id (or of the last run when run_id is None)
+        """
+        if run_id is None:
+            row = self.connection.execute("SELECT MAX(run_id) FROM runs WHERE dataset = ?", (dataset,)).fetchone()
+        else:
+            row = self.connection.execute("SELECT MAX(run_id) FROM runs WHERE dataset = ? AND run_id < ?", (dataset, run_id)).fetchone()
+        return row[0]
+
+    def score_over_time(self, dataset, metric_id=None, shape_name=None, dimension=None):
+        """
+        Score of a metric (by metric ID, e.g. CN2, or shape name, e.g. LabelForEntities) in each run of a dataset.
+        With only a dimension, the average score of the metrics of the dimension.
+        """
+        if metric_id is not None:
+            query = ("SELECT r.run_id, r.timestamp, m.shape_name, m.vocab, m.score, m.num_violations FROM metric_results m "
+                     "JOIN runs r ON r.run_id = m.run_id WHERE m.dataset = ? AND m.metric_id = ? ORDER BY r.run_id, m.shape_name, m.vocab")
+            parameters = (dataset, metric_id)
+        elif shape_name is not None:
+            query = ("SELECT r.run_id, r.timestamp, m.shape_name, m.vocab, m.score, m.num_violations FROM metric_results m "
+                     "JOIN runs r ON r.run_id = m.run_id WHERE m.dataset = ? AND m.shape_name = ? ORDER BY r.run_id, m.vocab")
+            parameters = (dataset, shape_name)
+        elif dimension is not None:
+            query = ("SELECT r.run_id, r.timestamp, AVG(m.score) AS score, COUNT(*) AS num_metrics FROM metric_results m "
+                     "JOIN runs r ON r.run_id = m.run_id WHERE m.dataset = ? AND m.dimension = ? GROUP BY r.run_id ORDER BY r.run_id")
+            parameters = (dataset, dimension)
+        else:
+            raise ValueError("Specify a metric_id, shape_name or dimension")
+        return [dict(row) for row in self.connection.execute(query, parameters)]
+
+    def new_violations_since_last_run(self, dataset, run_id=None):
+        """
+        Violating entities of a run (the last one by default) that weren't violations of the same shape in the previous run
+        """
+        if run_id is None:
+            run_id = self.get_previous_run_id(dataset)
+        previous_run_id = self.get_previous_run_id(dataset, run_id)
+        if run_id is None:
+            return []
+        query = ("SELECT v.shape_name, v.vocab, e.iri FROM violations v JOIN entities e ON e.entity_id = v.entity_id "
+                 "WHERE v.run_id = ? AND NOT EXISTS (SELECT 1 FROM violations p WHERE p.run_id = ? AND p.shape_name = v.shape_name "
+                 "AND p.vocab = v.vocab AND p.entity_id = v.entity_id) ORDER BY v.shape_name, v.vocab, e.iri")
+        return [dict(row) for row in self.connection.execute(query, (run_id, previous_run_id if previous_run_id is not None else -1))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queries the history of the DQA runs")
+    parser.add_argument("-d", required=True, help="Dataset name")
+    parser.add_argument("--store", default=RESULTS_STORE_FILE_PATH, help="SQLite file of the results store")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--runs", action="store_true", help="List the runs of the dataset")
+    group.add_argument("--metric-id", help="Score over time of a metric ID, e.g. CN2")
+    group.add_argument("--shape", help="Score over time of a shape, e.g. LabelForEntities")
+    group.add_argument("--dimension", help="Average score over time of a dimension")
+    group.add_argument("--new-violations", action="store_true", help="Violations of the last run that weren't in the previous one")
+    args = parser.parse_args()
+
+    with ResultsStore(args.store) as store:
+        if args.runs:
+            rows = store.get_runs(args.d)
+        elif args.new_violations:
+            rows = store.new_violations_since_last_run(args.d)
+        else:
+            rows = store.score_over_time(args.d, metric_id=args.metric_id, shape_name=args.shape, dimension=args.dimension)
+    print(json.dumps(rows, indent=4))
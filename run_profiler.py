@@ -0,0 +1,339 @@
+import json
+import os
+import re
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager, ExitStack
+
+logging.basicConfig(level=logging.INFO)
+
+# Shapes are named ex:<Metric>Shape or ex:<Metric>Shape_<counter>
+SHAPE_NAME_PATTERN = re.compile(r'^(?P<metric>.+?)Shape(?:_(?P<counter>\d+))?$')
+
+
+def get_rss():
+    """
+    Current resident set size of the process (bytes)
+    """
+    # psutil is only imported by the runs that are profiled
+    import psutil
+    return psutil.Process().memory_info().rss
+
+def get_shape_metric(shape_uri):
+    """
+    Returns the metric (family) of an instantiated shape, e.g.
+    https://www.example.org/FunctionalPropertyShape_3 -> FunctionalProperty
+    """
+    shape_name = str(shape_uri).removeprefix("https://www.example.org/")
+    match = SHAPE_NAME_PATTERN.match(shape_name)
+    if match:
+        return match.group('metric')
+    return shape_name
+
+
+class RSSSampler:
+    """
+        Samples the RSS of the process on a background thread and keeps the peak of the phases being
+        tracked (the high-water mark of getrusage is the one of the process, not the one of a phase).
+        When it isn't started, the thread only runs while a phase is tracked.
+    """
+    def __init__(self, sample_interval=0.05):
+        self.sample_interval = sample_interval
+        self.peak_rss = 0
+
+        # Stats of the phases that are being tracked (phases can be nested)
+        self._active_phases = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started = False
+
+    def start(self):
+        self._started = True
+        self.peak_rss = max(self.peak_rss, get_rss())
+        self._start_thread()
+
+    def stop(self):
+        self._started = False
+        self._stop_thread()
+
+    def _start_thread(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_rss, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def _stop_thread(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _sample_rss(self):
+        import psutil
+        process = psutil.Process()
+        while not self._stop_event.wait(self.sample_interval):
+            rss = process.memory_info().rss
+            with self._lock:
+                self.peak_rss = max(self.peak_rss, rss)
+                for info in self._active_phases:
+                    info["peak_rss"] = max(info["peak_rss"], rss)
+
+    @contextmanager
+    def track(self, info):
+        """
+        Updates info["peak_rss"] with the RSS sampled until the block exits
+        """
+        with self._lock:
+            self._active_phases.append(info)
+        self._start_thread()
+        try:
+            yield
+        finally:
+            with self._lock:
+                # By identity, nested phases may have the same stats
+                self._active_phases = [phase for phase in self._active_phases if phase is not info]
+                idle = not self._active_phases and not self._started
+            if idle:
+                self._stop_thread()
+
+
+class MemoryProfiler:
+    """
+        Samples the RSS of the process on a background thread and takes tracemalloc snapshots
+        at the boundaries of the top-level phases of the assessment, to report the peak memory
+        of each phase and the top allocation sites of the top-level ones.
+        Tracing allocations slows down the run considerably, so it's only used on demand.
+    """
+    def __init__(self, sample_interval=0.05, top_n=10):
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.rss_sampler = RSSSampler(sample_interval)
+        # phase -> memory stats
+        self.phases = {}
+
+        # Stats of the phases that are being executed (phases can be nested)
+        self._active_phases = []
+        self._lock = threading.Lock()
+
+    @property
+    def peak_rss(self):
+        return self.rss_sampler.peak_rss
+
+    def start(self):
+        tracemalloc.start()
+        self.rss_sampler.start()
+
+    def stop(self):
+        self.rss_sampler.stop()
+        tracemalloc.stop()
+
+    def _update_traced_peak(self):
+        # tracemalloc only keeps a global peak, so at every boundary the peak is
+        # propagated to the running phases and then reset
+        _, traced_peak = tracemalloc.get_traced_memory()
+        for info in self._active_phases:
+            info["traced_peak"] = max(info["traced_peak"], traced_peak)
+        tracemalloc.reset_peak()
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    @contextmanager
+    def phase(self, name):
+        rss = get_rss()
+        with self._lock:
+            self._update_traced_peak()
+            info = {
+                "start_rss": rss,
+                "peak_rss": rss,
+                "traced_start": tracemalloc.get_traced_memory()[0],
+                "traced_peak": 0
+            }
+            # A snapshot walks every live allocation, so taking one at the boundaries of the
+            # nested phases (run once per vocabulary, graph...) made the run ~9x slower.
+            # Nested phases only report their peaks
+            top_level = not self._active_phases
+            self._active_phases.append(info)
+        start_snapshot = self._take_snapshot() if top_level else None
+        try:
+            with self.rss_sampler.track(info):
+                yield
+        finally:
+            end_snapshot = self._take_snapshot() if top_level else None
+            with self._lock:
+                self._update_traced_peak()
+                self._active_phases.remove(info)
+
+            info["end_rss"] = get_rss()
+            info["peak_rss"] = max(info["peak_rss"], info["end_rss"])
+            info["traced_end"] = tracemalloc.get_traced_memory()[0]
+            info["top_allocations"] = [
+                {
+                    "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff
+                }
+                for stat in end_snapshot.compare_to(start_snapshot, 'lineno')[:self.top_n]
+                if stat.size_diff > 0
+            ] if top_level else []
+            self._record_phase(name, info)
+
+    def _record_phase(self, name, info):
+        if name not in self.phases:
+            info["calls"] = 1
+            self.phases[name] = info
+            return
+
+        # Phases executed more than once keep the highest peaks and the allocation sites that grew the most
+        recorded = self.phases[name]
+        recorded["calls"] += 1
+        recorded["end_rss"] = info["end_rss"]
+        recorded["traced_end"] = info["traced_end"]
+        recorded["peak_rss"] = max(recorded["peak_rss"], info["peak_rss"])
+        recorded["traced_peak"] = max(recorded["traced_peak"], info["traced_peak"])
+
+        sites = {}
+        for allocation in recorded["top_allocations"] + info["top_allocations"]:
+            site = sites.setdefault(allocation["site"], {"site": allocation["site"], "size_diff": 0, "count_diff": 0})
+            site["size_diff"] += allocation["size_diff"]
+            site["count_diff"] += allocation["count_diff"]
+        recorded["top_allocations"] = sorted(sites.values(), key=lambda site: site["size_diff"], reverse=True)[:self.top_n]
+
+    def to_dict(self):
+        return {
+            "peak_rss": self.peak_rss,
+            "sample_interval": self.sample_interval,
+            "phases": self.phases
+        }
+
+
+class RunProfiler:
+    """
+        Records wall time and memory per phase of the assessment, and wall time,
+        focus nodes and violations per validated shape.
+        When it's not enabled, phases and shapes aren't recorded.
+        If a memory profiler is given, the phases are also reported to it.
+    """
+    def __init__(self, enabled=False, memory_profiler=None):
+        self.enabled = enabled
+        self.memory_profiler = memory_profiler
+        # stage -> phase -> stats, e.g. phases['data']['validation']
+        self.phases = {}
+        # stage -> list of per-shape stats
+        self.shapes = {}
+        # Phase running now as 'stage.phase' (e.g. the progress of the jobs of the daemon), always tracked
+        self.current_phase = None
+        # Peak RSS of the phases, sampled while they run
+        self.rss_sampler = RSSSampler()
+
+    @contextmanager
+    def phase(self, stage, name):
+        """
+        Times a phase (parsing, tbox_merge, shape_building, validation, result_processing, csv_writing)
+        of a stage (profiling, metadata, data, vocabularies, results).
+        Phases executed more than once (e.g. one validation per vocabulary) are accumulated.
+        Phases can be nested, e.g. the parsing of the graph is included in the graph_profile phase.
+        """
+        previous_phase = self.current_phase
+        self.current_phase = f'{stage}.{name}'
+        try:
+            with ExitStack() as stack:
+                if self.memory_profiler is not None:
+                    stack.enter_context(self.memory_profiler.phase(f'{stage}.{name}'))
+                if self.enabled:
+                    stack.enter_context(self._timed_phase(stage, name))
+                yield
+        finally:
+            self.current_phase = previous_phase
+
+    @contextmanager
+    def _timed_phase(self, stage, name):
+        start_rss = get_rss()
+        sampled = {"peak_rss": start_rss}
+        start_time = time.perf_counter()
+        try:
+            with self.rss_sampler.track(sampled):
+                yield
+        finally:
+            elapsed_time = time.perf_counter() - start_time
+            end_rss = get_rss()
+            peak_rss = max(sampled["peak_rss"], end_rss)
+
+            stage_phases = self.phases.setdefault(stage, {})
+            if name not in stage_phases:
+                stage_phases[name] = {
+                    "elapsed_time": 0,
+                    "calls": 0,
+                    "start_rss": start_rss,
+                    "end_rss": end_rss,
+                    "peak_rss": peak_rss
+                }
+            info = stage_phases[name]
+            info["elapsed_time"] += elapsed_time
+            info["calls"] += 1
+            info["end_rss"] = end_rss
+            info["peak_rss"] = max(info["peak_rss"], peak_rss)
+
+    def record_shapes(self, stage, shape_stats):
+        """
+        Stores the statistics of the shapes validated in a stage
+        """
+        if not self.enabled:
+            return
+        self.shapes.setdefault(stage, []).extend(shape_stats)
+
+    def metrics_summary(self, stage):
+        """
+        Aggregates the shapes statistics of a stage per metric (family of shapes)
+        """
+        metrics = {}
+        for shape in self.shapes.get(stage, []):
+            metric = shape['metric']
+            if metric not in metrics:
+                metrics[metric] = {
+                    "num_shapes": 0,
+                    "elapsed_time": 0,
+                    "num_focus_nodes": 0,
+                    "num_violations": 0
+                }
+            metrics[metric]["num_shapes"] += 1
+            metrics[metric]["elapsed_time"] += shape['elapsed_time']
+            metrics[metric]["num_focus_nodes"] += shape['num_focus_nodes']
+            metrics[metric]["num_violations"] += shape['num_violations']
+
+        return dict(sorted(metrics.items(), key=lambda item: item[1]['elapsed_time'], reverse=True))
+
+    def to_dict(self):
+        return {
+            "phases": self.phases,
+            "metrics": {stage: self.metrics_summary(stage) for stage in self.shapes},
+            "shapes": {
+                stage: sorted(shapes, key=lambda shape: shape['elapsed_time'], reverse=True)
+                for stage, shapes in self.shapes.items()
+            }
+        }
+
+    def save(self, output_path, dataset_name):
+        """
+        Stores the profile of the run in output_path, keyed by dataset (same layout as run_info.json)
+        """
+        if os.path.exists(output_path):
+            with open(output_path, "r", encoding="utf-8") as f:
+                run_profile = json.load(f)
+        else:
+            run_profile = {}
+
+        run_profile[dataset_name] = self.to_dict()
+
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(run_profile, f, indent=4)
+
+        logging.info(f"Run profile saved in {output_path}")
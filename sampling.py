@@ -0,0 +1,203 @@
+import math
+import random
+import logging
+from itertools import islice
+from statistics import NormalDist
+
+from rdflib import Graph, URIRef, BNode, RDF, SH
+
+from utils import compute_graph_profile
+
+logging.basicConfig(level=logging.INFO)
+
+SAMPLE_METHODS = ('uniform', 'stratified')
+RESERVOIR_METHODS = ('first', 'reservoir')
+
+
+def get_z_score(confidence):
+    return NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+
+def get_sample_size(population, target_error, confidence):
+    """
+    Number of entities needed to estimate a proportion with a margin of error of target_error
+    at the given confidence (worst case p = 0.5, with finite population correction)
+    """
+    if population == 0:
+        return 0
+    z = get_z_score(confidence)
+    n0 = z**2 * 0.25 / target_error**2
+    return min(population, math.ceil(n0 / (1 + (n0 - 1) / population)))
+
+def wilson_interval(p_hat, n, confidence):
+    """
+    Wilson score interval of a proportion estimated on n observations
+    """
+    if not n:
+        return [0.0, 1.0]
+    z = get_z_score(confidence)
+    denominator = 1 + z**2 / n
+    center = (p_hat + z**2 / (2 * n)) / denominator
+    half_width = z * math.sqrt(p_hat * (1 - p_hat) / n + z**2 / (4 * n**2)) / denominator
+    return [max(0.0, center - half_width), min(1.0, center + half_width)]
+
+
+def sample_entities(graph, type_property, sample_size, method='uniform', seed=42):
+    """
+    Draws sample_size entities (subjects of the type property) of the graph.
+    With the stratified method, each class (the first type of the entity) gets a number of
+    entities proportional to its size (largest remainder), so the sample stays self-weighting
+    and the ratios can be estimated without weights.
+    """
+    rng = random.Random(seed)
+    # Sorted so that the sample only depends on the seed
+    entities = sorted(set(graph.subjects(URIRef(type_property), None)), key=str)
+    if sample_size >= len(entities):
+        return entities
+
+    if method == 'uniform':
+        return rng.sample(entities, sample_size)
+
+    strata = {}
+    for entity in entities:
+        entity_class = min(str(c) for c in graph.objects(entity, URIRef(type_property)))
+        strata.setdefault(entity_class, []).append(entity)
+
+    quotas = {entity_class: sample_size * len(stratum) / len(entities) for entity_class, stratum in strata.items()}
+    allocation = {entity_class: math.floor(quota) for entity_class, quota in quotas.items()}
+    remaining = sample_size - sum(allocation.values())
+    for entity_class in sorted(quotas, key=lambda c: (allocation[c] - quotas[c], c))[:remaining]:
+        allocation[entity_class] += 1
+
+    sample = []
+    for entity_class in sorted(strata):
+        sample.extend(rng.sample(strata[entity_class], allocation[entity_class]))
+    return sample
+
+def extract_neighbourhood(graph, entities, type_property):
+    """
+    Subgraph with the triples of the sampled entities and the triples of their blank node values.
+    The types of the entities they link to (needed by the range shapes) are returned separately,
+    so that these entities aren't counted in the profile of the sample.
+    Shapes that compare several entities (e.g. uniqueness of inverse functional properties)
+    only see the entities of the sample.
+    """
+    neighbourhood = Graph()
+    context = Graph()
+    for prefix, namespace in graph.namespaces():
+        neighbourhood.bind(prefix, namespace, override=False)
+
+    type_property = URIRef(type_property)
+    sampled = set(entities)
+    for entity in entities:
+        for s, p, o in graph.triples((entity, None, None)):
+            neighbourhood.add((s, p, o))
+            if isinstance(o, BNode):
+                for triple in graph.triples((o, None, None)):
+                    neighbourhood.add(triple)
+            elif isinstance(o, URIRef) and p != type_property and o not in sampled:
+                for triple in graph.triples((o, type_property, None)):
+                    context.add(triple)
+    return neighbourhood, context
+
+
+class Reservoir:
+    """
+        Decides which items of a stream are kept when only k of them can be stored:
+        the first k items, or a uniform sample of k items (reservoir sampling, algorithm R)
+    """
+    def __init__(self, k, method='first', rng=None):
+        if method not in RESERVOIR_METHODS:
+            raise ValueError(f"Unknown sampling method '{method}', use one of: {', '.join(RESERVOIR_METHODS)}")
+        self.k = k
+        self.method = method
+        self.rng = rng if rng is not None else random.Random(42)
+        self.seen = 0
+
+    def offer(self):
+        """
+        Slot (0 to k-1) where the next item of the stream must be stored, None if it's discarded
+        """
+        self.seen += 1
+        if self.seen <= self.k:
+            return self.seen - 1
+        if self.method == 'reservoir':
+            slot = self.rng.randrange(self.seen)
+            if slot < self.k:
+                return slot
+        return None
+
+def sample_stream(items, k, method='first', rng=None):
+    """
+    First k items of an iterable, or a uniform sample of k of them
+    """
+    if method == 'first':
+        return list(islice(items, k))
+    reservoir = Reservoir(k, method, rng)
+    sample = []
+    for item in items:
+        slot = reservoir.offer()
+        if slot is None:
+            continue
+        if slot == len(sample):
+            sample.append(item)
+        else:
+            sample[slot] = item
+    return sample
+
+
+class GraphSampler:
+    """
+        Replaces the data graph by the neighbourhood of a sample of its entities (approximate mode).
+        The sample size is derived from the target error and confidence of the estimates.
+    """
+    def __init__(self, dq_assessment, method='uniform', target_error=0.05, confidence=0.95, seed=42):
+        if method not in SAMPLE_METHODS:
+            raise ValueError(f"Unknown sample method '{method}', use one of: {', '.join(SAMPLE_METHODS)}")
+        self.dq_assessment = dq_assessment
+        self.method = method
+        self.target_error = target_error
+        self.confidence = confidence
+        self.seed = seed
+
+        self.population = 0
+        self.sample_size = 0
+        self.sample_profile = None
+        # Entities linked from the sample that are only included for their types
+        self.context_entities = set()
+
+    def __call__(self, graph):
+        type_property = self.dq_assessment.type_property
+        self.population = len(set(graph.subjects(URIRef(type_property), None)))
+        sample_size = get_sample_size(self.population, self.target_error, self.confidence)
+
+        entities = sample_entities(graph, type_property, sample_size, self.method, self.seed)
+        sample_graph, context = extract_neighbourhood(graph, entities, type_property)
+        self.sample_size = len(entities)
+        # Denominators of the measures (entities, subjects per property, entities per class) are taken from the sample
+        self.sample_profile = compute_graph_profile(self.dq_assessment, sample_graph)
+        self.context_entities = set(context.subjects())
+
+        logging.info(f"Sampled {self.sample_size} of {self.population} entities ({self.method}), {len(sample_graph)} of {len(graph)} triples")
+        return sample_graph + context
+
+    def filter_report(self, report_graph):
+        """
+        Removes the validation results of the entities that aren't part of the sample
+        """
+        for result in list(report_graph.subjects(RDF.type, SH.ValidationResult)):
+            if report_graph.value(result, SH.focusNode) in self.context_entities:
+                report_graph.remove((result, None, None))
+        return report_graph
+
+    def confidence_interval(self, measure, n):
+        return wilson_interval(measure, n, self.confidence)
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "target_error": self.target_error,
+            "confidence": self.confidence,
+            "seed": self.seed,
+            "population": self.population,
+            "sample_size": self.sample_size
+        }
@@ -2,6 +2,7 @@ import json
 import copy
 from const import *
 from utils import *
+from results_io import load_results, write_json
 
 class SHACLShapeBuilder:
     """
@@ -22,7 +23,12 @@ class SHACLShapeBuilder:
         self.config = dq_assessment.config
         self.vocab_names = dq_assessment.vocab_names
         self.dataset_name = dq_assessment.dataset_name
+        self.metadata_dataset_name = dq_assessment.metadata_dataset_name
         self.template = dq_assessment.data_template
+        self.results_format = dq_assessment.results_format
+        self.parser_backend = dq_assessment.parser_backend
+        # Shapes of the metrics disabled in the metric selection aren't instantiated
+        self.is_metric_enabled = dq_assessment.is_metric_enabled
 
         self.counter ={
             "count_owl_datatype_properties": 0,
@@ -45,36 +51,50 @@ class SHACLShapeBuilder:
         # with specific information of classes and properties
         self.dq_results_intrinsic = {}
 
+    def add_disabled_metric_info(self, dq_results, metric_name, metrics=DQ_MEASURES_DATA_SPECIFIC):
+        """
+        Result without counter of a disabled metric that is instantiated per class/property,
+        so that the metric has a (skipped) row in the results
+        """
+        if metric_name not in dq_results:
+            metric_info = copy.deepcopy(metrics[metric_name])
+            metric_info['shape'] = ''
+            dq_results[metric_name] = metric_info
+
     def accessibility_data_shapes(self):
 
         shacl_shapes = ''
 
-        shacl_shapes += self.template.module.interlinking_external_uris(self.base_namespace, self.interlinking_property) + '\n'
-        shacl_shapes += self.template.module.performance_hash_uris_entities(self.type_property)
+        if self.is_metric_enabled("UsageExternalURIEntities"):
+            shacl_shapes += self.template.module.interlinking_external_uris(self.base_namespace, self.interlinking_property) + '\n'
+        if self.is_metric_enabled("UsageHashURIsEntities"):
+            shacl_shapes += self.template.module.performance_hash_uris_entities(self.type_property)
          
         return shacl_shapes
     
 
     def contextual_data_shapes(self):
-        shacl_shapes = self.template.module.understandability_label_entities(self.type_property, self.labeling_property) + '\n'
+        shacl_shapes = ''
+        if self.is_metric_enabled("LabelForEntities"):
+            shacl_shapes += self.template.module.understandability_label_entities(self.type_property, self.labeling_property) + '\n'
         
         # Check if the metric URIRegexPressence is 1, hence, 
         # there's a regex pattern provided for the URIs
-        folder_path = DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.dataset_name)
-        results_file = f'{folder_path}/dq_assessment_{self.dataset_name}_metadata.json'
-        with open(results_file, 'r', encoding='utf-8') as f:
-            results = json.load(f)
+        folder_path = DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=self.metadata_dataset_name)
+        results = load_results(f'{folder_path}/dq_assessment_{self.metadata_dataset_name}_metadata.json')
 
         metadata_file_path = self.config['settings']['metadata_file']
         metadata_file_format = self.config['settings']['metadata_file_format']
         if "URIRegexPressence" in results and results["URIRegexPressence"]['measure'] == 1:
             # If the metric is 1, we need to check the regex pattern against the URIs
-            self.regex_pattern = get_uri_regex_pattern(metadata_file_path, metadata_file_format)
-            shacl_shapes += self.template.module.understandability_uri_regex_compliance_entities(self.type_property, escape_dots_for_turtle_regex(self.regex_pattern))
+            self.regex_pattern = get_uri_regex_pattern(metadata_file_path, metadata_file_format, self.parser_backend)
+            if self.is_metric_enabled("URIRegexComplianceEntities"):
+                shacl_shapes += self.template.module.understandability_uri_regex_compliance_entities(self.type_property, escape_dots_for_turtle_regex(self.regex_pattern))
         
         if "URISpacePressence" in results and results["URISpacePressence"]['measure'] == 1:
-            self.uri_space = get_uri_space(metadata_file_path, metadata_file_format)
-            shacl_shapes += self.template.module.understandability_uri_space_compliance_entities(self.type_property, self.uri_space)
+            self.uri_space = get_uri_space(metadata_file_path, metadata_file_format, self.parser_backend)
+            if self.is_metric_enabled("URISpaceComplianceEntities"):
+                shacl_shapes += self.template.module.understandability_uri_space_compliance_entities(self.type_property, self.uri_space)
             
         return self.regex_pattern, self.uri_space, shacl_shapes
 
@@ -83,23 +103,33 @@ class SHACLShapeBuilder:
         max_length_value = self.uris_max_length
         shacl_shapes = ''
 
-        shacl_shapes += self.template.module.representational_conciseness_uris_length(self.type_property, max_length_value) + '\n'
-        shacl_shapes += self.template.module.representational_conciseness_uris_parameters(self.type_property) + '\n'
-        shacl_shapes += self.template.module.representational_conciseness_prolix_features(self.type_property) + '\n'
+        if self.is_metric_enabled("URIsLengthEntities"):
+            shacl_shapes += self.template.module.representational_conciseness_uris_length(self.type_property, max_length_value) + '\n'
+        if self.is_metric_enabled("URIsParametersEntities"):
+            shacl_shapes += self.template.module.representational_conciseness_uris_parameters(self.type_property) + '\n'
+        if self.is_metric_enabled("ProlixFeatures"):
+            shacl_shapes += self.template.module.representational_conciseness_prolix_features(self.type_property) + '\n'
         
-        if self.labeling_property:
+        if self.labeling_property and self.is_metric_enabled("DifferentLanguagesLabelsEntities"):
             shacl_shapes += self.template.module.versatility_languages_labels_entities(self.type_property, self.labeling_property) + '\n'
             
-        if self.description_property:
+        if self.description_property and self.is_metric_enabled("DifferentLanguagesDescriptionsEntities"):
             shacl_shapes += self.template.module.versatility_languages_descriptions_entities(self.type_property, self.description_property) + '\n'
             
-        shacl_shapes += self.template.module.interpretability_self_descriptive_formats(self.type_property) + '\n'
-        shacl_shapes += self.template.module.interpretability_usage_blank_nodes(self.type_property) + '\n'
+        if self.is_metric_enabled("SelfDescriptiveFormat"):
+            shacl_shapes += self.template.module.interpretability_self_descriptive_formats(self.type_property) + '\n'
+        if self.is_metric_enabled("BlankNodesUsageEntities"):
+            shacl_shapes += self.template.module.interpretability_usage_blank_nodes(self.type_property) + '\n'
 
         property_counter = 0
         property_counter_map = {}
         dq_results = {}
-        for prop in graph_profile['properties']:
+        properties = graph_profile['properties']
+        if not self.is_metric_enabled("SelfDescriptiveFormatProperties"):
+            if properties:
+                self.add_disabled_metric_info(dq_results, "SelfDescriptiveFormatProperties")
+            properties = []
+        for prop in properties:
             shacl_shapes += self.template.module.interpretability_self_descriptive_format_properties(property_counter, prop) + '\n'
             
             metric_info = copy.deepcopy(DQ_MEASURES_DATA_SPECIFIC['SelfDescriptiveFormatProperties'])
@@ -111,7 +141,7 @@ class SHACLShapeBuilder:
             property_counter += 1
 
         # Store specific result
-        file_path = DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH
+        file_path = DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name)
         if os.path.exists(file_path):
             with open(file_path, 'r', encoding='utf-8') as f:
                 try:
@@ -152,6 +182,10 @@ class SHACLShapeBuilder:
 
 
     def correct_domain_shape(self, prop, domain):
+        if not self.is_metric_enabled("CorrectDomain"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "CorrectDomain")
+            return ''
+
         shape = self.template.module.consistency_correct_domain(self.counter["property_counter"], prop, domain) + '\n'
 
         metric_name = "CorrectDomain"
@@ -160,6 +194,10 @@ class SHACLShapeBuilder:
         return shape
     
     def correct_domain_node_kind_shape(self, prop):
+        if not self.is_metric_enabled("CorrectDomain"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "CorrectDomain")
+            return ''
+
         shape = self.template.module.consistency_correct_domain_node_kind(self.counter["property_counter"], prop) + '\n'
 
         metric_name = "CorrectDomain"
@@ -169,6 +207,10 @@ class SHACLShapeBuilder:
     
     def correct_range_object_shape(self, prop, range_value):
 
+        if not self.is_metric_enabled("CorrectRange"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "CorrectRange")
+            return ''
+
         shape = self.template.module.consistency_correct_range_object(self.counter["property_counter"], prop, range_value) + '\n'
         metric_name = "CorrectRange"
         self.create_metric_info_prop(metric_name, prop)
@@ -177,6 +219,10 @@ class SHACLShapeBuilder:
     
     def correct_range_datatype_shape(self, prop, range_value=None):
 
+        if not self.is_metric_enabled("CorrectRange"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "CorrectRange")
+            return ''
+
         shape = self.template.module.consistency_correct_range_datatype(self.counter["property_counter"], prop, range_value) + '\n'
         metric_name = "CorrectRange"
         self.create_metric_info_prop(metric_name, prop)
@@ -185,6 +231,10 @@ class SHACLShapeBuilder:
     
     def correct_range_node_kind_shape(self, prop, node_kind):
         
+        if not self.is_metric_enabled("CorrectRange"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "CorrectRange")
+            return ''
+
         if node_kind == 'Literal':
             shape = self.template.module.consistency_correct_range_node_kind_literal(self.counter["property_counter"], prop) + '\n'
         elif node_kind == 'BlankNodeOrIri':
@@ -198,6 +248,10 @@ class SHACLShapeBuilder:
 
     def misuse_owl_datatype_properties(self, prop):
 
+        if not self.is_metric_enabled("MisuseOwlDatatypeProperties"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "MisuseOwlDatatypeProperties")
+            return ''
+
         shape = self.template.module.consistency_misuse_datatype_properties(self.counter["property_counter"], prop) + '\n'
                         
         metric_name = "MisuseOwlDatatypeProperties"
@@ -206,6 +260,10 @@ class SHACLShapeBuilder:
         return shape
     
     def misuse_owl_object_properties(self, prop):
+        if not self.is_metric_enabled("MisuseOwlObjectProperties"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "MisuseOwlObjectProperties")
+            return ''
+
         shape = self.template.module.consistency_misuse_object_properties(self.counter["property_counter"], prop) + '\n'
         metric_name = "MisuseOwlObjectProperties"
         self.create_metric_info_prop(metric_name, prop)
@@ -213,6 +271,10 @@ class SHACLShapeBuilder:
         return shape
 
     def misplaced_properties(self, prop):
+        if not self.is_metric_enabled("MisplacedProperties"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "MisplacedProperties")
+            return ''
+
         shape = self.template.module.consistency_misplaced_properties(self.counter["property_counter"], prop, self.type_property) + '\n'
         metric_name = "MisplacedProperties"
         self.create_metric_info_prop(metric_name, prop)
@@ -220,6 +282,10 @@ class SHACLShapeBuilder:
 
 
     def member_malformed_literal(self, prop, range_value):
+        if not self.is_metric_enabled("MalformedLiteral"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "MalformedLiteral")
+            return ''
+
         shape = self.template.module.syntactic_validity_malformed_literal(self.counter["property_counter"], prop, range_value) + '\n'
                             
         metric_name = "MalformedLiteral"
@@ -228,30 +294,50 @@ class SHACLShapeBuilder:
         return shape
     
     def irreflexive_properties(self, prop):
+        if not self.is_metric_enabled("IrreflexiveProperty"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "IrreflexiveProperty")
+            return ''
+
         shape = self.template.module.consistency_irreflexive_property(self.counter["property_counter"], prop) + '\n'
         metric_name = "IrreflexiveProperty"
         self.create_metric_info_prop(metric_name, prop)
         return shape
     
     def deprecated_properties(self, prop):
+        if not self.is_metric_enabled("DeprecatedProperties"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "DeprecatedProperties")
+            return ''
+
         shape = self.template.module.consistency_deprecated_properties(self.counter["property_counter"], prop, self.type_property) + '\n'
         metric_name = "DeprecatedProperties"
         self.create_metric_info_prop(metric_name, prop)
         return shape
 
     def inverse_functional_properties(self, prop):
+        if not self.is_metric_enabled("InverseFunctionalPropertyUniqueness"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "InverseFunctionalPropertyUniqueness")
+            return ''
+
         shape = self.template.module.consistency_inverse_functional_property(self.counter["property_counter"], prop) + '\n'
         metric_name = "InverseFunctionalPropertyUniqueness"
         self.create_metric_info_prop(metric_name, prop)
         return shape
 
     def functional_properties(self, prop):
+        if not self.is_metric_enabled("FunctionalProperty"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "FunctionalProperty")
+            return ''
+
         shape = self.template.module.consistency_functional_property(self.counter["property_counter"], prop) + '\n'
         metric_name = "FunctionalProperty"
         self.create_metric_info_prop(metric_name, prop)
         return shape
     
     def asymmetric_properties(self, prop):
+        if not self.is_metric_enabled("AsymmetricProperty"):
+            self.add_disabled_metric_info(self.dq_results_intrinsic, "AsymmetricProperty")
+            return ''
+
         shape = self.template.module.consistency_asymmetric_property(self.counter["property_counter"], prop) + '\n'
         metric_name = "AsymmetricProperty"
         self.create_metric_info_prop(metric_name, prop)
@@ -261,7 +347,8 @@ class SHACLShapeBuilder:
 
         shacl_shapes = ''
 
-        shacl_shapes += self.template.module.interlinking_completeness(self.type_property, self.interlinking_property)
+        if self.is_metric_enabled("InterlinkingCompleteness"):
+            shacl_shapes += self.template.module.interlinking_completeness(self.type_property, self.interlinking_property)
 
         properties_in_dataset = graph_profile['properties']
         classes_in_dataset = graph_profile['classes']
@@ -276,15 +363,23 @@ class SHACLShapeBuilder:
             if len(vocab_profile['classes']) > 0:
                 for class_uri in vocab_profile['classes']:
 
-                    shacl_shapes += self.template.module.completeness_schema_completeness_class_usage(self.counter["class_counter"], class_uri, self.type_property)
                     metric_name = "SchemaCompletenessClassUsage"
-                    self.create_metric_info_class(metric_name, class_uri=str(class_uri), classes=None)
+                    if self.is_metric_enabled(metric_name):
+                        shacl_shapes += self.template.module.completeness_schema_completeness_class_usage(self.counter["class_counter"], class_uri, self.type_property)
+                        self.create_metric_info_class(metric_name, class_uri=str(class_uri), classes=None)
+                    else:
+                        self.add_disabled_metric_info(self.dq_results_intrinsic, metric_name)
 
-                    shacl_shapes += self.template.module.consistency_misplaced_classes(self.counter["class_counter"], class_uri, self.type_property)
                     metric_name = "MisplacedClasses"
-                    self.create_metric_info_class(metric_name, class_uri=str(class_uri), classes=None)
-
-            if len(vocab_profile['disjoint_classes']) > 0:
+                    if self.is_metric_enabled(metric_name):
+                        shacl_shapes += self.template.module.consistency_misplaced_classes(self.counter["class_counter"], class_uri, self.type_property)
+                        self.create_metric_info_class(metric_name, class_uri=str(class_uri), classes=None)
+                    else:
+                        self.add_disabled_metric_info(self.dq_results_intrinsic, metric_name)
+
+            if len(vocab_profile['disjoint_classes']) > 0 and not self.is_metric_enabled("EntitiesDisjointClasses"):
+                self.add_disabled_metric_info(self.dq_results_intrinsic, "EntitiesDisjointClasses")
+            elif len(vocab_profile['disjoint_classes']) > 0:
                 for classes in vocab_profile['disjoint_classes']:
                     if classes[0] in classes_in_dataset:
                         shacl_shapes += self.template.module.consistency_entities_disjoint_classes(self.counter["class_counter"], classes[0], classes[1]) + '\n'
@@ -392,7 +487,9 @@ class SHACLShapeBuilder:
                         self.counter['count_functional_props'] += 1
                         shacl_shapes += self.functional_properties(prop)
 
-            if len(vocab_profile['deprecated_classes']) > 0:
+            if len(vocab_profile['deprecated_classes']) > 0 and not self.is_metric_enabled("DeprecatedClasses"):
+                self.add_disabled_metric_info(self.dq_results_intrinsic, "DeprecatedClasses")
+            elif len(vocab_profile['deprecated_classes']) > 0:
                 classes_list = " ".join([f"<{v}>" for v in vocab_profile['deprecated_classes']])
                 shacl_shapes += self.template.module.consistency_deprecated_classes(classes_list, self.type_property) + '\n'
                 
@@ -516,11 +613,10 @@ class SHACLShapeBuilder:
         graph_profile['count_deprecated_properties'] = self.counter['count_deprecated_properties']
         
         # Update profile with new information from vocabularies
-        with open(f'{PROFILE_DATASETS_FOLDER_PATH}/{self.dataset_name}.json', 'w', encoding='utf-8') as f:
-            json.dump(graph_profile, f, indent=4)
+        write_json(f'{PROFILE_DATASETS_FOLDER_PATH}/{self.dataset_name}.json', graph_profile, compact=self.results_format == 'ndjson')
 
         # Save the DQ "initial" results for the shapes that need instantiation from vocabularies
-        file_path = DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH
+        file_path = DQ_MEASURES_DATA_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name)
         if os.path.exists(file_path):
             with open(file_path, 'r', encoding='utf-8') as f:
                 try:
@@ -543,8 +639,10 @@ class SHACLShapeBuilder:
         shacl_shapes = ''
         template = dq_assessment.vocabs_template
 
-        shacl_shapes += template.module.understandability_label_classes(self.labeling_property) + '\n'
-        shacl_shapes += template.module.understandability_label_properties(self.labeling_property)
+        if self.is_metric_enabled("LabelForClasses"):
+            shacl_shapes += template.module.understandability_label_classes(self.labeling_property) + '\n'
+        if self.is_metric_enabled("LabelForProperties"):
+            shacl_shapes += template.module.understandability_label_properties(self.labeling_property)
 
         vocab_name = dq_assessment.config[vocab]["vocab_name"]
         
@@ -553,7 +651,9 @@ class SHACLShapeBuilder:
         counter_class = 0
         counter_property = 0
 
-        if vocab_name in class_vocab_map:
+        if vocab_name in class_vocab_map and not self.is_metric_enabled("UndefinedClass"):
+            self.add_disabled_metric_info(dq_results, "UndefinedClass", DQ_MEASURES_VOCABULARY_SPECIFIC)
+        elif vocab_name in class_vocab_map:
             classes_vocab = class_vocab_map[vocab_name]
             for class_ in classes_vocab:
                 shacl_shapes += template.module.versatility_undefined_class(counter_class, class_, self.type_property)
@@ -564,7 +664,9 @@ class SHACLShapeBuilder:
 
                 counter_class += 1
     
-        if vocab_name in property_vocab_map:
+        if vocab_name in property_vocab_map and not self.is_metric_enabled("UndefinedProperty"):
+            self.add_disabled_metric_info(dq_results, "UndefinedProperty", DQ_MEASURES_VOCABULARY_SPECIFIC)
+        elif vocab_name in property_vocab_map:
             properties_vocab = property_vocab_map[vocab_name]
             for prop_ in properties_vocab:
                 shacl_shapes += template.module.versatility_undefined_property(counter_property, prop_, self.type_property)
@@ -577,7 +679,7 @@ class SHACLShapeBuilder:
                 counter_property += 1
         
         # Store specific results
-        file_path = DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH
+        file_path = DQ_MEASURES_VOCABULARIES_SPECIFIC_TEMPLATE_FILE_PATH.format(dataset_name=self.dataset_name)
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(dq_results, f, indent=4)
 
@@ -0,0 +1,150 @@
+import time
+import logging
+from collections import Counter
+
+from rdflib import URIRef, BNode, SH
+from pyshacl import Validator
+
+from const import SCHEDULER_CHECKPOINT_INTERVAL
+from run_profiler import RunProfiler, get_shape_metric
+from utils import validate_shape
+
+logging.basicConfig(level=logging.INFO)
+
+
+def count_values(graph_profile, path):
+    """
+    Average number of values per subject of a property (1 for complex paths)
+    """
+    if not isinstance(path, URIRef):
+        return 1
+    path = str(path)
+    subjects = graph_profile.get('subjects_per_property', {}).get(path, 0)
+    return graph_profile.get('triples_per_property', {}).get(path, 0) / subjects if subjects else 0
+
+def estimate_focus_nodes(shapes_graph, shape_node, graph_profile):
+    """
+    Number of focus nodes of a shape according to the counters of the profile
+    """
+    num_focus_nodes = 0
+    for target_class in shapes_graph.objects(shape_node, SH.targetClass):
+        num_focus_nodes += graph_profile.get('entities_per_class', {}).get(str(target_class), 0)
+    for target_property in shapes_graph.objects(shape_node, SH.targetSubjectsOf):
+        num_focus_nodes += graph_profile.get('subjects_per_property', {}).get(str(target_property), 0)
+    for target_property in shapes_graph.objects(shape_node, SH.targetObjectsOf):
+        num_focus_nodes += graph_profile.get('triples_per_property', {}).get(str(target_property), 0)
+    num_focus_nodes += len(list(shapes_graph.objects(shape_node, SH.targetNode)))
+    return num_focus_nodes
+
+def estimate_shape_cost(shapes_graph, shape_node, graph_profile):
+    """
+    Estimated work to validate a shape: focus nodes x (1 + values of the paths of its property shapes,
+    including the ones nested in sh:or, sh:and, sh:not... which are blank nodes of the shape)
+    """
+    values_per_focus_node = 1
+    pending = [shape_node]
+    visited = set()
+    while pending:
+        node = pending.pop()
+        if node in visited:
+            continue
+        visited.add(node)
+        path = shapes_graph.value(node, SH.path)
+        if path is not None:
+            values_per_focus_node += count_values(graph_profile, path)
+        for _, _, value in shapes_graph.triples((node, None, None)):
+            if isinstance(value, BNode):
+                pending.append(value)
+    return estimate_focus_nodes(shapes_graph, shape_node, graph_profile) * values_per_focus_node
+
+
+class ShapeScheduler:
+    """
+        Validation engine (same interface as the VALIDATION_ENGINES) that validates the shapes one at a time,
+        cheapest and most valuable first, until a deadline.
+        The cost of a shape is estimated from the counters of the graph profile. A metric instantiated in
+        many shapes (e.g. one FunctionalProperty shape per property) is spread over them, so each of its
+        shapes is worth less than a shape that computes a whole metric (e.g. LabelForEntities).
+        Shapes whose estimated time (from the time per unit of cost measured so far) doesn't fit in the
+        remaining time are skipped. Every checkpoint_interval seconds, on_checkpoint is called with the
+        report of the shapes validated so far and the shapes that are still pending.
+    """
+    def __init__(self, graph_profile, deadline=None, on_checkpoint=None, checkpoint_interval=SCHEDULER_CHECKPOINT_INTERVAL):
+        self.graph_profile = graph_profile or {}
+        # time.perf_counter() value
+        self.deadline = deadline
+        self.on_checkpoint = on_checkpoint
+        self.checkpoint_interval = checkpoint_interval
+
+        self.validated_shapes = []
+        self.skipped_shapes = []
+
+    def schedule(self, shapes, shapes_graph):
+        """
+        Shapes sorted by estimated cost / value
+        """
+        named_shapes = [shape for shape in shapes if isinstance(shape.node, URIRef)]
+        shapes_per_metric = Counter(get_shape_metric(shape.node) for shape in named_shapes)
+        costs = {shape.node: estimate_shape_cost(shapes_graph, shape.node, self.graph_profile) for shape in named_shapes}
+        return sorted(named_shapes, key=lambda shape: (costs[shape.node] * shapes_per_metric[get_shape_metric(shape.node)], str(shape.node))), costs
+
+    def __call__(self, data_graph, shapes_graph, profiler=None, stage=None):
+        if profiler is None:
+            profiler = RunProfiler()
+
+        validator = Validator(data_graph, shacl_graph=shapes_graph, options={'inference': 'none'})
+        executor = validator.make_executor()
+        # Property shapes (blank nodes) are validated through their node shapes
+        shapes, costs = self.schedule(validator.shacl_graph.shapes, validator.shacl_graph.graph)
+
+        conforms = True
+        reports = []
+        shape_stats = []
+        elapsed_time_total, cost_total = 0, 0
+        last_checkpoint = time.perf_counter()
+        for position, shape in enumerate(shapes):
+            now = time.perf_counter()
+            if self.deadline is not None:
+                # Time per unit of cost measured on the shapes validated so far
+                estimated_time = costs[shape.node] * elapsed_time_total / cost_total if cost_total else 0
+                if now + estimated_time > self.deadline:
+                    self.skipped_shapes.append(str(shape.node))
+                    continue
+
+            if self.on_checkpoint is not None and now - last_checkpoint >= self.checkpoint_interval:
+                pending_shapes = self.skipped_shapes + [str(pending.node) for pending in shapes[position:]]
+                report_graph, _ = Validator.create_validation_report(validator.shacl_graph, conforms, reports)
+                self.on_checkpoint(report_graph, pending_shapes)
+                last_checkpoint = time.perf_counter()
+
+            initial_time = time.perf_counter()
+            shape_conforms, shape_reports, num_focus_nodes = validate_shape(shape, executor, data_graph)
+            elapsed_time = time.perf_counter() - initial_time
+
+            conforms = conforms and shape_conforms
+            reports.extend(shape_reports)
+            self.validated_shapes.append(str(shape.node))
+            elapsed_time_total += elapsed_time
+            cost_total += costs[shape.node]
+            shape_stats.append({
+                "shape": str(shape.node),
+                "metric": get_shape_metric(shape.node),
+                "elapsed_time": elapsed_time,
+                "estimated_cost": costs[shape.node],
+                "num_focus_nodes": num_focus_nodes,
+                "num_violations": len(shape_reports)
+            })
+
+        if self.skipped_shapes:
+            logging.info(f"Time budget exceeded: {len(self.skipped_shapes)} of {len(shapes)} shapes weren't validated")
+
+        with profiler.phase(stage, 'report_graph'):
+            report_graph, validation_report = Validator.create_validation_report(validator.shacl_graph, conforms, reports)
+
+        return conforms, report_graph, validation_report, shape_stats
+
+    def to_dict(self):
+        return {
+            "validated_shapes": len(self.validated_shapes),
+            "skipped_shapes": [shape.removeprefix("https://www.example.org/") for shape in self.skipped_shapes]
+        }
@@ -0,0 +1,455 @@
+import os
+import json
+import random
+import logging
+import argparse
+import configparser
+
+from rdflib import Graph, RDF, RDFS, OWL, XSD, URIRef, BNode, Literal
+
+from const import *
+from utils import get_vocab_namespace
+
+logging.basicConfig(level=logging.INFO)
+
+# Metric families that can be injected in the synthetic data
+VIOLATION_FAMILIES = (
+    "LabelForEntities",
+    "DifferentLanguagesLabelsEntities",
+    "DifferentLanguagesDescriptionsEntities",
+    "UsageHashURIsEntities",
+    "URIsLengthEntities",
+    "URIsParametersEntities",
+    "URISpaceComplianceEntities",
+    "BlankNodesUsageEntities",
+    "UsageExternalURIEntities",
+    "ProlixFeatures",
+    "FunctionalProperty",
+    "EntitiesDisjointClasses",
+    "CorrectDomain",
+    "CorrectRange",
+    "MalformedLiteral",
+    "MisplacedClasses",
+    "MisplacedProperties",
+)
+
+# Valid & malformed lexical forms of the datatypes the generator can produce
+DATATYPE_VALUES = {
+    str(XSD.string): (lambda rng: f"value {rng.randrange(10**6)}", None),
+    str(XSD.integer): (lambda rng: str(rng.randrange(-10**6, 10**6)), "not-an-integer"),
+    str(XSD.int): (lambda rng: str(rng.randrange(-10**6, 10**6)), "not-an-int"),
+    str(XSD.nonNegativeInteger): (lambda rng: str(rng.randrange(10**6)), "-1"),
+    str(XSD.decimal): (lambda rng: f"{rng.uniform(0, 1000):.2f}", "1,5"),
+    str(XSD.float): (lambda rng: f"{rng.uniform(0, 1000):.3f}", "one point five"),
+    str(XSD.double): (lambda rng: f"{rng.uniform(0, 1000):.3f}", "one point five"),
+    str(XSD.boolean): (lambda rng: rng.choice(("true", "false")), "yes"),
+    str(XSD.date): (lambda rng: f"{rng.randrange(1900, 2025)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}", "2025-34-25"),
+    str(XSD.dateTime): (lambda rng: f"{rng.randrange(1900, 2025)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}T12:00:00", "2025-01-01 25:00"),
+    str(XSD.gYear): (lambda rng: str(rng.randrange(1900, 2025)), "year 2000"),
+    str(RDFS.Literal): (lambda rng: f"value {rng.randrange(10**6)}", None),
+}
+
+PROLIX_CLASSES = (RDF.Statement, RDF.Bag, RDF.Seq, RDF.Alt, RDF.List)
+
+# Ranges that accept any resource
+ANY_RESOURCE = {str(RDFS.Resource), str(OWL.Thing)}
+
+SYNTHETIC_BASE_NAMESPACE = "http://example.org/synthetic/"
+EXTERNAL_NAMESPACE = "http://external.example.com/resource/"
+
+
+def parse_scale(scale):
+    """
+    Number of triples of a scale given as 10K, 2.5M, 100M or 50000
+    """
+    scale = str(scale).strip().upper()
+    multipliers = {"K": 10**3, "M": 10**6, "B": 10**9}
+    if scale[-1] in multipliers:
+        return int(float(scale[:-1]) * multipliers[scale[-1]])
+    return int(scale)
+
+def get_synthetic_dataset_name(scale):
+    return f"synthetic_{str(scale).strip().lower()}"
+
+def parse_violation_rates(default_rate, rates):
+    """
+    Violation rate per metric family. rates is a list of Family=rate overrides
+    """
+    violation_rates = {family: default_rate for family in VIOLATION_FAMILIES}
+    for rate in rates or []:
+        family, _, value = rate.partition("=")
+        family = family.strip()
+        if family not in violation_rates:
+            raise ValueError(f"Unknown metric family '{family}', use one of: {', '.join(VIOLATION_FAMILIES)}")
+        value = float(value)
+        if not 0 <= value <= 1:
+            raise ValueError(f"Violation rate of {family} should be between 0 and 1")
+        violation_rates[family] = value
+    return violation_rates
+
+
+def extract_vocabulary(vocab_file_path, vocab_format="xml"):
+    """
+    Extracts the classes, properties (with domain & range), functional properties
+    and disjoint classes of a vocabulary, used to generate the synthetic entities.
+    """
+    g = Graph()
+    g.parse(vocab_file_path, format=vocab_format)
+    vocab_ns = get_vocab_namespace(g)
+
+    deprecated = set(g.subjects(OWL.deprecated, Literal(True)))
+    deprecated |= set(g.subjects(RDF.type, OWL.DeprecatedClass))
+    deprecated |= set(g.subjects(RDF.type, OWL.DeprecatedProperty))
+
+    def in_vocab(s):
+        return isinstance(s, URIRef) and vocab_ns and str(s).startswith(vocab_ns) and s not in deprecated
+
+    classes = set()
+    for class_type in (OWL.Class, RDFS.Class):
+        classes |= {str(s) for s in g.subjects(RDF.type, class_type) if in_vocab(s)}
+
+    properties = {}
+    for property_type in (OWL.ObjectProperty, OWL.DatatypeProperty, RDF.Property):
+        for s in g.subjects(RDF.type, property_type):
+            if not in_vocab(s) or str(s) in properties:
+                continue
+            domain = g.value(s, RDFS.domain)
+            range_ = g.value(s, RDFS.range)
+            properties[str(s)] = {
+                # Domains & ranges that are blank nodes (e.g. owl:unionOf) can't be used to generate data
+                "domain": str(domain) if isinstance(domain, URIRef) else (None if domain is None else "complex"),
+                "range": str(range_) if isinstance(range_, URIRef) else (None if range_ is None else "complex"),
+                "object": property_type == OWL.ObjectProperty
+            }
+
+    functional = {str(s) for s in g.subjects(RDF.type, OWL.FunctionalProperty) if str(s) in properties}
+
+    disjoint_classes = set()
+    for s, _, o in g.triples((None, OWL.disjointWith, None)):
+        if str(s) in classes and str(o) in classes and s != o:
+            disjoint_classes.add(tuple(sorted((str(s), str(o)))))
+
+    return {
+        "namespace": vocab_ns,
+        "classes": sorted(classes),
+        "properties": properties,
+        "functional": sorted(functional),
+        "disjoint_classes": sorted(disjoint_classes)
+    }
+
+
+class SyntheticDatasetGenerator:
+    """
+        Streams a synthetic N-Triples dataset built from the classes & properties of the given
+        vocabularies, injecting violations of each metric family at a configurable rate.
+        Entities are generated one at a time and written straight to disk, so the memory
+        doesn't grow with the number of triples.
+    """
+    def __init__(self, vocab_names, violation_rates, seed=42, uris_max_length=80, interlinking_ratio=0.5):
+        self.vocab_names = vocab_names
+        self.violation_rates = violation_rates
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.uris_max_length = uris_max_length
+        self.interlinking_ratio = interlinking_ratio
+        # Number of violations injected per metric family
+        self.injected_violations = {family: 0 for family in VIOLATION_FAMILIES}
+        self.num_triples = 0
+        self.num_entities = 0
+
+        self._load_vocabularies()
+
+    def _load_vocabularies(self):
+        self.classes = []
+        self.properties = {}
+        self.functional = []
+        self.disjoint_classes = []
+        for vocab_name in self.vocab_names:
+            vocab = extract_vocabulary(f'{VOCABULARIES_FOLDER_PATH}/{vocab_name}.rdf')
+            self.classes.extend(c for c in vocab["classes"] if c not in self.classes)
+            self.properties.update(vocab["properties"])
+            self.functional.extend(vocab["functional"])
+            self.disjoint_classes.extend(vocab["disjoint_classes"])
+
+        if not self.classes:
+            raise ValueError(f"The vocabularies {', '.join(self.vocab_names)} don't define any class")
+
+        class_set = set(self.classes)
+        self.class_index = {c: i for i, c in enumerate(self.classes)}
+
+        # Properties that can be used for each class without violating its domain
+        self.class_properties = {c: [] for c in self.classes}
+        # Properties whose values can be generated, by kind of value
+        self.datatype_properties = []
+        self.object_properties = []
+        for p, info in self.properties.items():
+            range_ = info["range"]
+            if range_ in DATATYPE_VALUES:
+                info["kind"] = "datatype"
+                self.datatype_properties.append(p)
+            elif range_ is None or range_ in ANY_RESOURCE or range_ in class_set:
+                info["kind"] = "object" if info["object"] or range_ is not None else "literal"
+                if info["kind"] == "object":
+                    self.object_properties.append(p)
+            else:
+                # Ranges that aren't defined in the vocabularies can't be satisfied
+                continue
+
+            domain = info["domain"]
+            if domain is None or domain in ANY_RESOURCE:
+                for c in self.classes:
+                    self.class_properties[c].append(p)
+            elif domain in class_set:
+                self.class_properties[domain].append(p)
+
+        self.usable_properties = [p for p in self.properties if "kind" in self.properties[p]]
+        self.functional = [p for p in self.functional if p in self.usable_properties]
+        self.domain_properties = [p for p in self.usable_properties if self.properties[p]["domain"] in class_set]
+        self.typed_datatype_properties = [p for p in self.datatype_properties if DATATYPE_VALUES[self.properties[p]["range"]][1] is not None]
+
+        for family, properties in (("FunctionalProperty", self.functional),
+                                   ("EntitiesDisjointClasses", self.disjoint_classes),
+                                   ("CorrectDomain", self.domain_properties),
+                                   ("MalformedLiteral", self.typed_datatype_properties)):
+            if not properties and self.violation_rates.get(family):
+                logging.warning(f"The vocabularies don't allow to inject {family} violations, the rate is ignored")
+                self.violation_rates[family] = 0
+
+    def _inject(self, family):
+        if self.rng.random() < self.violation_rates.get(family, 0):
+            self.injected_violations[family] += 1
+            return True
+        return False
+
+    def _entity_uri(self, i):
+        return f"{SYNTHETIC_BASE_NAMESPACE}{self.classes[i % len(self.classes)].rsplit('/', 1)[-1].rsplit('#', 1)[-1].lower()}/{i}"
+
+    def _related_entity(self, i, range_):
+        """
+        IRI of an entity generated before i that is an instance of range_
+        (entity i is an instance of the class i % number of classes)
+        """
+        num_classes = len(self.classes)
+        if range_ is None or range_ in ANY_RESOURCE:
+            return self._entity_uri(self.rng.randrange(i)) if i else None
+        if i < num_classes:
+            return None
+        k = self.rng.randrange(i // num_classes)
+        return self._entity_uri(k * num_classes + self.class_index[range_])
+
+    def _property_value(self, i, p, malformed=False):
+        info = self.properties[p]
+        if info["kind"] == "datatype":
+            valid, invalid = DATATYPE_VALUES[info["range"]]
+            lexical = invalid if malformed else valid(self.rng)
+            if info["range"] == str(RDFS.Literal):
+                return Literal(lexical)
+            return Literal(lexical, datatype=URIRef(info["range"]))
+        if info["kind"] == "literal":
+            return Literal(f"value {self.rng.randrange(10**6)}")
+        related_entity = self._related_entity(i, info["range"])
+        return URIRef(related_entity) if related_entity else None
+
+    def _entity_triples(self, i):
+        c = self.classes[i % len(self.classes)]
+        uri = self._entity_uri(i)
+
+        # Entity identifier
+        if self._inject("BlankNodesUsageEntities"):
+            entity = BNode(f"e{i}")
+        else:
+            if self._inject("UsageHashURIsEntities"):
+                uri = f"{uri}#this"
+            if self._inject("URIsParametersEntities"):
+                uri = f"{uri}?id={i}"
+            if self._inject("URIsLengthEntities"):
+                uri = f"{uri}/{'x' * self.uris_max_length}"
+            if self._inject("URISpaceComplianceEntities"):
+                uri = uri.replace(SYNTHETIC_BASE_NAMESPACE, "http://other.example.org/")
+            entity = URIRef(uri)
+
+        triples = [(entity, RDF.type, URIRef(c))]
+        if self._inject("EntitiesDisjointClasses"):
+            c1, c2 = self.rng.choice(self.disjoint_classes)
+            triples.append((entity, RDF.type, URIRef(c2 if c == c1 else c1)))
+        if self._inject("ProlixFeatures"):
+            triples.append((entity, RDF.type, self.rng.choice(PROLIX_CLASSES)))
+        if self._inject("MisplacedProperties"):
+            triples.append((entity, RDF.type, URIRef(self.rng.choice(self.usable_properties))))
+        if self._inject("MisplacedClasses"):
+            triples.append((entity, URIRef(self.rng.choice(self.classes)), Literal(f"value {i}")))
+
+        # Label & description
+        label_name = c.rsplit('/', 1)[-1].rsplit('#', 1)[-1]
+        if not self._inject("LabelForEntities"):
+            language = None if self._inject("DifferentLanguagesLabelsEntities") else "en"
+            triples.append((entity, RDFS.label, Literal(f"{label_name} {i}", lang=language)))
+        language = None if self._inject("DifferentLanguagesDescriptionsEntities") else "en"
+        triples.append((entity, RDFS.comment, Literal(f"Synthetic instance {i} of {label_name}", lang=language)))
+
+        # Interlinking
+        if self._inject("UsageExternalURIEntities"):
+            triples.append((entity, OWL.sameAs, URIRef(f"{SYNTHETIC_BASE_NAMESPACE}resource/{i}")))
+        elif self.rng.random() < self.interlinking_ratio:
+            triples.append((entity, OWL.sameAs, URIRef(f"{EXTERNAL_NAMESPACE}{i}")))
+
+        # Properties of the class
+        class_properties = self.class_properties[c]
+        if class_properties:
+            for p in self.rng.sample(class_properties, min(len(class_properties), self.rng.randint(1, 3))):
+                value = self._property_value(i, p)
+                if value is not None:
+                    triples.append((entity, URIRef(p), value))
+
+        # Violations of the vocabularies' axioms
+        if self._inject("FunctionalProperty"):
+            # Functional properties whose domain is the class of the entity are preferred
+            candidates = [p for p in self.functional if p in class_properties] or self.functional
+            p = self.rng.choice(candidates)
+            values = [self._property_value(i, p), self._property_value(i, p)]
+            if None not in values and values[0] != values[1]:
+                triples.extend((entity, URIRef(p), value) for value in values)
+            else:
+                self.injected_violations["FunctionalProperty"] -= 1
+        if self._inject("CorrectDomain"):
+            candidates = [p for p in self.domain_properties if self.properties[p]["domain"] != c]
+            p = self.rng.choice(candidates) if candidates else None
+            value = self._property_value(i, p) if p else None
+            if value is not None:
+                triples.append((entity, URIRef(p), value))
+            else:
+                self.injected_violations["CorrectDomain"] -= 1
+        if self._inject("CorrectRange"):
+            p = self.rng.choice(self.datatype_properties + self.object_properties)
+            if self.properties[p]["kind"] == "datatype":
+                value = URIRef(f"{EXTERNAL_NAMESPACE}{i}")
+            else:
+                value = Literal(f"value {i}")
+            triples.append((entity, URIRef(p), value))
+        if self._inject("MalformedLiteral"):
+            p = self.rng.choice(self.typed_datatype_properties)
+            triples.append((entity, URIRef(p), self._property_value(i, p, malformed=True)))
+
+        return triples
+
+    def generate(self, output_path, num_triples):
+        """
+        Writes entities to output_path (N-Triples) until num_triples are reached
+        """
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            while self.num_triples < num_triples:
+                triples = self._entity_triples(self.num_entities)
+                f.writelines(f"{s.n3()} {p.n3()} {o.n3()} .\n" for s, p, o in triples)
+                self.num_triples += len(triples)
+                self.num_entities += 1
+
+        logging.info(f"Generated {self.num_triples} triples ({self.num_entities} entities) in {output_path}")
+
+    def write_metadata(self, output_path, dataset_name):
+        """
+        VoID description of the synthetic dataset
+        """
+        g = Graph()
+        dataset = URIRef(f"{SYNTHETIC_BASE_NAMESPACE}{dataset_name}")
+        VOID = "http://rdfs.org/ns/void#"
+        DCTERMS = "http://purl.org/dc/terms/"
+        g.add((dataset, RDF.type, URIRef(f"{VOID}Dataset")))
+        g.add((dataset, URIRef(f"{DCTERMS}title"), Literal(f"Synthetic dataset {dataset_name}")))
+        g.add((dataset, URIRef(f"{DCTERMS}description"), Literal(f"Synthetic dataset generated from the vocabularies {', '.join(self.vocab_names)} (seed {self.seed}).")))
+        g.add((dataset, URIRef(f"{DCTERMS}creator"), Literal("synthetic_dataset.py")))
+        g.add((dataset, URIRef(f"{DCTERMS}license"), URIRef("http://creativecommons.org/licenses/by/4.0/")))
+        g.add((dataset, URIRef("http://xmlns.com/foaf/0.1/homepage"), URIRef(SYNTHETIC_BASE_NAMESPACE)))
+        g.add((dataset, URIRef(f"{VOID}feature"), URIRef("http://www.w3.org/ns/formats/N-Triples")))
+        g.add((dataset, URIRef(f"{VOID}triples"), Literal(self.num_triples)))
+        g.add((dataset, URIRef(f"{VOID}entities"), Literal(self.num_entities)))
+        g.add((dataset, URIRef(f"{VOID}exampleResource"), URIRef(self._entity_uri(0))))
+        g.add((dataset, URIRef(f"{VOID}uriSpace"), Literal(SYNTHETIC_BASE_NAMESPACE)))
+        g.add((dataset, URIRef(f"{VOID}uriRegexPattern"), Literal(f"^{SYNTHETIC_BASE_NAMESPACE.replace('.', '[.]')}")))
+        for vocab in sorted({p.rsplit('#', 1)[0] if '#' in p else p.rsplit('/', 1)[0] + '/' for p in self.classes}):
+            g.add((dataset, URIRef(f"{VOID}vocabulary"), URIRef(vocab)))
+        g.serialize(output_path, format="turtle")
+
+
+def write_config(config_path, dataset_name, graph_file_path, metadata_file_path, vocab_names, uris_max_length):
+    config = configparser.ConfigParser()
+    config["settings"] = {
+        "dataset_name": dataset_name,
+        "graph_file": graph_file_path,
+        "graph_file_format": "nt",
+        "metadata_file": metadata_file_path,
+        "metadata_file_format": "ttl",
+        "base_namespace": SYNTHETIC_BASE_NAMESPACE,
+        "metadata_class": "http://rdfs.org/ns/void#Dataset",
+        "type_property": str(RDF.type),
+        "labeling_property": str(RDFS.label),
+        "description_property": str(RDFS.comment),
+        "interlinking_property": str(OWL.sameAs),
+        "uris_max_length": str(uris_max_length),
+        "vocabularies": ", ".join(vocab_names)
+    }
+    for vocab_name in vocab_names:
+        config[vocab_name] = {
+            "vocab_name": vocab_name,
+            "file_path": f"{VOCABULARIES_FOLDER_PATH}/{vocab_name}.rdf",
+            "file_format": "xml"
+        }
+    with open(config_path, "w", encoding="utf-8") as f:
+        config.write(f)
+
+
+def generate_synthetic_dataset(scale, vocab_names=SYNTHETIC_DEFAULT_VOCABULARIES, violation_rates=None, seed=42, uris_max_length=80):
+    """
+    Generates the data, metadata and config file of a synthetic dataset of the given scale
+    (number of triples, e.g. 10K or 100M). Returns the name of the dataset and the generation stats.
+    """
+    dataset_name = get_synthetic_dataset_name(scale)
+    dataset_folder = f'{DATASETS_FOLDER_PATH}/{dataset_name}'
+    graph_file_path = f'{dataset_folder}/data.nt'
+    metadata_file_path = f'{dataset_folder}/void.ttl'
+
+    if violation_rates is None:
+        violation_rates = parse_violation_rates(SYNTHETIC_DEFAULT_VIOLATION_RATE, [])
+
+    generator = SyntheticDatasetGenerator(vocab_names, dict(violation_rates), seed=seed, uris_max_length=uris_max_length)
+    generator.generate(graph_file_path, parse_scale(scale))
+    generator.write_metadata(metadata_file_path, dataset_name)
+    write_config(f'config/{dataset_name}.ini', dataset_name, graph_file_path, metadata_file_path, vocab_names, uris_max_length)
+
+    stats = {
+        "dataset_name": dataset_name,
+        "num_triples": generator.num_triples,
+        "num_entities": generator.num_entities,
+        "vocabularies": list(vocab_names),
+        "seed": seed,
+        "uris_max_length": uris_max_length,
+        "violation_rates": generator.violation_rates,
+        "injected_violations": generator.injected_violations
+    }
+    with open(f'{dataset_folder}/{SYNTHETIC_STATS_FILE_NAME}', "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=4)
+
+    return dataset_name, stats
+
+
+def add_generation_arguments(parser):
+    parser.add_argument("--vocabularies", nargs="+", default=list(SYNTHETIC_DEFAULT_VOCABULARIES),
+                        help=f"Vocabularies of {VOCABULARIES_FOLDER_PATH} used to generate the data (file name without .rdf)")
+    parser.add_argument("--violation-rate", type=float, default=SYNTHETIC_DEFAULT_VIOLATION_RATE,
+                        help="Probability of injecting a violation of each metric family in an entity")
+    parser.add_argument("--rate", action="append", metavar="FAMILY=RATE",
+                        help=f"Violation rate of a metric family, e.g. LabelForEntities=0.2. Families: {', '.join(VIOLATION_FAMILIES)}")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the random generator")
+    parser.add_argument("--uris-max-length", type=int, default=80, help="Max. length of the URIs (uris_max_length in the config)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic RDF dataset from the shipped vocabularies")
+    parser.add_argument("scales", nargs="+", help="Number of triples of each dataset, e.g. 10K 1M 100M")
+    add_generation_arguments(parser)
+    args = parser.parse_args()
+
+    violation_rates = parse_violation_rates(args.violation_rate, args.rate)
+    for scale in args.scales:
+        dataset_name, _ = generate_synthetic_dataset(scale, args.vocabularies, violation_rates, args.seed, args.uris_max_length)
+        logging.info(f"Run the assessment with: python main.py -d {dataset_name} -ra")
@@ -1,4 +1,4 @@
-from pyshacl import validate
+from pyshacl import validate, Validator
 from rdflib import Graph, RDF, RDFS, OWL, Literal, SH, URIRef, Namespace, XSD
 import json
 import re
@@ -8,6 +8,11 @@ import os
 from urllib.parse import quote
 import time
 import logging
+from results_io import write_json
+from input_sources import parse_graph, parse_graph_files, parse_encoded_triples, get_parser_backend
+from hdt_source import is_hdt_graph, compute_hdt_profile, union_graph
+from run_profiler import RunProfiler, get_shape_metric
+from sketches import HyperLogLog
 
 logging.basicConfig(level=logging.INFO)
 
@@ -35,20 +40,18 @@ def get_ns(uri):
     else:
         return uri.rsplit('/', 1)[0] + '/'
 
-def get_uri_regex_pattern(metadata_file, metadata_format):
+def get_uri_regex_pattern(metadata_file, metadata_format, parser_backend='rdflib'):
     VOID = Namespace("http://rdfs.org/ns/void#")
-    g = Graph()
-    g.parse(metadata_file, format=metadata_format)
+    g = parse_graph(metadata_file, metadata_format, parser_backend=parser_backend)
     for dataset in g.subjects(predicate=None, object=VOID.Dataset):
         pattern = g.value(dataset, VOID.uriRegexPattern)
         if pattern:
             return str(pattern)
     return None
 
-def get_uri_space(metadata_file, metadata_format):
+def get_uri_space(metadata_file, metadata_format, parser_backend='rdflib'):
     VOID = Namespace("http://rdfs.org/ns/void#")
-    g = Graph()
-    g.parse(metadata_file, format=metadata_format)
+    g = parse_graph(metadata_file, metadata_format, parser_backend=parser_backend)
     for dataset in g.subjects(predicate=None, object=VOID.Dataset):
         pattern = g.value(dataset, VOID.uriSpace)
         if pattern:
@@ -63,8 +66,31 @@ def profile_graph(dq_assessment, profile_file_path):
     """
     Calculates and stores statistics needed for calculating DQ measures.
     """
-    graph = Graph()
-    graph.parse(dq_assessment.graph_file_path, format="turtle")
+    with dq_assessment.profiler.phase('profiling', 'parsing'):
+        graph = None
+        if not dq_assessment.exact_counts and dq_assessment.parse_workers > 1:
+            # The sketches only iterate the triples, N-Triples files are profiled without building a graph
+            graph = parse_encoded_triples(dq_assessment.graph_files, dq_assessment.graph_file_format, dq_assessment.parse_workers)
+        if graph is None:
+            graph = parse_graph_files(dq_assessment.graph_files, dq_assessment.graph_file_format, dq_assessment.parse_workers, parser_backend=dq_assessment.parser_backend)
+
+    if is_hdt_graph(graph):
+        # From the HDT dictionary & indexes, without iterating every triple
+        profile = compute_hdt_profile(dq_assessment, graph)
+    else:
+        profile = compute_graph_profile(dq_assessment, graph)
+
+    os.makedirs(PROFILE_DATASETS_FOLDER_PATH, exist_ok=True)
+    write_json(profile_file_path, profile, compact=dq_assessment.results_format == 'ndjson')
+
+    return profile
+
+def compute_graph_profile(dq_assessment, graph):
+    """
+    Statistics of a graph (also used for the sample of the graph in approximate mode)
+    """
+    if not getattr(dq_assessment, 'exact_counts', True):
+        return compute_graph_profile_sketches(dq_assessment, graph)
 
     # number of triples
     num_triples = len(graph)
@@ -128,9 +154,68 @@ def profile_graph(dq_assessment, profile_file_path):
         "properties": properties_list
     }
 
-    os.makedirs(PROFILE_DATASETS_FOLDER_PATH, exist_ok=True)
-    with open(profile_file_path, "w", encoding="utf-8") as f:
-        json.dump(profile, f, indent=4)
+    return profile
+
+
+def compute_graph_profile_sketches(dq_assessment, graph):
+    """
+    Same statistics as compute_graph_profile, but the distinct entities/subjects are estimated with
+    HyperLogLog sketches (one per property and per class) in a single pass over the graph,
+    instead of materializing sets of subjects. The error bounds of the estimates are stored in 'estimates'.
+    """
+    precision = dq_assessment.hll_precision
+    type_property = RDF.type
+    interlinking_property = URIRef(dq_assessment.interlinking_property)
+    labeling_property = URIRef(dq_assessment.labeling_property) if dq_assessment.labeling_property else None
+    description_property = URIRef(dq_assessment.description_property) if dq_assessment.description_property else None
+
+    num_triples = 0
+    triples_per_property = Counter()
+    subjects_per_property = {}
+    entities_per_class = {}
+    entities = HyperLogLog(precision)
+
+    for s, p, o in graph:
+        num_triples += 1
+        triples_per_property[p] += 1
+        if p not in subjects_per_property:
+            subjects_per_property[p] = HyperLogLog(precision)
+        subjects_per_property[p].add(s)
+
+        if p == type_property:
+            entities.add(s)
+            if o not in entities_per_class:
+                entities_per_class[o] = HyperLogLog(precision)
+            entities_per_class[o].add(s)
+
+    def count(sketches, p):
+        return sketches[p].count() if p is not None and p in sketches else 0
+
+    profile = {
+        "num_triples": num_triples,
+        "num_classes": len(entities_per_class),
+        "num_entities": entities.count(),
+        "num_properties": len(subjects_per_property),
+        "subjects_per_property": {str(p): sketch.count() for p, sketch in subjects_per_property.items()},
+        "triples_per_property": {str(p): count for p, count in triples_per_property.items()},
+        "entities_per_class": {str(c): sketch.count() for c, sketch in entities_per_class.items()},
+        "num_entities_with_interlinking": count(subjects_per_property, interlinking_property),
+        "num_entities_label_property": count(subjects_per_property, labeling_property),
+        "num_entities_description_property": count(subjects_per_property, description_property),
+        "classes": [str(c) for c in entities_per_class],
+        "properties": [str(p) for p in subjects_per_property],
+        "estimates": {
+            "method": "hyperloglog",
+            "precision": precision,
+            "relative_standard_error": entities.relative_error,
+            # ~95% bounds of each estimated count
+            "bounds": {
+                "num_entities": entities.bounds(),
+                "subjects_per_property": {str(p): sketch.bounds() for p, sketch in subjects_per_property.items()},
+                "entities_per_class": {str(c): sketch.bounds() for c, sketch in entities_per_class.items()}
+            }
+        }
+    }
 
     return profile
 
@@ -162,8 +247,8 @@ def profile_vocab(dq_assessment, vocab):
     vocab_name = dq_assessment.config[vocab]["vocab_name"]
     vocab_format = dq_assessment.config[vocab]["file_format"]
 
-    g = Graph()
-    g.parse(vocab_file_name, format=vocab_format)
+    with dq_assessment.profiler.phase('profiling', 'parsing'):
+        g = parse_graph(vocab_file_name, vocab_format, parser_backend=dq_assessment.parser_backend)
 
     vocab_ns = get_vocab_namespace(g)
 
@@ -641,8 +726,7 @@ def profile_vocab(dq_assessment, vocab):
     ontology_info['num_other_properties'] = len(ontology_info['other_properties'])
 
     os.makedirs(PROFILE_VOCABULARIES_FOLDER_PATH, exist_ok=True)
-    with open(f'{PROFILE_VOCABULARIES_FOLDER_PATH}/{vocab_name}.json', "w", encoding="utf-8") as f:
-        json.dump(ontology_info, f, indent=4)
+    write_json(f'{PROFILE_VOCABULARIES_FOLDER_PATH}/{vocab_name}.json', ontology_info)
 
     return vocab_ns
 
@@ -674,12 +758,182 @@ def create_shape_graph(shacl_shapes):
 
     return shapes_graph
 
-def validate_shacl_constraints(graph_profile, data_graph_file_path, data_graph_file_format, shapes_graph, vocabs=None, config=None):
+def merge_vocabularies(graph_profile, ont_graphs, vocab_classes):
+    """
+    Merges the vocabularies into a single graph (Tbox). When validating data instances (graph_profile is provided)
+    only the triples that define classes and properties are kept.
+    """
+    # Create new merged graph with only class/property definitions
+    merged_ont = Graph()
+
+    # Types of OWL properties to consider
+    owl_properties = {
+        OWL.ObjectProperty,
+        OWL.DatatypeProperty,
+        OWL.FunctionalProperty,
+        OWL.InverseFunctionalProperty,
+        OWL.IrreflexiveProperty,
+        OWL.ReflexiveProperty,
+        OWL.TransitiveProperty,
+        OWL.AsymmetricProperty,
+        OWL.ReflexiveProperty,
+        OWL.SymmetricProperty,
+        OWL.DeprecatedProperty,
+        OWL.OntologyProperty,
+    }
+
+    if graph_profile: # data instances
+    
+        # Types of OWL classes to consider
+        owl_classes = {
+            OWL.Class,
+            OWL.DeprecatedClass,
+            OWL.Restriction,
+            OWL.AllDisjointClasses,
+            OWL.AllDisjointProperties,
+            OWL.AllDifferent,
+        }
+
+        # Not allowed
+        not_allowed = {
+            OWL.AnnotationProperty,
+            OWL.Ontology,
+        }
+
+        rdf_rdfs_properties = {
+            RDFS.range,
+            RDFS.domain,
+            RDF.type,
+            RDFS.subClassOf,
+            RDFS.subPropertyOf,
+        }
+
+        # Collect all subjects to exclude (those typed as a 'not_allowed' property)
+        excluded_subjects = set()
+        for g in ont_graphs:
+            for prop in not_allowed:
+                excluded_subjects.update(g.subjects(RDF.type, prop))
+
+        # Add triples skipping excluded subjects
+        for g in ont_graphs:
+            for s, p, o in g:
+                if s not in excluded_subjects:
+                    # I just want triples related to the defintion of properties, classes
+                    # any extra information (e.g. labels, descriptions, etc) I don't need it for 
+                    # the data validation
+                    if p in rdf_rdfs_properties or p in owl_properties:
+                        merged_ont.add((s, p, o))
+                        if p == RDF.type:
+                            if o in owl_properties:
+                                merged_ont.add((s, RDF.type, RDF.Property))
+                            if o in owl_classes or o == RDFS.Datatype:
+                                merged_ont.add((s, RDF.type, RDFS.Class))
+                            # if the vocabulary defines instances we type them as NamedIndividual
+                            if str(o) in vocab_classes:
+                                merged_ont.add((s, RDF.type, OWL.NamedIndividual))
+                        if str(p) == RDFS.subClassOf:
+                            merged_ont.add((s, RDF.type, RDFS.Class))
+    
+    else: # vocabularies
+        owl_classes = {
+            OWL.Class,
+            OWL.DeprecatedClass,
+        }
+
+        for g in ont_graphs:
+            for s, p, o in g:
+                merged_ont.add((s, p, o))
+                
+                if p == RDF.type:
+                    if o in owl_properties:
+                        merged_ont.add((s, RDF.type, RDF.Property))
+                    elif o in owl_classes:
+                        merged_ont.add((s, RDF.type, RDFS.Class))
+
+    return merged_ont
+
+def validate_shape(shape, executor, data_graph):
     """
-    Validates a data graph against a shapes graph
-    If ont_files are provided, the ontologies are incorporated to the data graph. In this case, we also generate triples
+    Validates a shape of a pyshacl Validator, returns (conforms, reports, number of focus nodes).
+    The focus nodes are selected once and passed to pyshacl, which would otherwise select them again.
+    """
+    focus_nodes = shape.focus_nodes(data_graph)
+    if not focus_nodes:
+        return True, [], 0
+    shape_conforms, shape_reports = shape.validate(executor, data_graph, focus=focus_nodes)
+    return shape_conforms, shape_reports, len(focus_nodes)
+
+def validate_per_shape(data_graph, shapes_graph, profiler=None, stage=None):
+    """
+    Validates a data graph against a shapes graph one shape at a time, recording for each
+    (named) shape its wall time, number of focus nodes and number of violations.
+    Produces the same validation report as pyshacl's validate (without inference).
+    """
+    if profiler is None:
+        profiler = RunProfiler()
+
+    validator = Validator(data_graph, shacl_graph=shapes_graph, options={'inference': 'none'})
+    executor = validator.make_executor()
+
+    conforms = True
+    reports = []
+    shape_stats = []
+    for shape in validator.shacl_graph.shapes:
+        initial_time = time.perf_counter()
+        shape_conforms, shape_reports, num_focus_nodes = validate_shape(shape, executor, data_graph)
+        elapsed_time = time.perf_counter() - initial_time
+
+        conforms = conforms and shape_conforms
+        reports.extend(shape_reports)
+
+        # Property shapes (blank nodes) are validated through their node shapes
+        if isinstance(shape.node, URIRef):
+            shape_stats.append({
+                "shape": str(shape.node),
+                "metric": get_shape_metric(shape.node),
+                "elapsed_time": elapsed_time,
+                "num_focus_nodes": num_focus_nodes,
+                "num_violations": len(shape_reports)
+            })
+
+    with profiler.phase(stage, 'report_graph'):
+        report_graph, validation_report = Validator.create_validation_report(validator.shacl_graph, conforms, reports)
+
+    return conforms, report_graph, validation_report, shape_stats
+
+def validate_pyshacl(data_graph, shapes_graph, profiler=None, stage=None):
+    """
+    Validates a data graph against a shapes graph with pyshacl's validate (reference engine)
+    """
+    conforms, report_graph, validation_report = validate(
+        data_graph=data_graph,
+        shacl_graph=shapes_graph,
+        debug=False,
+        inference=None,
+        ont_graph=None
+    )
+    return conforms, report_graph, validation_report, []
+
+# Engines that validate a data graph against a shapes graph:
+# name -> function(data_graph, shapes_graph, profiler, stage) -> (conforms, report_graph, report_text, shape_stats)
+# Every engine must produce the same validation results as pyshacl (see differential_check.py)
+VALIDATION_ENGINES = {
+    'pyshacl': validate_pyshacl,
+    'per_shape': validate_per_shape
+}
+
+def load_graph_to_validate(graph_profile, data_graph_file_path, data_graph_file_format, vocabs=None, config=None, profiler=None, stage=None, transform=None):
+    """
+    Parses the graph that will be validated.
+    If vocabs are provided, the ontologies are incorporated to the data graph. In this case, we also generate triples
     of the form <p, rdf:type, rdf:Property> for owl properties and <c, rdf:type, rdfs:Class> for owl classes
+    transform is applied to the data graph before merging the ontologies (e.g. to validate a sample of the data).
+    data_graph_file_path can be a list of files or glob patterns, also compressed (see input_sources.py).
     """
+    if profiler is None:
+        profiler = RunProfiler()
+    parse_workers = config['settings'].getint('parse_workers', fallback=1) if config is not None else 1
+    parser_backend = get_parser_backend(config)
 
     if vocabs:
         initial_time = time.time()
@@ -690,118 +944,62 @@ def validate_shacl_constraints(graph_profile, data_graph_file_path, data_graph_f
             file_path = config[vocab]['file_path']
             file_format = config[vocab]['file_format']
             vocab_name = config[vocab]['vocab_name']
-            ont_graphs.append(Graph().parse(file_path, format=file_format))
+            with profiler.phase(stage, 'parsing'):
+                ont_graphs.append(parse_graph(file_path, file_format, parser_backend=parser_backend))
             
             with open(f'{PROFILE_VOCABULARIES_FOLDER_PATH}/{vocab_name}.json', 'r', encoding='utf-8') as file:
                 data = json.load(file)
                 if 'classes' in data and len(data['classes']) != 0:
                     vocab_classes += data['classes']
 
-        # Create new merged graph with only class/property definitions
-        merged_ont = Graph()
-
-        # Types of OWL properties to consider
-        owl_properties = {
-            OWL.ObjectProperty,
-            OWL.DatatypeProperty,
-            OWL.FunctionalProperty,
-            OWL.InverseFunctionalProperty,
-            OWL.IrreflexiveProperty,
-            OWL.ReflexiveProperty,
-            OWL.TransitiveProperty,
-            OWL.AsymmetricProperty,
-            OWL.ReflexiveProperty,
-            OWL.SymmetricProperty,
-            OWL.DeprecatedProperty,
-            OWL.OntologyProperty,
-        }
-
-        if graph_profile: # data instances
-        
-            # Types of OWL classes to consider
-            owl_classes = {
-                OWL.Class,
-                OWL.DeprecatedClass,
-                OWL.Restriction,
-                OWL.AllDisjointClasses,
-                OWL.AllDisjointProperties,
-                OWL.AllDifferent,
-            }
-
-            # Not allowed
-            not_allowed = {
-                OWL.AnnotationProperty,
-                OWL.Ontology,
-            }
-
-            rdf_rdfs_properties = {
-                RDFS.range,
-                RDFS.domain,
-                RDF.type,
-                RDFS.subClassOf,
-                RDFS.subPropertyOf,
-            }
-
-            # Collect all subjects to exclude (those typed as a 'not_allowed' property)
-            excluded_subjects = set()
-            for g in ont_graphs:
-                for prop in not_allowed:
-                    excluded_subjects.update(g.subjects(RDF.type, prop))
-
-            # Add triples skipping excluded subjects
-            for g in ont_graphs:
-                for s, p, o in g:
-                    if s not in excluded_subjects:
-                        # I just want triples related to the defintion of properties, classes
-                        # any extra information (e.g. labels, descriptions, etc) I don't need it for 
-                        # the data validation
-                        if p in rdf_rdfs_properties or p in owl_properties:
-                            merged_ont.add((s, p, o))
-                            if p == RDF.type:
-                                if o in owl_properties:
-                                    merged_ont.add((s, RDF.type, RDF.Property))
-                                if o in owl_classes or o == RDFS.Datatype:
-                                    merged_ont.add((s, RDF.type, RDFS.Class))
-                                # if the vocabulary defines instances we type them as NamedIndividual
-                                if str(o) in vocab_classes:
-                                    merged_ont.add((s, RDF.type, OWL.NamedIndividual))
-                            if str(p) == RDFS.subClassOf:
-                                merged_ont.add((s, RDF.type, RDFS.Class))
-        
-        else: # vocabularies
-            owl_classes = {
-                OWL.Class,
-                OWL.DeprecatedClass,
-            }
+        with profiler.phase(stage, 'tbox_merge'):
+            merged_ont = merge_vocabularies(graph_profile, ont_graphs, vocab_classes)
 
-            for g in ont_graphs:
-                for s, p, o in g:
-                    merged_ont.add((s, p, o))
-                    
-                    if p == RDF.type:
-                        if o in owl_properties:
-                            merged_ont.add((s, RDF.type, RDF.Property))
-                        elif o in owl_classes:
-                            merged_ont.add((s, RDF.type, RDFS.Class))
+        with profiler.phase(stage, 'parsing'):
+            data_graph = parse_graph_files(data_graph_file_path, data_graph_file_format, parse_workers, parser_backend=parser_backend)
 
-        data_graph = Graph().parse(data_graph_file_path, format=data_graph_file_format)
+        if transform is not None:
+            data_graph = transform(data_graph)
 
         # Merge Abox (data) + Tbox (filtered ontology)
-        graph_to_validate = data_graph + merged_ont
+        with profiler.phase(stage, 'tbox_merge'):
+            if is_hdt_graph(data_graph):
+                # The HDT graph is read-only and isn't loaded in memory, the Tbox is added to a union of both
+                graph_to_validate = union_graph(data_graph, merged_ont)
+            else:
+                graph_to_validate = data_graph + merged_ont
         
         final_time = time.time()
         logging.info(f'Time it took to merge vocabs to data graph: {final_time - initial_time}')
     else:
-        graph_to_validate = Graph().parse(data_graph_file_path, format=data_graph_file_format)
+        with profiler.phase(stage, 'parsing'):
+            graph_to_validate = parse_graph_files(data_graph_file_path, data_graph_file_format, parse_workers, parser_backend=parser_backend)
+
+        if transform is not None:
+            graph_to_validate = transform(graph_to_validate)
+
+    return graph_to_validate
+
+def validate_shacl_constraints(graph_profile, data_graph_file_path, data_graph_file_format, shapes_graph, vocabs=None, config=None, profiler=None, stage=None, engine=None, transform=None):
+    """
+    Validates a data graph against a shapes graph (see load_graph_to_validate for the vocabularies)
+    If the profiler is enabled, shapes are validated one at a time to record per-shape statistics
+    (also when profiling memory, so that the creation of the report graph is measured separately).
+    engine overrides the validation engine (a name of VALIDATION_ENGINES or a function with the same interface, e.g. a ShapeScheduler).
+    """
+    if profiler is None:
+        profiler = RunProfiler()
+
+    graph_to_validate = load_graph_to_validate(graph_profile, data_graph_file_path, data_graph_file_format, vocabs, config, profiler, stage, transform)
+
+    if engine is None:
+        engine = 'per_shape' if profiler.enabled or profiler.memory_profiler is not None else 'pyshacl'
 
     initial_time = time.time()
-    conforms, report_graph, validation_report = validate(
-        data_graph=graph_to_validate,
-        shacl_graph=shapes_graph,
-        debug=False,
-        inference=None,
-        ont_graph=None
-    )
+    with profiler.phase(stage, 'validation'):
+        validate_graph = engine if callable(engine) else VALIDATION_ENGINES[engine]
+        conforms, report_graph, validation_report, shape_stats = validate_graph(graph_to_validate, shapes_graph, profiler, stage)
+        profiler.record_shapes(stage, shape_stats)
     final_time = time.time()
     logging.info(f'Time of validation: {final_time - initial_time}')
 
@@ -871,6 +1069,16 @@ def get_denominator(metric, info, dataset_profile):
             return dataset_profile.get("entities_per_class", {}).get(info['class']['first_class'], 1)
 
 
+def get_vocabulary_denominator(metric, vocab_profile):
+    """
+    Get denominator for the metrics of a vocabulary (classes/properties defined in it and in other vocabularies).
+    """
+    if metric == 'LabelForClasses':
+        return vocab_profile.get("num_all_classes", 1) + vocab_profile.get("num_other_classes", 1)
+    elif metric == 'LabelForProperties':
+        return vocab_profile.get("num_all_properties", 1) + vocab_profile.get("num_other_properties", 1)
+
+
 def safe_uri(uri):
     """Try to fix a bad URI by encoding the invalid characters."""
     try:
@@ -0,0 +1,145 @@
+import os
+import random
+import logging
+from array import array
+
+# pyarrow is only needed when violations_format = parquet, it's imported when the violations are written or read
+pa = None
+pq = None
+
+from const import VIOLATIONS_COLUMNS, VIOLATIONS_ROW_GROUP_SIZE
+from sampling import Reservoir
+
+logging.basicConfig(level=logging.INFO)
+
+
+def check_pyarrow():
+    global pa, pq
+    if pq is not None:
+        return
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow is needed to store the violations in a Parquet file (violations_format = parquet), install it with 'pip install pyarrow'")
+
+
+class ViolationsWriter:
+    """
+        Collects one row per (stage, metric, shape, focus node, value, vocab) of the validation reports
+        and writes them to a Parquet file, instead of inlining the violations in the results CSV.
+        Strings are dictionary encoded while they are collected (each distinct focus node or
+        value is stored once) and in the file. Rows are sorted by metric and shape, so the
+        row group statistics let readers skip the row groups of the other metrics.
+        With a max. number of violations per metric, only the first ones or a reservoir sample are kept.
+    """
+    def __init__(self, get_max_violations=None, sampling='first'):
+        check_pyarrow()
+        # column -> {string: index} and column -> indices of the rows (None is a null)
+        self.dictionaries = {column: {} for column in VIOLATIONS_COLUMNS}
+        self.indices = {column: array('l') for column in VIOLATIONS_COLUMNS}
+
+        # Max. number of rows kept per shape (0 = all), the first ones or a reservoir sample
+        self.get_max_violations = get_max_violations
+        self.sampling = sampling
+        # (stage, vocab, shape) -> reservoir & rows of the shape, the vocabulary shapes have the same names in every vocabulary
+        self.reservoirs = {}
+        self.shape_rows = {}
+
+    def _encode(self, column, value):
+        if value is None:
+            return -1
+        dictionary = self.dictionaries[column]
+        value = str(value)
+        index = dictionary.get(value)
+        if index is None:
+            index = len(dictionary)
+            dictionary[value] = index
+        return index
+
+    def _get_slot(self, stage, shape, vocab):
+        """
+        Row where the violation of the shape must be stored: a new row (-1), a row to replace, or None when it's discarded
+        """
+        max_violations = self.get_max_violations(shape) if self.get_max_violations is not None else 0
+        if not max_violations:
+            return -1
+        key = (stage, vocab, shape)
+        if key not in self.reservoirs:
+            self.reservoirs[key] = Reservoir(max_violations, self.sampling, random.Random(shape))
+            self.shape_rows[key] = []
+        slot = self.reservoirs[key].offer()
+        if slot is None:
+            return None
+        if slot == len(self.shape_rows[key]):
+            self.shape_rows[key].append(len(self))
+            return -1
+        return self.shape_rows[key][slot]
+
+    def add(self, stage, shape, focus_node, value=None, vocab=None):
+        """
+        shape is the key of the metric in the results (e.g. FunctionalProperty_3, same as the shape_name of the CSV)
+        """
+        row_index = self._get_slot(stage, shape, vocab)
+        if row_index is None:
+            return
+        metric = shape.split('_')[0]
+        row = {"stage": stage, "metric": metric, "shape": shape, "focus_node": focus_node, "value": value, "vocab": vocab}
+        for column in VIOLATIONS_COLUMNS:
+            if row_index == -1:
+                self.indices[column].append(self._encode(column, row[column]))
+            else:
+                self.indices[column][row_index] = self._encode(column, row[column])
+
+    def __len__(self):
+        return len(self.indices['shape'])
+
+    def _sorted_positions(self):
+        # Position of each string in its sorted dictionary, so rows are sorted by string and not by first appearance
+        ranks = {}
+        for column in ('metric', 'shape', 'focus_node'):
+            strings = sorted(self.dictionaries[column])
+            rank = {self.dictionaries[column][string]: position for position, string in enumerate(strings)}
+            ranks[column] = rank
+        return sorted(range(len(self)), key=lambda row: (ranks['metric'][self.indices['metric'][row]],
+                                                         ranks['shape'][self.indices['shape'][row]],
+                                                         ranks['focus_node'].get(self.indices['focus_node'][row], -1)))
+
+    def to_table(self):
+        positions = self._sorted_positions()
+        columns = {}
+        for column in VIOLATIONS_COLUMNS:
+            column_indices = [self.indices[column][row] for row in positions]
+            # Only the strings of the rows that were kept (rows of a reservoir can be replaced)
+            strings = list(self.dictionaries[column])
+            used = sorted({index for index in column_indices if index != -1})
+            new_index = {index: position for position, index in enumerate(used)}
+            dictionary = pa.array([strings[index] for index in used], type=pa.string())
+            indices = pa.array([None if index == -1 else new_index[index] for index in column_indices], type=pa.int32())
+            columns[column] = pa.DictionaryArray.from_arrays(indices, dictionary)
+        return pa.table(columns)
+
+    def write(self, file_path):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        pq.write_table(self.to_table(), file_path, compression='zstd', use_dictionary=True,
+                       row_group_size=VIOLATIONS_ROW_GROUP_SIZE)
+        logging.info(f"Saved {len(self)} violations in '{file_path}'")
+
+
+def get_violations_file_path(results_folder, dataset_name):
+    return os.path.join(results_folder, f'dq_assessment_{dataset_name}_violations.parquet')
+
+def load_violations(file_path, metric=None, shape=None, vocab=None, columns=None):
+    """
+    Reads the violations of a Parquet file as a pyarrow table. The filters are pushed down
+    to the reader, only the row groups that can contain the metric/shape are read.
+    """
+    check_pyarrow()
+    filters = []
+    if metric is not None:
+        filters.append(('metric', '=', metric))
+    if shape is not None:
+        filters.append(('shape', '=', shape))
+    if vocab is not None:
+        filters.append(('vocab', '=', vocab))
+    return pq.read_table(file_path, columns=columns, filters=filters or None)
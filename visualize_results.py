@@ -3,8 +3,10 @@ import streamlit as st
 import os
 from const import *
 import pandas as pd
-import plotly.graph_objects as go
 from const import METRIC_COVERAGE, BINARY_METRICS_METADATA
+from violations_store import get_violations_file_path
+from compare_runs import get_changes
+from dashboard_data import load_json, load_results, get_violations, get_violations_page, load_stored_runs, load_run_comparison, get_entities_page, get_mtime
 
 def get_score_color(score):
     try:
@@ -18,7 +20,7 @@ def get_score_color(score):
     else:
         return "red"
 
-def show_dq_assessment_results(df):
+def show_dq_assessment_results(df, csv_path, violations_file_path=None):
 
     dimensions = sorted(df['dimension'].dropna().unique().tolist())
     selected_dimension = st.sidebar.selectbox("Select Dimension", dimensions)
@@ -56,7 +58,7 @@ def show_dq_assessment_results(df):
                 if ((row['shape_name'].removesuffix("Shape") in BINARY_METRICS_METADATA) or (row['shape_name'].startswith('Authenticity'))) and row['score'] < 1 :
                     st.markdown(f"**Message:** {row['message']} ")
 
-                elif 'violations' in row and pd.notna(row['violations']) and str(row['violations']).strip():
+                elif row['num_violations']:
                     if 'violation_text' in row and pd.notna(row['violation_text']):
                         st.markdown(f"**Violations ({row['num_violations']}):** {row['violation_text']}")
                     else:
@@ -65,19 +67,26 @@ def show_dq_assessment_results(df):
                     if pd.notna(row['meta_metric_calculation']):
                         st.markdown(f"*Individual score:* {row['metric_calculation']}")
                     
-                    # Split violations by ';', show only the first 100
-                    violations_list = [v.strip() for v in str(row['violations']).split(';') if v.strip()]
-                    first_100 = violations_list[:100]
+                    # Only one page of violations is rendered
+                    violations_list = get_violations(row, csv_path, violations_file_path)
+                    page = 1
+                    _, num_pages = get_violations_page(violations_list, page)
+                    if num_pages > 1:
+                        page = st.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages, value=1,
+                                               key=f"violations_page_{row['shape_name']}_{row['vocab']}_{idx}")
+                    violations_page, num_pages = get_violations_page(violations_list, page)
                     st.markdown(
                         f"""
                         <div style="max-height: 200px; max-width: 1000px; overflow-y: auto; border: 1px solid #ddd; padding: 8px; background: #f9f9f9; border-radius: 10px;">
-                            <pre style="margin: 0;">{";\n".join(first_100)}</pre>
+                            <pre style="margin: 0;">{";\n".join(violations_page)}</pre>
                         </div>
                         """,
                         unsafe_allow_html=True
                     )
-                    if len(violations_list) > 100:
-                        st.info(f"Showing first 100 of {len(violations_list)} violations.")
+                    if num_pages > 1:
+                        st.info(f"Showing {len(violations_page)} of {len(violations_list)} violations (page {page} of {num_pages}).")
+                    if len(violations_list) < row['num_violations']:
+                        st.caption(f"Only {len(violations_list)} of the {row['num_violations']} violations were kept (max_violations in the config).")
                 
                 st.markdown("**Shape template:**")
                 if pd.notnull(row['shape_template']):
@@ -87,7 +96,7 @@ def show_dq_assessment_results(df):
                 if counter < num_metrics:
                     st.markdown("---")
 
-def show_dq_assessment_statistics(run_info, dataset_name, df):
+def show_dq_assessment_statistics(run_info, dataset_name, df, run_profile=None):
     """ 
         Displays DQA statistics
     """
@@ -171,7 +180,104 @@ def show_dq_assessment_statistics(run_info, dataset_name, df):
     st.markdown("**Data Quality Assessment**")
     st.table(pd.DataFrame([(k, str(v)) for k, v in dq_stats.items()], columns=["Statistic", "Value"]).set_index("Statistic"))
 
+    if run_profile and dataset_name in run_profile:
+        show_run_profile(run_profile[dataset_name])
+
+def show_run_profile(dataset_profile):
+    """
+        Displays the per-phase and per-metric timings recorded with main.py --profile
+    """
+    st.markdown("**Run profile (per phase)**")
+    phases_rows = []
+    for stage, phases in dataset_profile.get('phases', {}).items():
+        for phase, info in phases.items():
+            phases_rows.append({
+                "Stage": stage,
+                "Phase": phase,
+                "Time (s)": round(info['elapsed_time'], 3),
+                "Calls": info['calls'],
+                "RSS at end (MB)": round(info['end_rss'] / 1024**2, 1),
+                "Peak RSS (MB)": round(info['peak_rss'] / 1024**2, 1)
+            })
+    if phases_rows:
+        st.dataframe(pd.DataFrame(phases_rows), use_container_width=True, hide_index=True)
+
+    for stage, metrics in dataset_profile.get('metrics', {}).items():
+        st.markdown(f"**Run profile (per metric, {stage} shapes)**")
+        metrics_rows = [
+            {
+                "Metric": metric,
+                "Shapes": info['num_shapes'],
+                "Time (s)": round(info['elapsed_time'], 3),
+                "Focus nodes": info['num_focus_nodes'],
+                "Violations": info['num_violations']
+            }
+            for metric, info in metrics.items()
+        ]
+        st.dataframe(pd.DataFrame(metrics_rows), use_container_width=True, hide_index=True)
+
+        shapes = dataset_profile.get('shapes', {}).get(stage, [])
+        with st.expander(f"Slowest {stage} shapes"):
+            st.dataframe(pd.DataFrame(shapes[:100]), use_container_width=True, hide_index=True)
+
+def show_run_comparison():
+    """
+        Displays the metrics whose score or violating entities changed between two runs of the results store
+    """
+    st.markdown("## Compare runs")
+    stored_runs = load_stored_runs()
+    datasets = [dataset for dataset, runs in stored_runs.items() if len(runs) > 1]
+    if not datasets:
+        st.info(f"The results store ({RESULTS_STORE_FILE_PATH}) needs two runs of a dataset to compare them.")
+        return
+
+    dataset_name = st.sidebar.selectbox("Select Dataset", datasets)
+    runs = {run['run_id']: run for run in stored_runs[dataset_name]}
+    run_ids = list(runs)
+    format_run = lambda run_id: f"{run_id} ({runs[run_id]['timestamp']})"
+    run_a = st.sidebar.selectbox("Run A", run_ids, index=len(run_ids) - 2, format_func=format_run)
+    run_b = st.sidebar.selectbox("Run B", run_ids, index=len(run_ids) - 1, format_func=format_run)
+
+    comparison = load_run_comparison(run_a, run_b)
+    changes = get_changes(comparison)
+    st.markdown(f"**{len(changes)} of {len(comparison)} metrics changed from run {run_a} to run {run_b}**")
+    if not changes:
+        return
+
+    st.dataframe(pd.DataFrame([
+        {
+            "Dimension": row['dimension'],
+            "Metric id": row['metric_id'],
+            "Shape": row['shape_name'],
+            "Vocab": row['vocab'],
+            "Score A": row['score_a'],
+            "Score B": row['score_b'],
+            "Score delta": row['score_delta'],
+            "Added violations": row['num_added'],
+            "Removed violations": row['num_removed']
+        }
+        for row in changes
+    ]), use_container_width=True, hide_index=True)
+
+    for row in changes:
+        if not row['num_added'] and not row['num_removed']:
+            continue
+        vocab = f" [{row['vocab']}]" if row['vocab'] else ''
+        with st.expander(f"{row['shape_name']}{vocab}: +{row['num_added']} / -{row['num_removed']}"):
+            for field, label in (('added', 'New violating entities'), ('removed', 'Entities that no longer violate the metric')):
+                if not len(row[field]):
+                    continue
+                key = f"compare_{field}_{row['shape_name']}_{row['vocab']}"
+                _, num_pages = get_entities_page(row[field], 1)
+                page = st.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages, value=1, key=key) if num_pages > 1 else 1
+                iris, _ = get_entities_page(row[field], page)
+                st.markdown(f"**{label} ({len(row[field])}):**")
+                st.code("\n".join(iris), language=None)
+
 def show_metric_coverage():
+    # Only needed by this view
+    import plotly.graph_objects as go
+
     st.markdown("### Metric coverage & DQ measure definition")
     st.markdown("**Total number of metrics:** 69")
     
@@ -217,7 +323,20 @@ def show_metric_coverage():
     st.dataframe(df_measures, use_container_width=True)
 
 
-def create_results_visualization(run_info):
+def reload_on_change(csv_path):
+    """
+    Reruns the dashboard when the results CSV changes, e.g. assessed again by main.py --watch
+    """
+    @st.fragment(run_every=DASHBOARD_REFRESH_INTERVAL)
+    def check_results():
+        mtime = get_mtime(csv_path)
+        mtimes = st.session_state.setdefault("results_mtimes", {})
+        if mtimes.setdefault(csv_path, mtime) != mtime:
+            mtimes[csv_path] = mtime
+            st.rerun()
+    check_results()
+
+def create_results_visualization(run_info, run_profile=None):
 
     st.set_page_config(layout='wide')
     # --------------------------- 
@@ -225,7 +344,7 @@ def create_results_visualization(run_info):
     # --------------------------- 
     st.sidebar.title("")
 
-    view_option = st.sidebar.selectbox("View", ["DQA Results", "Metric Coverage & DQ measure definition"])
+    view_option = st.sidebar.selectbox("View", ["DQA Results", "Compare runs", "Metric Coverage & DQ measure definition"])
 
     if view_option == "DQA Results":
 
@@ -249,21 +368,25 @@ def create_results_visualization(run_info):
             st.error(f"No results CSV found for dataset '{dataset_name}'.")
             return
         
-        df = pd.read_csv(csv_path)
-        df['vocab'] = df['vocab'].fillna('')
-        df['violation_text'] = df['violation_text'].fillna('')
-        df['violations'] = df['violations'].fillna('')
-    
-        show_dq_assessment_results(df)
-        show_dq_assessment_statistics(run_info, dataset_name, df)
+        if st.sidebar.checkbox("Reload when the results change"):
+            reload_on_change(csv_path)
+
+        df = load_results(csv_path)
+        violations_file_path = get_violations_file_path(DQ_ASSESSMENT_RESULTS_FOLDER_PATH.format(dataset_name=dataset_name), dataset_name)
+        show_dq_assessment_results(df, csv_path, violations_file_path if os.path.exists(violations_file_path) else None)
+        show_dq_assessment_statistics(run_info, dataset_name, df, run_profile)
         
+    elif view_option == "Compare runs":
+        show_run_comparison()
+
     else:
         show_metric_coverage()
     
 def visualize_results():
-    with open("run_info.json", "r", encoding="utf-8") as f:
-        run_info = json.load(f)
-    create_results_visualization(run_info)
+    # Cached until the files change
+    run_info = load_json("run_info.json")
+    run_profile = load_json(RUN_PROFILE_FILE_PATH)
+    create_results_visualization(run_info, run_profile)
 
 if "__main__":
 
@@ -0,0 +1,222 @@
+import os
+import csv
+import time
+import logging
+
+from const import WATCH_INTERVAL, WATCH_DEBOUNCE, WATCH_CACHE_SIZE
+from bitmaps import new_bitmap
+from input_sources import GraphCache, set_graph_cache, resolve_graph_files
+
+# Watch mode (main.py --watch): after the first run, the inputs of the assessment are checked every WATCH_INTERVAL
+# seconds and, when one of them changes, only the stages that depend on it are run again:
+#   metadata_file      metadata & data stages (the data shapes are instantiated from the metadata results)
+#   vocabulary file    data stage & the stage of that vocabulary (the data shapes use the vocabulary profiles)
+#   graph_file         data & vocabulary stages (the vocabulary shapes use the classes & properties of the graph)
+#   config             the whole assessment
+# The rows of the stages that aren't run again are copied from the previous results CSV, so the CSV always has
+# every stage (the dashboard reloads it when it changes). The parsed graphs are kept in memory between the runs,
+# the files that didn't change aren't parsed again. pyshacl has no incremental validation, a stage that runs
+# again validates all its shapes.
+
+CONFIG = 'config'
+GRAPH = 'graph'
+METADATA = 'metadata'
+
+
+def get_file_state(path):
+    try:
+        stat = os.stat(path)
+    except OSError: # removed, or being replaced
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def get_watched_files(dq_assessment, run_stages, graph_file=None):
+    """
+    Input files of the stages of the run (metadata_shapes, data_shapes, vocab_shapes) -> input (config, graph,
+    metadata or the config section of a vocabulary)
+    """
+    metadata_shapes, data_shapes, vocab_shapes = run_stages
+    files = {dq_assessment.config_path: CONFIG}
+    if data_shapes:
+        try:
+            # The glob patterns are resolved again, e.g. a new file of the data graph
+            graph_files = resolve_graph_files(graph_file if graph_file is not None else dq_assessment.graph_file_path)
+        except (FileNotFoundError, ValueError):
+            graph_files = dq_assessment.graph_files
+        files.update({path: GRAPH for path in graph_files})
+    if (metadata_shapes or data_shapes) and dq_assessment.metadata_file:
+        files[dq_assessment.metadata_file] = METADATA
+    if data_shapes or vocab_shapes:
+        files.update({dq_assessment.config[vocab]['file_path']: vocab for vocab in dq_assessment.vocab_names})
+    return files
+
+def get_files_state(files):
+    return {path: get_file_state(path) for path in files}
+
+def get_stages_to_run(dq_assessment, run_stages, changed_inputs):
+    """
+    Stages that depend on the changed inputs, among the stages of the run: (metadata, data, vocabularies),
+    None when the whole assessment runs again
+    """
+    metadata_shapes, data_shapes, vocab_shapes = run_stages
+    if CONFIG in changed_inputs or dq_assessment.named_graphs:
+        # The rows of the named graphs are a rollup, they aren't replaced per stage
+        return None
+    metadata = METADATA in changed_inputs
+    data = bool(changed_inputs)
+    if GRAPH in changed_inputs:
+        vocabularies = list(dq_assessment.vocab_names)
+    else:
+        vocabularies = [vocab for vocab in dq_assessment.vocab_names if vocab in changed_inputs]
+    return (metadata and metadata_shapes,
+            data and data_shapes,
+            vocabularies if vocab_shapes else [])
+
+
+def read_stage_rows(csv_path, stages):
+    """
+    Rows of the results CSV per stage ([stage, number of rows, number of shapes] of ResultsAggregator.stages)
+    """
+    if not os.path.exists(csv_path):
+        return {}
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    stage_rows, position = {}, 0
+    for stage, num_rows, _ in stages:
+        stage_rows[stage] = rows[position:position + num_rows]
+        position += num_rows
+    return stage_rows
+
+def merge_results(previous, dq_assessment, previous_rows):
+    """
+    Rewrites the results CSV of a partial run with the rows of the previous run for the stages that didn't run,
+    and completes the run (rows, shapes, times, profile & violating entities) for the run info & results store
+    """
+    aggregator = dq_assessment.results_aggregator
+    new_rows = read_stage_rows(aggregator.file_path, aggregator.stages)
+    new_stages = {stage: (num_rows, num_shapes) for stage, num_rows, num_shapes in aggregator.stages}
+    previous_stages = {stage: (num_rows, num_shapes) for stage, num_rows, num_shapes in previous.results_aggregator.stages}
+
+    # Order of the stages in run()
+    order = ['metadata', 'data'] + [f"vocabularies.{dq_assessment.config[vocab]['vocab_name']}" for vocab in dq_assessment.vocab_names]
+    rows, stages = [], []
+    for stage in order:
+        if stage in new_stages:
+            rows += new_rows[stage]
+            stages.append([stage, *new_stages[stage]])
+        elif stage in previous_stages and stage in previous_rows:
+            rows += previous_rows[stage]
+            stages.append([stage, *previous_stages[stage]])
+
+    temp_file_path = f'{aggregator.file_path}.tmp'
+    with open(temp_file_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=aggregator.fieldnames, restval='', extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_file_path, aggregator.file_path)
+
+    aggregator.stages = stages
+    dq_assessment.results_rows = [{field: value for field, value in row.items() if field not in ('violations', 'violation_text')} for row in rows]
+    dq_assessment.counter_shapes = sum(num_shapes for _, _, num_shapes in stages)
+
+    if 'metadata' not in new_stages:
+        dq_assessment.metadata_shapes_elapsed_time = previous.metadata_shapes_elapsed_time
+    if 'data' not in new_stages:
+        dq_assessment.data_shapes_elapsed_time = previous.data_shapes_elapsed_time
+        dq_assessment.graph_profile = previous.graph_profile
+    if not any(stage.startswith('vocabularies.') for stage in new_stages):
+        dq_assessment.vocab_shapes_elapsed_time = previous.vocab_shapes_elapsed_time
+
+    # Violating entities of the stages that didn't run, encoded with the entity IDs of the run
+    for (vocab, metric), bitmap in previous.violation_bitmaps.items():
+        stage = 'data' if vocab is None else f'vocabularies.{vocab}'
+        if stage not in new_stages:
+            dq_assessment.violation_bitmaps[(vocab, metric)] = new_bitmap(dq_assessment.entity_ids.encode(entity) for entity in previous.entity_ids.decode_all(bitmap))
+
+
+def run_changed_stages(previous, create_assessment, run_stages, stages):
+    """
+    Runs the stages (see get_stages_to_run) and returns the assessment, with the results of every stage
+    """
+    if stages is None:
+        metadata_shapes, data_shapes, vocab_shapes = run_stages
+        dq_assessment = create_assessment(metadata_shapes=metadata_shapes, data_shapes=data_shapes, vocab_shapes=vocab_shapes)
+        dq_assessment.run()
+        return dq_assessment
+
+    metadata, data, vocabularies = stages
+    dq_assessment = create_assessment(metadata_shapes=metadata, data_shapes=data, vocab_shapes=bool(vocabularies), vocabularies=vocabularies)
+    # The CSV of the previous run is replaced by the run
+    previous_rows = read_stage_rows(previous.results_aggregator.file_path, previous.results_aggregator.stages)
+    dq_assessment.run()
+    merge_results(previous, dq_assessment, previous_rows)
+    return dq_assessment
+
+def wait_for_changes(dq_assessment, run_stages, state, graph_file):
+    """
+    Waits until the input files change and stop changing, returns the new watched files & their state
+    """
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        new_files = get_watched_files(dq_assessment, run_stages, graph_file)
+        new_state = get_files_state(new_files)
+        if new_state == state:
+            continue
+        # Editors & copies write the files in several steps
+        while True:
+            time.sleep(WATCH_DEBOUNCE)
+            new_files = get_watched_files(dq_assessment, run_stages, graph_file)
+            stable_state = get_files_state(new_files)
+            if stable_state == new_state:
+                return new_files, new_state
+            new_state = stable_state
+
+def watch_assessment(create_assessment, metadata_shapes, data_shapes, vocab_shapes, save_run, graph_file=None):
+    """
+    Runs the assessment and runs again the stages that depend on the input files that change, until interrupted.
+    create_assessment(metadata_shapes, data_shapes, vocab_shapes, vocabularies=None) creates the DQAssessment
+    of a run, save_run(dq_assessment) saves its run info & results.
+    """
+    set_graph_cache(GraphCache(WATCH_CACHE_SIZE))
+    run_stages = (metadata_shapes, data_shapes, vocab_shapes)
+
+    dq_assessment = create_assessment(metadata_shapes=metadata_shapes, data_shapes=data_shapes, vocab_shapes=vocab_shapes)
+    dq_assessment.run()
+    save_run(dq_assessment)
+
+    files = get_watched_files(dq_assessment, run_stages, graph_file)
+    state = get_files_state(files)
+    logging.info(f"Watching {len(files)} files of {dq_assessment.dataset_name} for changes (Ctrl+C to stop)")
+
+    try:
+        while True:
+            new_files, new_state = wait_for_changes(dq_assessment, run_stages, state, graph_file)
+            changed_paths = [path for path in new_state.keys() | state.keys() if new_state.get(path) != state.get(path)]
+            changed_inputs = {new_files.get(path, files.get(path)) for path in changed_paths}
+            files, state = new_files, new_state
+
+            stages = get_stages_to_run(dq_assessment, run_stages, changed_inputs)
+            if stages is None:
+                logging.info(f"Changed {', '.join(changed_paths)}, running the whole assessment")
+            else:
+                metadata, data, vocabularies = stages
+                if not (metadata or data or vocabularies):
+                    logging.info(f"Changed {', '.join(changed_paths)}, no stage of the run depends on it")
+                    continue
+                names = (['metadata'] if metadata else []) + (['data'] if data else []) + [f'vocabulary {vocab}' for vocab in vocabularies]
+                logging.info(f"Changed {', '.join(changed_paths)}, running the stages: {', '.join(names)}")
+
+            initial_time = time.time()
+            try:
+                dq_assessment = run_changed_stages(dq_assessment, create_assessment, run_stages, stages)
+            except Exception:
+                # e.g. a syntax error in the file being edited, the results of the previous run are kept
+                logging.exception("The assessment failed, waiting for the next change")
+                continue
+            save_run(dq_assessment)
+            # The config may have changed the input files
+            files = get_watched_files(dq_assessment, run_stages, graph_file)
+            state = get_files_state(files)
+            logging.info(f"Results of {dq_assessment.dataset_name} updated in {time.time() - initial_time:.2f}s")
+    except KeyboardInterrupt:
+        logging.info("Stopped watching")